@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Results Analyzer for YMS Dashboard Service
+Summarizes JTL result files (CSV format) per endpoint, tenant, facility, carrierIds list size
+and response size
+"""
+
+import csv
+import math
+import re
+import sys
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+
+# Sampler label used by test_plan.jmx, used when api_endpoint was not saved as a column
+LABEL_PATTERN = re.compile(
+    r"Dynamic API Request - (?P<endpoint>\S+) - (?P<tenant>\S+) - Facility (?P<facility>\S+)"
+)
+
+
+def parse_sample(row: Dict) -> Dict:
+    """
+    Convert one JTL CSV row into a sample dictionary.
+
+    Endpoint, tenant, facility and carrier count come from the sample variables when
+    run_test.sh saved them, otherwise endpoint, tenant and facility are parsed from the label.
+    """
+    endpoint = row.get("api_endpoint")
+    tenant = row.get("tenantName")
+    facility = row.get("facilityId")
+    if not (endpoint and tenant and facility):
+        match = LABEL_PATTERN.match(row.get("label", ""))
+        endpoint = endpoint or (match.group("endpoint") if match else row.get("label", "unknown"))
+        tenant = tenant or (match.group("tenant") if match else "unknown")
+        facility = facility or (match.group("facility") if match else "unknown")
+
+    carrier_count = row.get("carrierCount")
+    received = row.get("bytes")
+    sent = row.get("sentBytes")
+    return {
+        "timestamp": int(row["timeStamp"]),
+        "elapsed": int(row["elapsed"]),
+        "endpoint": endpoint,
+        "tenant": tenant,
+        "facility": facility,
+        "success": row.get("success", "").lower() == "true",
+        "code": row.get("responseCode", ""),
+        "carrier_count": int(carrier_count) if carrier_count else None,
+        "bytes": int(received) if received else 0,
+        "sent_bytes": int(sent) if sent else 0
+    }
+
+
+def read_samples(filename: str) -> Iterator[Dict]:
+    """
+    Stream samples from a JTL CSV file.
+
+    Args:
+        filename: Path to the JTL file
+
+    Yields:
+        Sample dictionaries with timestamp, elapsed, endpoint, tenant, facility,
+        success, code, carrier_count, bytes and sent_bytes (see parse_sample)
+    """
+    with open(filename, newline="") as f:
+        for row in csv.DictReader(f):
+            yield parse_sample(row)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(latencies: List[float], errors: int = 0) -> Dict:
+    """Build the standard statistics block for a group of latencies."""
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        "count": count,
+        "errors": errors,
+        "mean": sum(values) / count if count else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": values[-1] if values else 0.0
+    }
+
+
+def carrier_bucket(carrier_count: Optional[int]) -> str:
+    """Group carrier counts into power-of-two ranges: 0, 1, 2-3, 4-7, 8-15, ..."""
+    if carrier_count is None:
+        return "n/a"
+    if carrier_count <= 1:
+        return str(carrier_count)
+    low = 1 << (carrier_count.bit_length() - 1)
+    return f"{low}-{2 * low - 1}"
+
+
+def _bucket_sort_key(bucket: str) -> int:
+    if bucket == "n/a":
+        return -1
+    return int(bucket.split("-")[0])
+
+
+def size_bucket(size: int) -> str:
+    """Group byte counts into power-of-two KB ranges: 0-1 KB, 1-2 KB, 2-4 KB, ..."""
+    kb = size // 1024
+    if kb == 0:
+        return "0-1 KB"
+    low = 1 << (kb.bit_length() - 1)
+    return f"{low}-{2 * low} KB"
+
+
+def _size_sort_key(bucket: str) -> int:
+    return int(bucket.split("-")[0])
+
+
+def summarize_by(samples: Iterable[Dict], key: Callable[[Dict], str]) -> Dict[str, Dict]:
+    """Latency statistics per group, where `key` maps a sample to its group."""
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    for sample in samples:
+        group = key(sample)
+        latencies[group].append(sample["elapsed"])
+        if not sample["success"]:
+            errors[group] += 1
+    return {group: summarize(values, errors[group]) for group, values in sorted(latencies.items())}
+
+
+def summarize_by_endpoint(samples: Iterable[Dict]) -> Dict[str, Dict]:
+    """Latency statistics per endpoint."""
+    return summarize_by(samples, lambda sample: sample["endpoint"])
+
+
+def summarize_by_carrier_count(samples: Iterable[Dict]) -> Dict[str, Dict[str, Dict]]:
+    """Latency statistics per endpoint and carrierIds list size bucket."""
+    latencies = defaultdict(lambda: defaultdict(list))
+    errors = defaultdict(lambda: defaultdict(int))
+    for sample in samples:
+        if sample["carrier_count"] is None:
+            continue
+        bucket = carrier_bucket(sample["carrier_count"])
+        latencies[sample["endpoint"]][bucket].append(sample["elapsed"])
+        if not sample["success"]:
+            errors[sample["endpoint"]][bucket] += 1
+
+    report = {}
+    for endpoint in sorted(latencies):
+        buckets = latencies[endpoint]
+        report[endpoint] = {
+            bucket: summarize(buckets[bucket], errors[endpoint][bucket])
+            for bucket in sorted(buckets, key=_bucket_sort_key)
+        }
+    return report
+
+
+def summarize_by_response_size(samples: Iterable[Dict]) -> Dict[str, Dict[str, Dict]]:
+    """Latency statistics per endpoint and response size bucket."""
+    latencies = defaultdict(lambda: defaultdict(list))
+    errors = defaultdict(lambda: defaultdict(int))
+    for sample in samples:
+        bucket = size_bucket(sample["bytes"])
+        latencies[sample["endpoint"]][bucket].append(sample["elapsed"])
+        if not sample["success"]:
+            errors[sample["endpoint"]][bucket] += 1
+
+    return {
+        endpoint: {
+            bucket: summarize(latencies[endpoint][bucket], errors[endpoint][bucket])
+            for bucket in sorted(latencies[endpoint], key=_size_sort_key)
+        }
+        for endpoint in sorted(latencies)
+    }
+
+
+def summarize_sizes(samples: Iterable[Dict], key: Callable[[Dict], str]) -> Dict[str, Dict]:
+    """
+    Request/response size statistics per group and how strongly latency follows response size.
+
+    Only successful samples count, since error bodies say nothing about the normal
+    payload. The least-squares slope (ms per 100 KB) and Pearson correlation of
+    latency against response bytes are kept as running sums.
+
+    Returns:
+        Dictionary of group -> count, sent_mean, bytes_mean, bytes_p95, bytes_max,
+        p95 latency, ms_per_100kb and correlation
+    """
+    sizes = defaultdict(list)
+    latencies = defaultdict(list)
+    sent = defaultdict(int)
+    sums = defaultdict(lambda: [0.0] * 5)  # sum x, y, xx, xy, yy
+    for sample in samples:
+        if not sample["success"]:
+            continue
+        group = key(sample)
+        x, y = sample["bytes"], sample["elapsed"]
+        sizes[group].append(x)
+        latencies[group].append(y)
+        sent[group] += sample["sent_bytes"]
+        group_sums = sums[group]
+        group_sums[0] += x
+        group_sums[1] += y
+        group_sums[2] += x * x
+        group_sums[3] += x * y
+        group_sums[4] += y * y
+
+    report = {}
+    for group in sorted(sizes):
+        n = len(sizes[group])
+        sx, sy, sxx, sxy, syy = sums[group]
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        cov = sxy - sx * sy / n
+        values = sorted(sizes[group])
+        report[group] = {
+            "count": n,
+            "sent_mean": sent[group] / n,
+            "bytes_mean": sx / n,
+            "bytes_p95": percentile(values, 95),
+            "bytes_max": values[-1],
+            "p95": percentile(sorted(latencies[group]), 95),
+            "ms_per_100kb": cov / var_x * 100 * 1024 if var_x > 0 else 0.0,
+            "correlation": cov / math.sqrt(var_x * var_y) if var_x > 0 and var_y > 0 else 0.0
+        }
+    return report
+
+
+# Groups need this many samples before a latency/size correlation is flagged
+MIN_SIZE_SAMPLES = 30
+
+
+def print_size_table(rows: Dict[str, Dict], title: str, key_header: str, limit: Optional[int] = None):
+    """Print size statistics; groups whose latency closely follows response size are flagged."""
+    print(f"\n{title}")
+    print("-" * 118)
+    print(f"{key_header:<40} {'count':>7} {'req KB':>7} {'resp KB':>8} {'p95 KB':>8} {'max KB':>8} "
+          f"{'p95 ms':>7} {'ms/100KB':>9} {'corr':>5}")
+    for key, stats in list(rows.items())[:limit]:
+        flag = "  size-bound" if stats["count"] >= MIN_SIZE_SAMPLES and stats["correlation"] >= 0.5 else ""
+        print(f"{key:<40} {stats['count']:>7} {stats['sent_mean'] / 1024:>7.1f} {stats['bytes_mean'] / 1024:>8.1f} "
+              f"{stats['bytes_p95'] / 1024:>8.1f} {stats['bytes_max'] / 1024:>8.1f} {stats['p95']:>7.0f} "
+              f"{stats['ms_per_100kb']:>9.1f} {stats['correlation']:>5.2f}{flag}")
+
+
+def print_stats_table(rows: Dict[str, Dict], title: str, key_header: str):
+    """Print a statistics table keyed by endpoint or bucket."""
+    print(f"\n{title}")
+    print("-" * 86)
+    print(f"{key_header:<30} {'count':>8} {'errors':>7} {'mean':>8} {'p50':>7} {'p95':>7} {'p99':>7} {'max':>7}")
+    for key, stats in rows.items():
+        print(f"{key:<30} {stats['count']:>8} {stats['errors']:>7} {stats['mean']:>8.1f} "
+              f"{stats['p50']:>7.0f} {stats['p95']:>7.0f} {stats['p99']:>7.0f} {stats['max']:>7.0f}")
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize stress test results")
+    parser.add_argument("results", help="JTL results file (CSV)")
+    parser.add_argument("--by", choices=["endpoint", "carriers", "tenant", "facility", "size"], default="endpoint",
+                        help="Group by endpoint, endpoint and carrierIds list size, tenant, tenant/facility, "
+                             "or request/response size")
+    parser.add_argument("--top", type=int, default=20,
+                        help="With --by size: facilities with the largest responses to show (default: 20)")
+    args = parser.parse_args()
+
+    if args.by == "carriers":
+        report = summarize_by_carrier_count(read_samples(args.results))
+        if not report:
+            print("No carrierCount column in results. Re-run with run_test.sh to save it.")
+            return 1
+        for endpoint, buckets in report.items():
+            print_stats_table(buckets, f"{endpoint} - latency (ms) by carrierIds size", "carriers")
+    elif args.by == "tenant":
+        print_stats_table(summarize_by(read_samples(args.results), lambda s: s["tenant"]),
+                          "Latency (ms) by tenant", "tenant")
+    elif args.by == "size":
+        print_size_table(summarize_sizes(read_samples(args.results), lambda s: s["endpoint"]),
+                         "Request/response size by endpoint (successful samples)", "endpoint")
+        facilities = summarize_sizes(read_samples(args.results), lambda s: f"{s['endpoint']} {s['tenant']}/{s['facility']}")
+        largest = dict(sorted(facilities.items(), key=lambda item: -item[1]["bytes_mean"]))
+        print_size_table(largest, f"Largest responses by endpoint and facility (top {args.top})",
+                         "endpoint tenant/facility", args.top)
+        for endpoint, buckets in summarize_by_response_size(read_samples(args.results)).items():
+            print_stats_table(buckets, f"{endpoint} - latency (ms) by response size", "response size")
+    elif args.by == "facility":
+        print_stats_table(summarize_by(read_samples(args.results), lambda s: f"{s['tenant']}/{s['facility']}"),
+                          "Latency (ms) by tenant/facility", "tenant/facility")
+    else:
+        print_stats_table(summarize_by_endpoint(read_samples(args.results)), "Latency (ms) by endpoint", "endpoint")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
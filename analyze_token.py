@@ -1,89 +1,270 @@
 #!/usr/bin/env python3
 """
-JWT Token Analyzer - Decodes and displays JWT token contents
+JWT Token Analyzer - Decodes and displays JWT token contents,
+or checks whole token stores for tenant mismatches and expiry before a run
 """
 
+import csv
+import glob
 import json
-import base64
+import os
 import sys
+import time
+
+from scenario_store import ScenarioStore, is_scenario_store
+from token_introspection import decode_token, seconds_until_expiry
+
+# Expiry relative to the planned run duration
+EXPIRY_BUCKETS = ["expired", "< 25% of run", "25-50% of run", "50-100% of run", "outlives run"]
 
 def decode_jwt(token):
     """Decode a JWT token and display its contents."""
     
-    # Remove 'Bearer ' prefix if present
-    if token.startswith('Bearer '):
-        token = token[7:]
-    
-    # JWT has 3 parts separated by dots: header.payload.signature
-    parts = token.split('.')
-    
-    if len(parts) != 3:
-        print("Invalid JWT format. Expected 3 parts separated by dots.")
+    try:
+        info = decode_token(token)
+    except ValueError as e:
+        print(f"Failed to decode token: {e}")
         return None
     
-    header_encoded, payload_encoded, signature = parts
+    header = info.header
+    payload = info.payload
     
-    # Decode header
-    try:
-        # Add padding if needed (JWT uses base64url without padding)
-        header_padding = header_encoded + '=' * (4 - len(header_encoded) % 4)
-        header = json.loads(base64.urlsafe_b64decode(header_padding))
-        print("=" * 60)
-        print("JWT HEADER:")
-        print("=" * 60)
-        print(json.dumps(header, indent=2))
-    except Exception as e:
-        print(f"Failed to decode header: {e}")
-        return None
+    print("=" * 60)
+    print("JWT HEADER:")
+    print("=" * 60)
+    print(json.dumps(header, indent=2))
     
-    # Decode payload
-    try:
-        # Add padding if needed
-        payload_padding = payload_encoded + '=' * (4 - len(payload_encoded) % 4)
-        payload = json.loads(base64.urlsafe_b64decode(payload_padding))
+    print("\n" + "=" * 60)
+    print("JWT PAYLOAD:")
+    print("=" * 60)
+    print(json.dumps(payload, indent=2))
+    
+    # Highlight tenant information
+    if 'tenant_id' in payload:
         print("\n" + "=" * 60)
-        print("JWT PAYLOAD:")
+        print("TENANT INFORMATION:")
         print("=" * 60)
-        print(json.dumps(payload, indent=2))
-        
-        # Highlight tenant information
-        if 'tenant_id' in payload:
-            print("\n" + "=" * 60)
-            print("TENANT INFORMATION:")
-            print("=" * 60)
-            print(f"Tenant ID: {payload['tenant_id']}")
-            print(f"User: {payload.get('preferred_username', 'N/A')}")
-            print(f"Email: {payload.get('email', 'N/A')}")
-            print(f"Name: {payload.get('name', 'N/A')}")
-            print(f"Groups: {', '.join(payload.get('groups', []))}")
-        
-        # Check token validity
-        import time
-        if 'exp' in payload:
-            exp_time = payload['exp']
-            current_time = int(time.time())
-            if exp_time > current_time:
-                remaining = exp_time - current_time
-                hours = remaining // 3600
-                minutes = (remaining % 3600) // 60
-                print(f"\nToken valid for: {hours}h {minutes}m")
-            else:
-                print("\nToken has EXPIRED!")
-                
-    except Exception as e:
-        print(f"Failed to decode payload: {e}")
-        return None
+        print(f"Tenant ID: {payload['tenant_id']}")
+        print(f"User: {payload.get('preferred_username', 'N/A')}")
+        print(f"Email: {payload.get('email', 'N/A')}")
+        print(f"Name: {payload.get('name', 'N/A')}")
+        print(f"Groups: {', '.join(payload.get('groups', []))}")
+    
+    # Check token validity
+    remaining = seconds_until_expiry(token)
+    if remaining is not None:
+        if remaining > 0:
+            hours = int(remaining // 3600)
+            minutes = int((remaining % 3600) // 60)
+            print(f"\nToken valid for: {hours}h {minutes}m")
+        else:
+            print("\nToken has EXPIRED!")
     
     return {'header': header, 'payload': payload}
 
+def iter_token_file(path):
+    """
+    Stream (expected tenant, label, token) entries from a token store.
+
+    Understands tokens/{env}.json, multi-user result files, identities sidecars,
+    single-token files from generate_bearer_token.py and scenario CSVs or stores (authToken column).
+    """
+    if is_scenario_store(path):
+        with ScenarioStore(path) as store:
+            for tenant, token in sorted(store.distinct('tenantName', 'authToken')):
+                if token:
+                    yield tenant, f"{path}:{tenant}", token
+        return
+
+    if path.endswith('.csv'):
+        seen = set()
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                token = row.get('authToken')
+                key = (row.get('tenantName'), token)
+                if token and key not in seen:
+                    seen.add(key)
+                    yield row.get('tenantName'), f"{path}:{row.get('tenantName')}", token
+        return
+    
+    with open(path, 'r') as f:
+        data = json.load(f)
+    
+    if 'users' in data:
+        for user, user_data in data['users'].items():
+            if not isinstance(user_data, dict):
+                continue
+            for tenant, token_data in (user_data.get('tenants') or {}).items():
+                if isinstance(token_data, dict):
+                    expected = None if tenant == 'default' else tenant
+                    yield expected, f"{path}:{user}/{tenant}", token_data.get('token')
+    elif 'tokens' in data:
+        for tenant, token_data in data['tokens'].items():
+            if isinstance(token_data, dict):
+                yield tenant, f"{path}:{tenant}", token_data.get('token')
+    elif 'tenants' in data:
+        for tenant, identities in data['tenants'].items():
+            if not isinstance(identities, list):
+                continue
+            for identity in identities:
+                if isinstance(identity, dict):
+                    yield tenant, f"{path}:{identity.get('user')}/{tenant}", identity.get('token')
+    elif 'token' in data:
+        yield None, f"{path}:{data.get('user', 'token')}", data['token']
+    else:
+        for role, token in data.items():
+            if isinstance(token, str) or token is None:
+                yield None, f"{path}:{role}", token
+
+
+def default_token_files():
+    """Token stores checked by --bulk when no paths are given."""
+    files = []
+    for path in sorted(glob.glob('tokens/*.json')):
+        name = os.path.basename(path)
+        # Timestamped multi-user files are history; only the latest one is used
+        if name.startswith('multi_user_') and not name.endswith('_latest.json'):
+            continue
+        files.append(path)
+    return files
+
+
+def analyze_token_files(paths, run_duration=0, now=None):
+    """
+    Check every token in the given stores against a planned run.
+
+    Args:
+        paths: Token store paths
+        run_duration: Planned run length in seconds; tokens must outlive it
+        now: Reference time (defaults to the current time)
+
+    Returns:
+        Report dictionary with counts, problems, earliest expiry and histogram
+    """
+    now = time.time() if now is None else now
+    report = {
+        "files": 0,
+        "tokens": 0,
+        "missing": [],
+        "invalid": [],
+        "tenant_mismatches": [],
+        "expiring_during_run": [],
+        "earliest": None,
+        "histogram": {label: 0 for label in EXPIRY_BUCKETS}
+    }
+    
+    for path in paths:
+        try:
+            entries = list(iter_token_file(path))
+        except (OSError, ValueError) as e:
+            report["invalid"].append((path, str(e)))
+            continue
+        report["files"] += 1
+        
+        for expected_tenant, label, token in entries:
+            if not token:
+                report["missing"].append(label)
+                continue
+            report["tokens"] += 1
+            
+            try:
+                info = decode_token(token)
+            except ValueError as e:
+                report["invalid"].append((label, str(e)))
+                continue
+            
+            if expected_tenant and info.tenant_id != expected_tenant:
+                report["tenant_mismatches"].append((label, expected_tenant, info.tenant_id))
+            
+            if info.exp is None:
+                continue
+            remaining = info.exp - now
+            if report["earliest"] is None or remaining < report["earliest"][1]:
+                report["earliest"] = (label, remaining)
+            if remaining < run_duration:
+                report["expiring_during_run"].append((label, remaining))
+            report["histogram"][expiry_bucket(remaining, run_duration)] += 1
+    
+    return report
+
+
+def expiry_bucket(remaining, run_duration):
+    """Histogram bucket of a token expiring in `remaining` seconds."""
+    if remaining <= 0:
+        return "expired"
+    if run_duration <= 0 or remaining >= run_duration:
+        return "outlives run"
+    fraction = remaining / run_duration
+    if fraction < 0.25:
+        return "< 25% of run"
+    if fraction < 0.5:
+        return "25-50% of run"
+    return "50-100% of run"
+
+
+def format_duration(seconds):
+    """Format seconds as e.g. '5h 12m' or '-3m' for expired tokens."""
+    sign = "-" if seconds < 0 else ""
+    seconds = abs(int(seconds))
+    hours, minutes = seconds // 3600, (seconds % 3600) // 60
+    return f"{sign}{hours}h {minutes}m" if hours else f"{sign}{minutes}m"
+
+
+def print_bulk_report(report, run_duration):
+    """Print the bulk token report."""
+    print("=" * 60)
+    print("TOKEN STORE REPORT:")
+    print("=" * 60)
+    print(f"Files: {report['files']}  Tokens: {report['tokens']}  Planned run: {format_duration(run_duration)}")
+    
+    if report["earliest"]:
+        label, remaining = report["earliest"]
+        print(f"Earliest expiry: {format_duration(remaining)} ({label})")
+    
+    print("\nExpiry histogram:")
+    total = max(1, sum(report["histogram"].values()))
+    for bucket, count in report["histogram"].items():
+        bar = "#" * round(40 * count / total)
+        print(f"  {bucket:<16} {count:>6} {bar}")
+    
+    for label, expected, actual in report["tenant_mismatches"]:
+        print(f"✗ Tenant mismatch: {label} expected '{expected}', token has '{actual}'")
+    for label, remaining in report["expiring_during_run"]:
+        print(f"✗ Expires during run: {label} ({format_duration(remaining)})")
+    for label, error in report["invalid"]:
+        print(f"✗ Invalid: {label} ({error})")
+    for label in report["missing"]:
+        print(f"⚠ Missing token: {label}")
+
+
 def main():
-    if len(sys.argv) < 2:
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Decode a JWT, or check token stores in bulk")
+    parser.add_argument('token', nargs='?', help="JWT token, with or without 'Bearer ' prefix")
+    parser.add_argument('--bulk', nargs='*', metavar='FILE',
+                        help='Check token stores (default: tokens/*.json and the latest multi-user files)')
+    parser.add_argument('--run-duration', type=int, default=0,
+                        help='Planned run duration in seconds; tokens expiring before it are reported')
+    args = parser.parse_args()
+    
+    if args.bulk is not None:
+        paths = args.bulk or default_token_files()
+        if not paths:
+            print("No token files found")
+            sys.exit(1)
+        report = analyze_token_files(paths, args.run_duration)
+        print_bulk_report(report, args.run_duration)
+        problems = report["tenant_mismatches"] or report["expiring_during_run"] or report["invalid"]
+        sys.exit(1 if problems or not report["tokens"] else 0)
+    
+    if not args.token:
         print("Usage: python analyze_token.py <jwt_token>")
         print("       python analyze_token.py 'Bearer eyJhbG...'")
+        print("       python analyze_token.py --bulk [files...] --run-duration 3600")
         sys.exit(1)
     
-    token = sys.argv[1]
-    decode_jwt(token)
+    decode_jwt(args.token)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
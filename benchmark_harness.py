@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the YMS Dashboard load test tooling
+Times the harness's own hot paths over synthetic data sets of increasing size:
+scenario generation, JWT decoding, token store loading and results parsing.
+
+Every run is appended to a history file and compared with the latest earlier run
+from the same host and Python version, so a slowdown in the tooling is caught
+before it delays data generation or the analysis of a real test.
+"""
+
+import base64
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from typing import Callable, Dict, List, Optional
+
+HISTORY_FILE = "benchmark_history.jsonl"
+
+# A benchmark is slower than the previous run when its median grows by more than this share
+REGRESSION_THRESHOLD = 0.2
+
+ENDPOINTS = [
+    "yard-availability", "site-occupancy", "trailer-overview", "dwell-time-summary",
+    "shipment-volume-forecast", "trailer-exception-summary"
+]
+
+
+def make_token(tenant: str, user: str, exp: int) -> str:
+    """Unsigned JWT with the claims the tooling reads (tenant_id, preferred_username, exp)."""
+    def segment(data: Dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+
+    payload = {
+        "tenant_id": tenant, "preferred_username": user, "exp": exp,
+        "email": f"{user}@example.com", "groups": ["dashboard-users"]
+    }
+    return f"{segment({'alg': 'RS256', 'typ': 'JWT'})}.{segment(payload)}.signature"
+
+
+def synthetic_tenant_data(facilities: int, tenants: int = 5, carriers: int = 20) -> Dict:
+    """Tenant data in the shape prepare_tenant_data returns, without calling the API."""
+    exp = int(time.time()) + 3600
+    return {
+        f"tenant-{t}": {
+            "facility_ids": [f"facility-{t}-{f}" for f in range(t, facilities, tenants)],
+            "carrier_ids": [f"carrier-{t}-{c}" for c in range(carriers)],
+            "auth_token": f"Bearer {make_token(f'tenant-{t}', 'perf-user', exp)}"
+        }
+        for t in range(min(tenants, facilities))
+    }
+
+
+def write_token_store(filename: str, tenants: int):
+    """Token store in the tokens/{env}.json format written by the Keycloak generator."""
+    exp = int(time.time()) + 3600
+    data = {
+        "environment": "bench",
+        "tokens": {
+            f"tenant-{t}": {"token": f"Bearer {make_token(f'tenant-{t}', 'perf-user', exp)}"}
+            for t in range(tenants)
+        }
+    }
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, "w") as f:
+        json.dump(data, f)
+
+
+def write_results(filename: str, rows: int, seed: int = 1):
+    """JTL results file in the load engine's column layout with random latencies."""
+    from load_engine import JTL_FIELDS
+
+    rng = random.Random(seed)
+    start = int(time.time() * 1000)
+    with open(filename, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=JTL_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for i in range(rows):
+            endpoint = ENDPOINTS[i % len(ENDPOINTS)]
+            success = rng.random() > 0.02
+            writer.writerow({
+                "timeStamp": start + i * 5,
+                "elapsed": int(rng.lognormvariate(4.5, 0.6)),
+                "label": f"Dynamic API Request - {endpoint} - tenant-{i % 5} - Facility facility-{i % 50}",
+                "responseCode": 200 if success else 500,
+                "success": "true" if success else "false",
+                "bytes": rng.randint(200, 200000),
+                "sentBytes": rng.randint(300, 3000),
+                "api_endpoint": endpoint,
+                "tenantName": f"tenant-{i % 5}",
+                "facilityId": f"facility-{i % 50}",
+                "carrierCount": rng.randint(1, 40)
+            })
+
+
+# Each setup takes (size, work directory) and returns the timed callable
+def setup_generate_csv(size: int, workdir: str) -> Callable:
+    from generate_exhaustive_data import generate_exhaustive_csv
+
+    tenant_data = synthetic_tenant_data(size)
+    filename = os.path.join(workdir, "test_data.csv")
+    return lambda: generate_exhaustive_csv(filename, tenant_data=tenant_data, binary=True)
+
+
+def setup_decode_jwt(size: int, workdir: str) -> Callable:
+    from analyze_token import decode_jwt
+    from token_introspection import _decode
+
+    tokens = [make_token(f"tenant-{i % 5}", f"user-{i}", int(time.time()) + i) for i in range(size)]
+
+    def run():
+        _decode.cache_clear()
+        for token in tokens:
+            decode_jwt(token)
+    return run
+
+
+def setup_decode_full_token(size: int, workdir: str) -> Callable:
+    from keycloak_admin_token_generator import KeycloakAdminTokenGenerator
+    from token_introspection import _decode
+
+    generator = KeycloakAdminTokenGenerator("local")
+    tokens = [make_token(f"tenant-{i % 5}", f"user-{i}", int(time.time()) + i) for i in range(size)]
+
+    def run():
+        _decode.cache_clear()
+        for token in tokens:
+            generator._decode_full_token(token)
+    return run
+
+
+def setup_load_tokens(size: int, workdir: str) -> Callable:
+    import generate_exhaustive_data
+
+    write_token_store(os.path.join(workdir, "tokens", "bench.json"), size)
+
+    def run():
+        # load_tokens_from_file reads tokens/{env}.json relative to the working directory
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            if not generate_exhaustive_data.load_tokens_from_file("bench"):
+                raise RuntimeError("synthetic token store was not loaded")
+        finally:
+            os.chdir(cwd)
+    return run
+
+
+def setup_parse_results(size: int, workdir: str) -> Callable:
+    from analyze_results import read_samples, summarize_by_carrier_count, summarize_by_endpoint
+
+    filename = os.path.join(workdir, "results.jtl")
+    write_results(filename, size)
+
+    def run():
+        summarize_by_endpoint(read_samples(filename))
+        summarize_by_carrier_count(read_samples(filename))
+    return run
+
+
+# name -> (setup, sizes, unit of size)
+BENCHMARKS = {
+    "generate_csv": (setup_generate_csv, [10, 100, 1000], "facilities"),
+    "decode_jwt": (setup_decode_jwt, [100, 1000, 10000], "tokens"),
+    "decode_full_token": (setup_decode_full_token, [100, 1000, 10000], "tokens"),
+    "load_tokens": (setup_load_tokens, [10, 100, 1000], "tenants"),
+    "parse_results": (setup_parse_results, [1000, 10000, 100000], "rows")
+}
+
+
+def measure(func: Callable, rounds: int) -> List[float]:
+    """Wall time of `rounds` calls (seconds), after one untimed warm-up call."""
+    timings = []
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        func()
+        for _ in range(rounds):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_benchmarks(names: List[str], rounds: int = 5, scale: float = 1.0) -> Dict[str, Dict]:
+    """
+    Run benchmarks over their data set sizes.
+
+    Args:
+        names: Benchmarks to run (keys of BENCHMARKS)
+        rounds: Timed calls per benchmark and size
+        scale: Factor applied to every data set size
+
+    Returns:
+        Dictionary of "name[size]" -> benchmark, size, unit, median, min (seconds) and us_per_item
+    """
+    results = {}
+    for name in names:
+        setup, sizes, unit = BENCHMARKS[name]
+        for size in sizes:
+            size = max(1, int(size * scale))
+            workdir = tempfile.mkdtemp(prefix="bench_")
+            try:
+                timings = measure(setup(size, workdir), rounds)
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+            median = statistics.median(timings)
+            results[f"{name}[{size}]"] = {
+                "benchmark": name,
+                "size": size,
+                "unit": unit,
+                "median": median,
+                "min": min(timings),
+                "us_per_item": median / size * 1e6
+            }
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return output.stdout.strip() or None
+
+
+def new_record(results: Dict[str, Dict], rounds: int) -> Dict:
+    """History entry for one benchmark run."""
+    return {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": _git_commit(),
+        "host": socket.gethostname(),
+        "python": platform.python_version(),
+        "rounds": rounds,
+        "results": results
+    }
+
+
+def read_history(filename: str) -> List[Dict]:
+    """Earlier runs, oldest first (empty if there is no history yet)."""
+    if not os.path.exists(filename):
+        return []
+    with open(filename) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_history(filename: str, record: Dict):
+    with open(filename, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def find_baseline(history: List[Dict], record: Dict) -> Optional[Dict]:
+    """Latest earlier run from the same host and Python version (timings are only comparable there)."""
+    for previous in reversed(history):
+        if previous["host"] == record["host"] and previous["python"] == record["python"]:
+            return previous
+    return None
+
+
+def compare(record: Dict, baseline: Optional[Dict]) -> Dict[str, float]:
+    """
+    Relative change of each benchmark's median against the baseline.
+
+    Returns:
+        Dictionary of "name[size]" -> change (0.25 means 25% slower); benchmarks
+        missing from the baseline are left out
+    """
+    if baseline is None:
+        return {}
+    return {
+        key: result["median"] / baseline["results"][key]["median"] - 1
+        for key, result in record["results"].items()
+        if key in baseline["results"] and baseline["results"][key]["median"] > 0
+    }
+
+
+def print_results(record: Dict, baseline: Optional[Dict], changes: Dict[str, float],
+                  threshold: float = REGRESSION_THRESHOLD):
+    """Print timings with the change against the baseline; regressions are flagged."""
+    if baseline:
+        print(f"\nBenchmarks (median of {record['rounds']} rounds) vs {baseline['created']}"
+              f" ({baseline.get('commit') or 'unknown commit'})")
+    else:
+        print(f"\nBenchmarks (median of {record['rounds']} rounds) - no earlier run on this host to compare with")
+    print("-" * 86)
+    print(f"{'benchmark':<20} {'size':>16} {'median ms':>12} {'min ms':>12} {'us/item':>10} {'change':>10}")
+    for key, result in record["results"].items():
+        size = f"{result['size']} {result['unit']}"
+        change = f"{changes[key] * 100:+.1f}%" if key in changes else "-"
+        flag = "  ✗ slower" if changes.get(key, 0.0) > threshold else ""
+        print(f"{result['benchmark']:<20} {size:>16} {result['median'] * 1000:>12.2f} "
+              f"{result['min'] * 1000:>12.2f} {result['us_per_item']:>10.2f} {change:>10}{flag}")
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the load test tooling and track it over time")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        help="Benchmarks to run (default: all)")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed rounds per benchmark and size (default: 5)")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Factor applied to every data set size (default: 1)")
+    parser.add_argument("--history", default=HISTORY_FILE, help=f"History file (default: {HISTORY_FILE})")
+    parser.add_argument("--no-save", action="store_true", help="Compare only, do not append this run to the history")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help=f"Median slowdown counted as a regression, 0-1 (default: {REGRESSION_THRESHOLD})")
+    args = parser.parse_args()
+
+    # The benchmarked modules are imported from the repository, wherever this is started from
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    record = new_record(run_benchmarks(args.only, args.rounds, args.scale), args.rounds)
+    baseline = find_baseline(read_history(args.history), record)
+    changes = compare(record, baseline)
+    print_results(record, baseline, changes, args.threshold)
+
+    if not args.no_save:
+        append_history(args.history, record)
+        print(f"\n✓ Appended to {args.history}")
+
+    regressions = [key for key, change in changes.items() if change > args.threshold]
+    if regressions:
+        print(f"✗ {len(regressions)} benchmark(s) more than {args.threshold * 100:.0f}% slower: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
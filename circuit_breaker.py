@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Circuit Breaker for YMS Dashboard Service
+Protects a degraded shared environment during a stress run: when the error rate
+(5xx, timeouts, connection failures) or p95 latency over a sliding window breaches
+its limit, the run is stopped or throttled. Trips and recoveries are recorded with
+their time; samples gathered before the trip stay in the results file.
+
+The Python load engine uses the breaker in-process (stop or throttle). For JMeter,
+`watch` follows the results file and runs JMeter's shutdown command on a trip.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from analyze_results import percentile
+
+
+BREAKER_ACTIONS = ["stop", "throttle"]
+
+# Exit status of a run stopped or throttled by the breaker (3: client saturated, 4: soak drift)
+TRIPPED_STATUS = 5
+
+
+def breaker_file_for(results_file: str) -> str:
+    """Path of the breaker events belonging to a results file."""
+    root, _ = os.path.splitext(results_file)
+    return f"{root}_breaker.json"
+
+
+def is_error(code: str) -> bool:
+    """True for responses that indicate a degraded service: 5xx and non-HTTP failures (timeouts, resets)."""
+    return code.startswith("5") or code.startswith("Non HTTP")
+
+
+class CircuitBreaker:
+    """Sliding-window error rate / p95 check that trips once limits are breached."""
+
+    def __init__(
+        self,
+        max_error_rate: float = 0.5,
+        max_p95_ms: Optional[float] = None,
+        window_seconds: float = 30.0,
+        min_samples: int = 20,
+        action: str = "stop",
+        slowdown: float = 4.0,
+        cooldown_seconds: float = 60.0,
+        on_trip: Optional[Callable[[Dict], None]] = None
+    ):
+        """
+        Initialize the breaker.
+
+        Args:
+            max_error_rate: Highest tolerated share (0-1) of errors in the window
+            max_p95_ms: Highest tolerated p95 latency in the window (None: no latency limit)
+            window_seconds: Length of the sliding window
+            min_samples: Samples needed in the window before it is judged
+            action: "stop" ends the run, "throttle" stretches request pacing by `slowdown`
+            slowdown: Pacing factor while a throttling breaker is open
+            cooldown_seconds: Throttle mode: time open before the limits are re-checked for recovery
+            on_trip: Called with the trip event (e.g. to stop the run)
+        """
+        if action not in BREAKER_ACTIONS:
+            raise ValueError(f"Unknown breaker action: {action} (expected {' or '.join(BREAKER_ACTIONS)})")
+        self.max_error_rate = max_error_rate
+        self.max_p95_ms = max_p95_ms
+        self.window_seconds = window_seconds
+        self.min_samples = min_samples
+        self.action = action
+        self.throttle_slowdown = slowdown
+        self.cooldown_seconds = cooldown_seconds
+        self.on_trip = on_trip
+
+        self.window = deque()  # (end time, elapsed ms, error)
+        self.errors = 0
+        self.lock = threading.Lock()
+        self.is_open = False
+        self.opened_at = None
+        self.events: List[Dict] = []
+        self._next_check = 0.0
+
+    @property
+    def tripped(self) -> bool:
+        """True once the breaker has tripped at least once."""
+        return bool(self.events)
+
+    @property
+    def slowdown(self) -> float:
+        """Factor to stretch request pacing by: > 1 while a throttling breaker is open."""
+        return self.throttle_slowdown if self.is_open and self.action == "throttle" else 1.0
+
+    def record(self, ended: float, elapsed_ms: float, code: str):
+        """Add one finished request; limits are evaluated at most once per second."""
+        event = None
+        with self.lock:
+            error = is_error(code)
+            self.window.append((ended, elapsed_ms, error))
+            self.errors += error
+            while self.window and self.window[0][0] < ended - self.window_seconds:
+                self.errors -= self.window.popleft()[2]
+            if ended >= self._next_check:
+                self._next_check = ended + 1.0
+                event = self._evaluate(ended)
+        if event and event["event"] == "trip" and self.on_trip:
+            self.on_trip(event)
+
+    def _evaluate(self, now: float) -> Optional[Dict]:
+        count = len(self.window)
+        if count < self.min_samples:
+            return None
+        error_rate = self.errors / count
+        p95 = percentile(sorted(elapsed for _, elapsed, _ in self.window), 95)
+
+        reasons = []
+        if error_rate > self.max_error_rate:
+            reasons.append(f"error rate {error_rate * 100:.1f}% > {self.max_error_rate * 100:.1f}%")
+        if self.max_p95_ms is not None and p95 > self.max_p95_ms:
+            reasons.append(f"p95 {p95:.0f} ms > {self.max_p95_ms:.0f} ms")
+
+        if not self.is_open and reasons:
+            self.is_open = True
+            self.opened_at = now
+            return self._event("trip", now, reasons, error_rate, p95, count)
+        if self.is_open and self.action == "throttle" and not reasons and now - self.opened_at >= self.cooldown_seconds:
+            self.is_open = False
+            return self._event("reset", now, [], error_rate, p95, count)
+        return None
+
+    def _event(self, kind: str, now: float, reasons: List[str], error_rate: float, p95: float, count: int) -> Dict:
+        event = {
+            "event": kind,
+            "time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)),
+            "timestamp": int(now * 1000),
+            "action": self.action,
+            "reasons": reasons,
+            "error_rate": round(error_rate, 4),
+            "p95_ms": round(p95, 1),
+            "window_samples": count
+        }
+        self.events.append(event)
+        if kind == "trip":
+            verb = "stopping the run" if self.action == "stop" else f"throttling {self.throttle_slowdown:g}x"
+            print(f"✗ Circuit breaker tripped at {event['time']}: {', '.join(reasons)} - {verb}")
+        else:
+            print(f"✓ Circuit breaker reset at {event['time']}: error rate {error_rate * 100:.1f}%, p95 {p95:.0f} ms")
+        return event
+
+    def write(self, filename: str):
+        """Write the limits and the trip/reset events as JSON."""
+        settings = {
+            "max_error_rate": self.max_error_rate,
+            "max_p95_ms": self.max_p95_ms,
+            "window_seconds": self.window_seconds,
+            "min_samples": self.min_samples,
+            "action": self.action,
+            "slowdown": self.throttle_slowdown,
+            "cooldown_seconds": self.cooldown_seconds
+        }
+        with open(filename, "w") as f:
+            json.dump({"settings": settings, "events": self.events}, f, indent=2)
+
+
+def main():
+    """Main entry point"""
+    import argparse
+    import subprocess
+
+    from soak_analysis import follow_samples
+
+    parser = argparse.ArgumentParser(description="Stop a JMeter run when the target environment degrades")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    watch = subparsers.add_parser("watch", help="Follow a results file and stop the test on a trip")
+    watch.add_argument("results", help="JTL results file being written")
+    watch.add_argument("--pid", type=int, required=True, help="Process writing the results (stop when it exits)")
+    watch.add_argument("--stop-command", default="shutdown.sh",
+                       help="Command that stops the test gracefully (default: JMeter's shutdown.sh)")
+    watch.add_argument("--max-error-rate", type=float, default=0.5,
+                       help="Highest tolerated share (0-1) of 5xx/timeouts in the window (default: 0.5)")
+    watch.add_argument("--max-p95-ms", type=float, default=None, help="Highest tolerated p95 latency (default: none)")
+    watch.add_argument("--window", type=float, default=30, help="Sliding window in seconds (default: 30)")
+    args = parser.parse_args()
+
+    def stop_test(event):
+        result = subprocess.run(args.stop_command, shell=True)
+        event["stopped"] = result.returncode == 0
+        if not event["stopped"]:
+            print(f"✗ Stop command '{args.stop_command}' failed (exit {result.returncode}); the test keeps running")
+
+    breaker = CircuitBreaker(args.max_error_rate, args.max_p95_ms, args.window, on_trip=stop_test)
+    try:
+        for sample in follow_samples(args.results, args.pid):
+            breaker.record((sample["timestamp"] + sample["elapsed"]) / 1000, sample["elapsed"], sample["code"])
+    except KeyboardInterrupt:
+        pass
+
+    breaker.write(breaker_file_for(args.results))
+    if any(event.get("stopped") is False for event in breaker.events):
+        # Tripped but not stopped: the run was not cut short, so do not report it as stopped
+        return 1
+    return TRIPPED_STATUS if breaker.tripped else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Client Resource Monitor for YMS Dashboard Service
+Samples the load generator's own CPU, memory, scheduler lag, sockets, send
+backlog and JVM garbage collection during a run, and flags the run invalid when
+the client was saturated.
+
+Uses psutil when installed; falls back to /proc on Linux. GC time needs jstat
+(from the JDK running JMeter) on the PATH and is left empty without it.
+"""
+
+import csv
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+CLIENT_FIELDS = [
+    "timestamp", "process_cpu_percent", "system_cpu_percent", "rss_mb", "scheduler_lag_ms",
+    "open_sockets", "time_wait_sockets", "send_queue_bytes", "gc_time_percent", "schedule_backlog"
+]
+
+# A metric above its limit in more than TOLERANCE of the samples invalidates the run
+DEFAULT_THRESHOLDS = {
+    "system_cpu_percent": 90.0,
+    "scheduler_lag_ms": 100.0,
+    "time_wait_sockets": 20000,
+    "send_queue_bytes": 1024 * 1024,
+    "gc_time_percent": 10.0,
+    "schedule_backlog": 0
+}
+TOLERANCE = 0.05
+
+# TCP states in /proc/net/tcp (hex)
+_TCP_TIME_WAIT = "06"
+
+
+def client_file_for(results_file: str) -> str:
+    """Path of the client resource samples belonging to a results file."""
+    root, _ = os.path.splitext(results_file)
+    return f"{root}_client.csv"
+
+
+def pid_alive(pid: int) -> bool:
+    """True while a process exists."""
+    if psutil is not None:
+        return psutil.pid_exists(pid)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read_proc_cpu_seconds(pid: int) -> Optional[float]:
+    """utime + stime of a process from /proc, in seconds."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # The command name may contain spaces; fields resume after its closing paren
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def _read_system_cpu_times() -> Optional[tuple]:
+    """(busy, total) jiffies from /proc/stat."""
+    try:
+        with open("/proc/stat") as f:
+            values = [int(v) for v in f.readline().split()[1:]]
+    except OSError:
+        return None
+    idle = values[3] + (values[4] if len(values) > 4 else 0)
+    return sum(values) - idle, sum(values)
+
+
+def _read_proc_rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _count_proc_sockets(pid: int) -> Optional[int]:
+    try:
+        fds = os.listdir(f"/proc/{pid}/fd")
+    except OSError:
+        return None
+    count = 0
+    for fd in fds:
+        try:
+            if os.readlink(f"/proc/{pid}/fd/{fd}").startswith("socket:"):
+                count += 1
+        except OSError:
+            continue
+    return count
+
+
+def _read_tcp_table() -> Optional[Dict[str, int]]:
+    """Box-wide TIME_WAIT sockets and queued-but-unsent bytes from /proc/net/tcp{,6}."""
+    time_wait = 0
+    send_queue = 0
+    found = False
+    for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(table) as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    if fields[3] == _TCP_TIME_WAIT:
+                        time_wait += 1
+                    send_queue += int(fields[4].split(":")[0], 16)
+            found = True
+        except OSError:
+            continue
+    if not found:
+        return None
+    return {"time_wait_sockets": time_wait, "send_queue_bytes": send_queue}
+
+
+def _is_java(pid: int) -> bool:
+    """True if a process runs a JVM (the jmeter launcher script itself is not one)."""
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).name() == "java"
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return False
+    try:
+        with open(f"/proc/{pid}/comm") as f:
+            return f.read().strip() == "java"
+    except OSError:
+        return False
+
+
+def _read_jvm_gc_seconds(jstat: str, pid: int) -> Optional[float]:
+    """Total GC time of a JVM so far (GCT column of jstat -gcutil), in seconds."""
+    try:
+        output = subprocess.run([jstat, "-gcutil", str(pid)], capture_output=True, text=True,
+                                timeout=5).stdout.split("\n")
+        values = dict(zip(output[0].split(), output[1].split()))
+        return float(values["GCT"])
+    except (OSError, subprocess.TimeoutExpired, IndexError, KeyError, ValueError):
+        return None
+
+
+class ClientMonitor:
+    """
+    Background sampler of the load generator's resources.
+
+    Watches the current process (Python engine) or another pid and its children
+    (JMeter). Scheduler
+    lag is how late the sampling thread wakes up: in-process it includes GIL
+    contention, for an external process it shows run-queue pressure on the box.
+    TIME_WAIT sockets and unsent bytes come from the kernel's TCP table and cover
+    the whole box, not only the watched processes. GC time is the share of wall
+    time the watched JVMs spent collecting since the previous sample.
+    """
+
+    def __init__(
+        self,
+        output_file: str,
+        pid: Optional[int] = None,
+        interval: float = 1.0,
+        backlog: Optional[Callable[[], int]] = None
+    ):
+        """
+        Initialize the monitor.
+
+        Args:
+            output_file: CSV file the samples are written to
+            pid: Process to watch (defaults to the current process)
+            interval: Seconds between samples
+            backlog: Optional callable returning the number of requests that are due
+                but not yet sent (provided by the Python engine)
+        """
+        self.output_file = output_file
+        self.pid = pid or os.getpid()
+        self.interval = interval
+        self.backlog = backlog
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.count = 0
+
+        self.process = psutil.Process(self.pid) if psutil is not None else None
+        self._last_cpu = None
+        self._last_system = None
+        self._last_gc = None
+        self._jstat = shutil.which("jstat")
+
+    def _pids(self) -> List[int]:
+        """The watched process and its descendants (the jmeter script runs java as a child)."""
+        if self.process is not None:
+            try:
+                return [self.pid] + [child.pid for child in self.process.children(recursive=True)]
+            except psutil.NoSuchProcess:
+                return []
+        pids = []
+        pending = [self.pid]
+        while pending:
+            pid = pending.pop()
+            pids.append(pid)
+            try:
+                with open(f"/proc/{pid}/task/{pid}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+            except OSError:
+                continue
+        return pids
+
+    def _cpu_seconds(self, pid: int) -> Optional[float]:
+        if psutil is not None:
+            try:
+                times = psutil.Process(pid).cpu_times()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                return None
+            return times.user + times.system
+        cpu = _read_proc_cpu_seconds(pid)
+        if cpu is None and pid == os.getpid():
+            times = os.times()
+            cpu = times.user + times.system
+        return cpu
+
+    def _rss(self, pid: int) -> Optional[float]:
+        if psutil is not None:
+            try:
+                return psutil.Process(pid).memory_info().rss / (1024 * 1024)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                return None
+        return _read_proc_rss_mb(pid)
+
+    def _sockets(self, pid: int) -> Optional[int]:
+        if psutil is not None:
+            try:
+                process = psutil.Process(pid)
+                # net_connections() replaced connections() in psutil 6
+                connections = getattr(process, "net_connections", None) or process.connections
+                return len(connections(kind="inet"))
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        return _count_proc_sockets(pid)
+
+    @staticmethod
+    def _total(values: List[Optional[float]]) -> Optional[float]:
+        known = [v for v in values if v is not None]
+        return sum(known) if known else None
+
+    def _process_cpu_percent(self, now: float, pids: List[int]) -> Optional[float]:
+        """CPU used by the process tree since the last sample, in % of one core."""
+        cpu = self._total([self._cpu_seconds(pid) for pid in pids])
+        if cpu is None:
+            return None
+        last, self._last_cpu = self._last_cpu, (now, cpu)
+        if last is None or now <= last[0]:
+            return 0.0
+        # A child that exited takes its CPU time along; never report a negative share
+        return max(0.0, 100.0 * (cpu - last[1]) / (now - last[0]))
+
+    def _system_cpu_percent(self) -> Optional[float]:
+        if psutil is not None:
+            return psutil.cpu_percent()
+        times = _read_system_cpu_times()
+        if times is None:
+            return None
+        last, self._last_system = self._last_system, times
+        if last is None or times[1] <= last[1]:
+            return 0.0
+        return 100.0 * (times[0] - last[0]) / (times[1] - last[1])
+
+    def _gc_time_percent(self, now: float, pids: List[int]) -> Optional[float]:
+        """Wall time spent in JVM GC since the last sample, in %."""
+        if self._jstat is None:
+            return None
+        gc = self._total([_read_jvm_gc_seconds(self._jstat, pid) for pid in pids if _is_java(pid)])
+        if gc is None:
+            return None
+        last, self._last_gc = self._last_gc, (now, gc)
+        if last is None or now <= last[0]:
+            return 0.0
+        return max(0.0, 100.0 * (gc - last[1]) / (now - last[0]))
+
+    def sample(self, scheduler_lag: float) -> Dict:
+        """Take one sample of every metric (None where unavailable)."""
+        now = time.time()
+        pids = self._pids()
+        tcp = _read_tcp_table() or {}
+        return {
+            "timestamp": int(now * 1000),
+            "process_cpu_percent": self._process_cpu_percent(now, pids),
+            "system_cpu_percent": self._system_cpu_percent(),
+            "rss_mb": self._total([self._rss(pid) for pid in pids]),
+            "scheduler_lag_ms": scheduler_lag * 1000,
+            "open_sockets": self._total([self._sockets(pid) for pid in pids]),
+            "time_wait_sockets": tcp.get("time_wait_sockets"),
+            "send_queue_bytes": tcp.get("send_queue_bytes"),
+            "gc_time_percent": self._gc_time_percent(now, pids),
+            "schedule_backlog": self.backlog() if self.backlog else None
+        }
+
+    def run(self):
+        """Sample until stopped or the watched process exits."""
+        with open(self.output_file, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=CLIENT_FIELDS)
+            writer.writeheader()
+            # Prime the CPU counters so the first written sample covers one interval
+            self.sample(0.0)
+
+            expected = time.perf_counter() + self.interval
+            while not self.stop_event.wait(max(0.0, expected - time.perf_counter())):
+                lag = max(0.0, time.perf_counter() - expected)
+                if not pid_alive(self.pid):
+                    break
+                row = self.sample(lag)
+                writer.writerow({k: "" if v is None else round(v, 1) for k, v in row.items()})
+                f.flush()
+                self.count += 1
+                expected += self.interval
+                if expected < time.perf_counter():
+                    expected = time.perf_counter() + self.interval
+
+    def start(self) -> "ClientMonitor":
+        """Start sampling in a background thread."""
+        self.thread = threading.Thread(target=self.run, name="client-monitor", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop sampling and wait for the file to be closed."""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+
+
+def read_client_samples(filename: str) -> List[Dict]:
+    """Load client samples, with missing metrics as None."""
+    samples = []
+    with open(filename, newline="") as f:
+        for row in csv.DictReader(f):
+            samples.append({k: float(v) if v not in ("", None) else None for k, v in row.items()})
+    return samples
+
+
+def evaluate_saturation(
+    samples: List[Dict],
+    thresholds: Optional[Dict[str, float]] = None,
+    tolerance: float = TOLERANCE
+) -> Dict[str, Dict]:
+    """
+    Compare client samples against saturation thresholds.
+
+    Args:
+        samples: Rows as returned by read_client_samples
+        thresholds: Limit per metric (defaults to DEFAULT_THRESHOLDS)
+        tolerance: Share of samples allowed above a limit before it counts as a violation
+
+    Returns:
+        Mapping of metric to {"limit", "max", "over", "share", "violated"}
+    """
+    thresholds = thresholds or DEFAULT_THRESHOLDS
+    report = {}
+    for metric, limit in thresholds.items():
+        values = [s[metric] for s in samples if s.get(metric) is not None]
+        if not values:
+            continue
+        over = sum(1 for v in values if v > limit)
+        share = over / len(values)
+        report[metric] = {
+            "limit": limit,
+            "max": max(values),
+            "over": over,
+            "share": share,
+            "violated": share > tolerance
+        }
+    return report
+
+
+def print_saturation_report(report: Dict[str, Dict], samples: int) -> bool:
+    """
+    Print the saturation check.
+
+    Returns:
+        True if the run is valid (no threshold violated)
+    """
+    print(f"\nClient saturation check ({samples} samples)")
+    print("-" * 70)
+    print(f"{'metric':<22} {'limit':>10} {'max':>12} {'over limit':>12}")
+    for metric, result in report.items():
+        mark = "✗" if result["violated"] else "✓"
+        print(f"{metric:<22} {result['limit']:>10.0f} {result['max']:>12.1f} "
+              f"{result['share'] * 100:>10.1f}%  {mark}")
+
+    violated = [metric for metric, result in report.items() if result["violated"]]
+    if violated:
+        print(f"✗ RUN INVALID: load generator saturated ({', '.join(violated)}). "
+              f"Latency is partly client-side; use fewer threads per box or more boxes.")
+        return False
+    print("✓ Load generator stayed below saturation thresholds")
+    return True
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Monitor or check load generator saturation")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    watch = subparsers.add_parser("watch", help="Sample a process until it exits")
+    watch.add_argument("--pid", type=int, required=True, help="Process to watch (e.g. JMeter)")
+    watch.add_argument("-o", "--output", required=True, help="Client samples CSV")
+    watch.add_argument("--interval", type=float, default=1.0, help="Seconds between samples (default: 1)")
+
+    check = subparsers.add_parser("check", help="Flag a run whose client samples exceed thresholds")
+    check.add_argument("samples", help="Client samples CSV")
+    check.add_argument("--tolerance", type=float, default=TOLERANCE,
+                       help=f"Share of samples allowed over a limit (default: {TOLERANCE})")
+    for metric, limit in DEFAULT_THRESHOLDS.items():
+        check.add_argument(f"--max-{metric.replace('_', '-')}", dest=metric, type=float, default=limit,
+                           help=f"Limit for {metric} (default: {limit:g})")
+    args = parser.parse_args()
+
+    if args.command == "watch":
+        monitor = ClientMonitor(args.output, pid=args.pid, interval=args.interval)
+        try:
+            monitor.run()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    samples = read_client_samples(args.samples)
+    if not samples:
+        print(f"No client samples in {args.samples}")
+        return 0
+    thresholds = {metric: getattr(args, metric) for metric in DEFAULT_THRESHOLDS}
+    report = evaluate_saturation(samples, thresholds, args.tolerance)
+    return 0 if print_saturation_report(report, len(samples)) else 3
+
+
+if __name__ == "__main__":
+    sys.exit(main())
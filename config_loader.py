@@ -2,13 +2,56 @@
 """
 Configuration loader for environment-specific settings.
 Loads credentials and settings from config/{env}.env files.
+
+load_config() returns a typed, validated EnvConfig that is parsed once per process
+and cached; every entry point resolves environments and base URLs through it.
 """
 
+import copy
+import json
 import os
-from typing import Dict, List, Optional
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
 
 
+CONFIG_DIR = Path(__file__).parent / "config"
+
+# Default base URL per environment; BASE_URL in config/{env}.env overrides it
+ENVIRONMENTS = {
+    "local": "http://api-proxy:8000",
+    "dev": "https://dy-dev.fourkites.com",
+    "qat": "https://dy-qat.fourkites.com",
+    "stress": "https://dy-stress.fourkites.com",
+    "staging": "https://dy-staging.fourkites.com",
+    "prod": "https://dy.fourkites.com"
+}
+
+REQUIRED_KEYS = ["BASE_URL", "KEYCLOAK_ADMIN", "KEYCLOAK_PASSWORD", "USER_EMAIL", "USER_PASSWORD", "TENANTS"]
+
+
+@lru_cache(maxsize=None)
+def _parse_env_file(path: str) -> Tuple[Tuple[str, str], ...]:
+    """Parse a KEY=value file once per process (empty if the file does not exist)."""
+    if not os.path.exists(path):
+        return ()
+
+    entries = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            # Skip comments and empty lines
+            if not line or line.startswith('#'):
+                continue
+
+            # Parse key=value pairs
+            if '=' in line:
+                key, value = line.split('=', 1)
+                entries.append((key.strip(), value.strip()))
+    return tuple(entries)
+
+
 class ConfigLoader:
     """Load environment-specific configuration from .env files."""
     
@@ -25,17 +68,7 @@ class ConfigLoader:
             print(f"Warning: Configuration file not found: {self.config_file}")
             return
         
-        with open(self.config_file, 'r') as f:
-            for line in f:
-                line = line.strip()
-                # Skip comments and empty lines
-                if not line or line.startswith('#'):
-                    continue
-                
-                # Parse key=value pairs
-                if '=' in line:
-                    key, value = line.split('=', 1)
-                    self.config[key.strip()] = value.strip()
+        self.config.update(_parse_env_file(str(self.config_file)))
     
     def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
         """Get configuration value by key."""
@@ -61,6 +94,14 @@ class ConfigLoader:
         """Get test user password."""
         return self.config.get("USER_PASSWORD", "")
     
+    def get_exchange_client_id(self) -> str:
+        """Get optional token exchange client id."""
+        return self.config.get("EXCHANGE_CLIENT_ID", "")
+    
+    def get_exchange_client_secret(self) -> str:
+        """Get optional token exchange client secret."""
+        return self.config.get("EXCHANGE_CLIENT_SECRET", "")
+    
     def get_tenants(self) -> List[str]:
         """Get list of tenants to test."""
         tenants_str = self.config.get("TENANTS", "")
@@ -70,9 +111,7 @@ class ConfigLoader:
     
     def is_configured(self) -> bool:
         """Check if environment is properly configured."""
-        required = ["BASE_URL", "KEYCLOAK_ADMIN", "KEYCLOAK_PASSWORD", 
-                   "USER_EMAIL", "USER_PASSWORD", "TENANTS"]
-        return all(self.config.get(key) for key in required)
+        return all(self.config.get(key) for key in REQUIRED_KEYS)
     
     def print_config(self, hide_passwords: bool = True):
         """Print current configuration (with optional password hiding)."""
@@ -81,7 +120,7 @@ class ConfigLoader:
         print("-" * 50)
         
         for key, value in self.config.items():
-            if hide_passwords and "PASSWORD" in key and value:
+            if hide_passwords and ("PASSWORD" in key or "SECRET" in key) and value:
                 value = "*" * 8
             print(f"{key}: {value}")
         
@@ -90,31 +129,115 @@ class ConfigLoader:
             print("Please update the config file with appropriate values.")
 
 
-def get_env_config(environment: str) -> Dict[str, any]:
+@dataclass(frozen=True)
+class EnvConfig:
+    """Typed, immutable configuration of one environment (safe to share across threads)."""
+    environment: str
+    base_url: str
+    keycloak_admin: str = ""
+    keycloak_password: str = ""
+    user_email: str = ""
+    user_password: str = ""
+    tenants: Tuple[str, ...] = ()
+    exchange_client_id: str = ""
+    exchange_client_secret: str = ""
+    config_file: Optional[str] = None
+
+    @property
+    def is_configured(self) -> bool:
+        """True if credentials and tenants are set (the base URL always has a default)."""
+        return bool(self.keycloak_admin and self.keycloak_password and self.user_email
+                    and self.user_password and self.tenants)
+
+    def problems(self) -> List[str]:
+        """Validation errors, empty if the configuration is usable."""
+        problems = []
+        if not self.base_url.startswith(("http://", "https://")):
+            problems.append(f"BASE_URL must start with http:// or https://, got {self.base_url!r}")
+        if self.config_file is None:
+            problems.append(f"No config file for {self.environment} (expected {CONFIG_DIR / (self.environment + '.env')})")
+        for key in REQUIRED_KEYS[1:]:
+            if not getattr(self, key.lower()):
+                problems.append(f"{key} is not set")
+        if bool(self.exchange_client_id) != bool(self.exchange_client_secret):
+            problems.append("EXCHANGE_CLIENT_ID and EXCHANGE_CLIENT_SECRET must be set together")
+        return problems
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Legacy ENV_CONFIG-style dictionary (a fresh copy on every call)."""
+        config = asdict(self)
+        config["tenants"] = list(self.tenants)
+        del config["environment"], config["config_file"]
+        return config
+
+
+@lru_cache(maxsize=None)
+def load_config(environment: str) -> EnvConfig:
+    """
+    Load the configuration of an environment, parsed once per process.
+
+    Values come from config/{env}.env; the base URL falls back to ENVIRONMENTS.
+
+    Raises:
+        ValueError: If the environment is neither known nor has a config file
+    """
+    environment = environment.lower()
+    config_file = CONFIG_DIR / f"{environment}.env"
+    values = dict(_parse_env_file(str(config_file)))
+    if environment not in ENVIRONMENTS and not values:
+        raise ValueError(f"Unknown environment: {environment}. Must be one of {list_environments()}")
+
+    tenants = values.get("TENANTS", "")
+    return EnvConfig(
+        environment=environment,
+        base_url=(values.get("BASE_URL") or ENVIRONMENTS.get(environment, "")).rstrip("/"),
+        keycloak_admin=values.get("KEYCLOAK_ADMIN", ""),
+        keycloak_password=values.get("KEYCLOAK_PASSWORD", ""),
+        user_email=values.get("USER_EMAIL", ""),
+        user_password=values.get("USER_PASSWORD", ""),
+        tenants=tuple(t.strip() for t in tenants.split(",") if t.strip()),
+        exchange_client_id=values.get("EXCHANGE_CLIENT_ID", ""),
+        exchange_client_secret=values.get("EXCHANGE_CLIENT_SECRET", ""),
+        config_file=str(config_file) if values else None
+    )
+
+
+def get_base_url(environment: str) -> str:
+    """Base URL of an environment (config file value or the ENVIRONMENTS default)."""
+    return load_config(environment).base_url
+
+
+def get_env_config(environment: str) -> Dict[str, Any]:
     """
     Get environment configuration as a dictionary.
     Compatible with the existing ENV_CONFIG structure.
     """
-    loader = ConfigLoader(environment)
-    
-    return {
-        "base_url": loader.get_base_url(),
-        "keycloak_admin": loader.get_keycloak_admin(),
-        "keycloak_password": loader.get_keycloak_password(),
-        "user_email": loader.get_user_email(),
-        "user_password": loader.get_user_password(),
-        "tenants": loader.get_tenants()
-    }
+    return load_config(environment).as_dict()
+
+
+@lru_cache(maxsize=None)
+def _parse_json_file(path: str) -> Dict:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def load_json_config(path: str) -> Dict:
+    """
+    Load a JSON configuration file (e.g. the multi-user config), parsed once per process.
+
+    Returns a copy, so callers may modify it without affecting the cached parse.
+
+    Raises:
+        OSError: If the file cannot be read
+        json.JSONDecodeError: If the file is not valid JSON
+    """
+    return copy.deepcopy(_parse_json_file(os.path.abspath(path)))
 
 
 def list_environments() -> List[str]:
-    """List all available environment configurations."""
-    config_dir = Path(__file__).parent / "config"
-    if not config_dir.exists():
-        return []
-    
-    env_files = config_dir.glob("*.env")
-    return [f.stem for f in env_files]
+    """List all known environments: the built-in ones plus any config/{env}.env file."""
+    env_files = CONFIG_DIR.glob("*.env") if CONFIG_DIR.exists() else []
+    return sorted(set(ENVIRONMENTS) | {f.stem for f in env_files})
 
 
 if __name__ == "__main__":
@@ -126,10 +249,13 @@ if __name__ == "__main__":
         loader = ConfigLoader(env)
         loader.print_config()
         
-        if loader.is_configured():
+        problems = load_config(env).problems()
+        if not problems:
             print(f"\n✓ Environment {env} is properly configured")
         else:
-            print(f"\n✗ Environment {env} needs configuration updates")
+            print(f"\n✗ Environment {env} needs configuration updates:")
+            for problem in problems:
+                print(f"  - {problem}")
     else:
         print("Available environments:")
         for env in list_environments():
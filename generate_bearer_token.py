@@ -12,19 +12,16 @@ import secrets
 from typing import Optional, Dict
 import json
 
+import profiling
+from config_loader import ENVIRONMENTS, get_base_url
+from token_introspection import decode_token
+
 
 class BearerTokenGenerator:
     """Handles bearer token generation for YMS authentication."""
     
-    # Environment URLs
-    ENVIRONMENTS = {
-        "local": "http://api-proxy:8000",
-        "dev": "https://dy-dev.fourkites.com",
-        "qat": "https://dy-qat.fourkites.com",
-        "stress": "https://dy-stress.fourkites.com",
-        "staging": "https://dy-staging.fourkites.com",
-        "prod": "https://dy.fourkites.com"
-    }
+    # Environment URLs (defaults; BASE_URL in config/{env}.env overrides them)
+    ENVIRONMENTS = ENVIRONMENTS
     
     def __init__(self, environment: str = "stress"):
         """
@@ -36,7 +33,7 @@ class BearerTokenGenerator:
         if environment not in self.ENVIRONMENTS:
             raise ValueError(f"Invalid environment: {environment}. Must be one of {list(self.ENVIRONMENTS.keys())}")
         
-        self.base_url = self.ENVIRONMENTS[environment]
+        self.base_url = get_base_url(environment)
         self.session = requests.Session()
         
         # Configure URLs
@@ -73,8 +70,10 @@ class BearerTokenGenerator:
         Returns:
             Bearer token string if successful, None otherwise
         """
+        steps = profiling.StepSpans("saml", user=username)
         try:
             # Step 1: Get the login form
+            steps.step("1 login form")
             print(f"Step 1: Fetching login form...")
             response = self.session.get(self.login_url, headers=self.headers)
             if response.status_code != 200:
@@ -82,6 +81,7 @@ class BearerTokenGenerator:
                 return None
             
             # Step 2: Get the Keycloak auth URL
+            steps.step("2 keycloak auth")
             print(f"Step 2: Initializing Keycloak authentication...")
             auth_params = {
                 "client_id": "ymsui",
@@ -98,6 +98,7 @@ class BearerTokenGenerator:
                 return None
             
             # Step 3: Login with credentials
+            steps.step("3 credentials")
             print(f"Step 3: Logging in with credentials...")
             login_data = {
                 "username": username,
@@ -138,6 +139,7 @@ class BearerTokenGenerator:
                             self.session.cookies.set(key, value, domain='.fourkites.com')
             
             # Step 4: Extract SAML data
+            steps.step("4 saml response")
             print(f"Step 4: Processing SAML response...")
             relay_state_match = re.search(r'name="RelayState"\s+value="([^"]+)"', login_response.text)
             saml_response_match = re.search(r'name="SAMLResponse"\s+value="([^"]+)"', login_response.text)
@@ -150,6 +152,7 @@ class BearerTokenGenerator:
             saml_response = saml_response_match.group(1)
             
             # Step 5: Submit SAML response
+            steps.step("5 submit saml")
             print(f"Step 5: Submitting SAML response...")
             saml_data = {
                 "RelayState": relay_state,
@@ -187,6 +190,7 @@ class BearerTokenGenerator:
             code = code_match.group(1).strip()
             
             # Step 7: Exchange code for token
+            steps.step("6 code exchange")
             print(f"Step 6: Exchanging authorization code for token...")
             token_data = {
                 "code": code,
@@ -215,26 +219,21 @@ class BearerTokenGenerator:
                 print("=" * 60)
                 
                 # Decode the JWT to check tenant assignment
-                import base64
-                parts = access_token.split('.')
-                if len(parts) == 3:
-                    try:
-                        payload_encoded = parts[1]
-                        payload_padding = payload_encoded + '=' * (4 - len(payload_encoded) % 4)
-                        payload = json.loads(base64.urlsafe_b64decode(payload_padding))
-                        
-                        print(f"Tenant ID in token: {payload.get('tenant_id', 'NOT FOUND')}")
-                        print(f"User: {payload.get('preferred_username', 'N/A')}")
-                        print(f"Subject ID: {payload.get('sub', 'N/A')}")
-                        print(f"Client: {payload.get('azp', 'N/A')}")
-                        
-                        # Check if tenant was in any response headers
-                        print("\nResponse Headers:")
-                        for key, value in token_response.headers.items():
-                            if 'tenant' in key.lower():
-                                print(f"  {key}: {value}")
-                    except Exception as e:
-                        print(f"Failed to decode token for debug: {e}")
+                try:
+                    payload = decode_token(access_token).payload
+                    
+                    print(f"Tenant ID in token: {payload.get('tenant_id', 'NOT FOUND')}")
+                    print(f"User: {payload.get('preferred_username', 'N/A')}")
+                    print(f"Subject ID: {payload.get('sub', 'N/A')}")
+                    print(f"Client: {payload.get('azp', 'N/A')}")
+                    
+                    # Check if tenant was in any response headers
+                    print("\nResponse Headers:")
+                    for key, value in token_response.headers.items():
+                        if 'tenant' in key.lower():
+                            print(f"  {key}: {value}")
+                except Exception as e:
+                    print(f"Failed to decode token for debug: {e}")
             
             if access_token:
                 print("Successfully obtained bearer token!")
@@ -246,6 +245,8 @@ class BearerTokenGenerator:
         except Exception as e:
             print(f"Error generating token: {str(e)}")
             return None
+        finally:
+            steps.end()
     
     def generate_and_save_tokens(self, credentials: Dict[str, Dict[str, str]], output_file: str = "bearer_tokens.json"):
         """
@@ -286,7 +287,7 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description='Generate bearer tokens for YMS Dashboard Service')
-    parser.add_argument('environment', choices=['local', 'dev', 'qat', 'stress', 'staging', 'prod'],
+    parser.add_argument('environment', choices=list(ENVIRONMENTS),
                         help='Target environment')
     parser.add_argument('username', help='User email address')
     parser.add_argument('password', help='User password')
@@ -1,12 +1,19 @@
 import csv
-import itertools
 import requests
 import sys
 import json
 import os
-from typing import Dict
-
-from config_loader import get_env_config
+from dataclasses import asdict
+from datetime import date
+from typing import Dict, Optional
+
+import profiling
+from config_loader import ENVIRONMENTS, get_base_url, get_env_config, load_config
+from payload_generators import CARRIER_SUBSET_MODES, CarrierSubsetSampler, ForecastWindowGenerator
+from run_manifest import RunManifest, StageCache, hash_file, hash_inputs, manifest_file_for, source_version
+from scenario_sampler import IdentityPool, identities_file_for
+from scenario_store import store_file_for, write_scenario_store
+from token_introspection import seconds_until_expiry
 
 # ==============================================================================
 # 1. DEFINE YOUR TENANT-SPECIFIC DATA
@@ -18,12 +25,8 @@ from config_loader import get_env_config
 # - Replace the placeholder values with actual IDs and tokens.
 
 
-LOCAL = "http://api-proxy:8000"
-DEV = "https://dy-dev.fourkites.com"
-QAT = "https://dy-qat.fourkites.com"
-STRESS = "https://dy-stress.fourkites.com"
-STAGING = "https://dy-staging.fourkites.com"
-PROD = "https://dy.fourkites.com"
+# Environment being generated for; set by the command line before any API call
+ENVIRONMENT = None
 
 
 # Tokens will be populated dynamically based on environment
@@ -41,67 +44,39 @@ THRESHOLD_HOURS = [12, 24, 48, 72]
 # ==============================================================================
 HEADER = [
     "api_endpoint", "tenantName", "facilityId", "authToken", "activeUsers", "rpmPerUser",
-    "rampUpSeconds", "payload"
+    "rampUpSeconds", "payload", "weight", "carrierCount"
 ]
 
+# Weight given to the facility-level endpoints relative to trailer-overview and
+# shipment-volume-forecast rows. Rows are written once; this only scales the weight column.
 COUNTER = 1
 
-def get_host_details():
-    # accept a argument env which can be dev, local, qat, stress, staging, prod
-    if len(sys.argv) < 2:
-        print("Usage: python generate_exhaustive_data.py <env>")
-        sys.exit(1)
-    env = sys.argv[1].lower()
-    if env == "local":
-        return LOCAL
-    elif env == "dev":
-        return DEV
-    elif env == "qat":
-        return QAT
-    elif env == "stress":
-        return STRESS
-    elif env == "staging":
-        return STAGING
-    elif env == "prod":
-        return PROD
-    """
-    Add logic to fetch the host details based on the environment.
-    This could involve reading from a configuration file or environment variables.
-    """
-    return LOCAL  # Default to local if no valid environment is provided
-
-HOST = get_host_details()
-
-# Import configuration loader
-try:
-    USE_ENV_FILES = True
-except ImportError:
-    USE_ENV_FILES = False
-    print("Warning: config_loader not found. Using legacy configuration.")
-
+def get_host() -> str:
+    """Base URL of the target environment, resolved on first use (cached by config_loader)."""
+    return get_base_url(ENVIRONMENT or "local")
 
 def get_config_for_env(env: str) -> dict:
-    """Get configuration for environment, preferring .env files over hardcoded."""
-    # Try to load from .env file first
-    if USE_ENV_FILES:
-        try:
-            env_config = get_env_config(env)
-            if env_config and env_config.get("keycloak_admin"):
-                print(f"✓ Loaded configuration from config/{env}.env")
-                return env_config
-        except Exception as e:
-            print(f"Could not load config/{env}.env: {e}")
+    """Get configuration for environment from its config/{env}.env file."""
+    try:
+        env_config = get_env_config(env)
+        if env_config and env_config.get("keycloak_admin"):
+            print(f"✓ Loaded configuration from config/{env}.env")
+            return env_config
+    except Exception as e:
+        print(f"Could not load config/{env}.env: {e}")
     
     print(f"No configuration found for environment: {env}")
     return {}
 
-def refresh_tokens_for_environment(env: str, force_refresh: bool = False) -> Dict[str, str]:
+def refresh_tokens_for_environment(env: str, force_refresh: bool = False, fast: bool = False) -> Dict[str, str]:
     """
     Refresh tokens for all tenants in the given environment using Keycloak Admin API.
     
     Args:
         env: Environment name (qat, staging, dev, etc.)
         force_refresh: If True, always generate new tokens. If False, only generate if needed.
+        fast: Mint via token exchange / impersonation (falls back to the SAML login per
+            tenant); impersonation leaves a Keycloak SSO session behind per tenant
     
     Returns:
         Dictionary mapping tenant_id to bearer token
@@ -128,14 +103,19 @@ def refresh_tokens_for_environment(env: str, force_refresh: bool = False) -> Dic
         from keycloak_admin_token_generator import KeycloakAdminTokenGenerator
         
         print(f"\nGenerating fresh tokens for {env} environment...")
-        generator = KeycloakAdminTokenGenerator(env)
+        generator = KeycloakAdminTokenGenerator(
+            env,
+            exchange_client_id=config.get("exchange_client_id") or None,
+            exchange_client_secret=config.get("exchange_client_secret") or None
+        )
         
         tokens = generator.generate_tokens_for_all_tenants(
             config["keycloak_admin"],
             config["keycloak_password"],
             config["user_email"],
             config["user_password"],
-            config["tenants"]
+            config["tenants"],
+            fast=fast
         )
         
         # Update global TENANTS_AUTH_TOKEN
@@ -226,12 +206,13 @@ def load_tokens_from_file(env: str) -> bool:
     return False
 
 
+@profiling.traced("discovery: carriers", "network")
 def get_carrier_data_for_tenant(tenant_name, bearer_token):
     """
     Fetches the carrier data for a given tenant using the provided bearer token.
     This function should make an API call to retrieve the carrier IDs.
     """ 
-    url = f"{HOST}/api/v1/carriers/"
+    url = f"{get_host()}/api/v1/carriers/"
     # call the api and get the data
     # This is a placeholder for the actual API call logic.
     # You would typically use requests or another HTTP library to make the call.
@@ -245,12 +226,13 @@ def get_carrier_data_for_tenant(tenant_name, bearer_token):
         raise Exception(f"Failed to fetch carrier data for tenant {tenant_name}: {response.status_code}")
 
 
+@profiling.traced("discovery: sites", "network")
 def get_licensed_facility_ids_for_tenant(tenant_name, bearer_token):
     """
     Fetches the licensed facility IDs for a given tenant using the provided bearer token.
     This function should make an API call to retrieve the facility IDs.
     """
-    url = f"{HOST}/api/v1/sites/"
+    url = f"{get_host()}/api/v1/sites/"
     # call the api and get the data
     # This is a placeholder for the actual API call logic.
     response = requests.get(url, headers={"Authorization": bearer_token})
@@ -263,12 +245,15 @@ def get_licensed_facility_ids_for_tenant(tenant_name, bearer_token):
 
 
 
-def prepare_tenant_data():
+@profiling.traced("discovery", "network")
+def discover_tenants():
     """
-    Prepares the tenant data by fetching facility and carrier IDs.
-    This function should be called before generating the exhaustive CSV.
+    Fetches the licensed facility IDs and carrier IDs of every tenant with a token.
+
+    Returns:
+        Discovery snapshot: tenant -> {"facility_ids": [...], "carrier_ids": [...]}
     """
-    TENANT_DATA = {}
+    snapshot = {}
     for tenant in TENANTS_AUTH_TOKEN:
         bearer_token = TENANTS_AUTH_TOKEN[tenant]
         facility_ids = get_licensed_facility_ids_for_tenant(tenant, bearer_token)
@@ -280,22 +265,206 @@ def prepare_tenant_data():
         if not carrier_ids:
             print(f"No carriers found for tenant: {tenant}. Skipping...")
 
-        TENANT_DATA[tenant] = {
+        snapshot[tenant] = {
             "facility_ids": facility_ids,
-            "carrier_ids": carrier_ids,
-            "auth_token": bearer_token
+            "carrier_ids": carrier_ids
         }
 
-    return TENANT_DATA
+    return snapshot
+
+
+def prepare_tenant_data(snapshot=None):
+    """
+    Prepares the tenant data: facility and carrier IDs plus each tenant's token.
+    This function should be called before generating the exhaustive CSV.
+
+    Args:
+        snapshot: Discovery snapshot to use instead of calling the API (see discover_tenants)
+    """
+    if snapshot is None:
+        snapshot = discover_tenants()
+    return {
+        tenant: {**data, "auth_token": TENANTS_AUTH_TOKEN[tenant]}
+        for tenant, data in snapshot.items()
+        if tenant in TENANTS_AUTH_TOKEN
+    }
+
+
+def discovery_file_for(env: str) -> str:
+    """Path of the discovery snapshot of an environment."""
+    return f"discovery/{env}.json"
+
+
+# Seconds reused tokens must outlive the planned run by (generation itself takes minutes)
+TOKEN_VALIDITY_MARGIN = 600
+
+
+def tokens_valid_for(seconds: float) -> bool:
+    """True if every loaded token outlives `seconds` (tokens without exp claim never expire)."""
+    try:
+        remaining = [seconds_until_expiry(token) for token in TENANTS_AUTH_TOKEN.values()]
+    except ValueError:
+        return False
+    return bool(remaining) and all(r is None or r > seconds for r in remaining)
+
+
+@profiling.traced("tokens")
+def resolve_tokens(env: str, cache: Optional[StageCache], manifest: RunManifest, min_validity: float,
+                   fast: bool = False):
+    """
+    Token stage: reuse tokens/{env}.json while it covers the configured tenants and every
+    token outlives `min_validity` seconds, otherwise mint fresh ones.
+
+    Without a cache, tokens are loaded from file and only minted when there is none.
+    `fast` mints through token exchange / impersonation (see refresh_tokens_for_environment).
+    """
+    token_file = f"tokens/{env}.json"
+    # Credentials are part of the key, but only as a hash
+    config = load_config(env)
+    inputs = {"env": env, "config": hash_inputs(asdict(config))}
+
+    if cache is None:
+        if not load_tokens_from_file(env):
+            print(f"No cached tokens found. Generating fresh tokens for {env}...")
+            refresh_tokens_for_environment(env, force_refresh=True, fast=fast)
+    else:
+        entry = cache.lookup("tokens", inputs)
+        if entry and not os.path.exists(token_file):
+            cache.restore(entry)
+        if (load_tokens_from_file(env) and set(config.tenants) <= set(TENANTS_AUTH_TOKEN)
+                and tokens_valid_for(min_validity)):
+            cached = bool(entry) and hash_file(token_file) == entry["outputs"].get(token_file)
+            if not cached:
+                # No entry for this configuration yet, or the token file was refreshed
+                # outside this script: adopt the valid file instead of minting again
+                entry = cache.store("tokens", inputs, [token_file])
+            manifest.add_stage("tokens", inputs, entry["outputs"], cached=cached)
+            print(f"✓ Reusing tokens from {token_file} (valid for more than {min_validity / 60:.0f} min)")
+            return
+
+        print(f"No tokens for every configured tenant, or they expire soon. Generating fresh tokens for {env}...")
+        refresh_tokens_for_environment(env, force_refresh=True, fast=fast)
+        if not TENANTS_AUTH_TOKEN:
+            load_tokens_from_file(env)
+
+    if os.path.exists(token_file):
+        outputs = cache.store("tokens", inputs, [token_file])["outputs"] if cache else {token_file: hash_file(token_file)}
+        manifest.add_stage("tokens", inputs, outputs, cached=False)
 
 
-def generate_exhaustive_csv(filename="test_data.csv"):
-    """Generates an exhaustive CSV for all API payload combinations."""
+def resolve_discovery(env: str, cache: Optional[StageCache], manifest: RunManifest, max_age: float) -> Dict:
+    """
+    Discovery stage: reuse the facility/carrier snapshot of the same tenants and base URL
+    if it is younger than `max_age` seconds, otherwise call the API.
+
+    Returns:
+        Discovery snapshot (see discover_tenants)
+    """
+    discovery_file = discovery_file_for(env)
+    inputs = {"env": env, "base_url": get_host(), "tenants": sorted(TENANTS_AUTH_TOKEN)}
+
+    entry = cache.lookup("discovery", inputs, max_age=max_age) if cache else None
+    cached = entry is not None
+    if cached:
+        cache.restore(entry)
+        with open(discovery_file) as f:
+            snapshot = json.load(f)
+        print(f"✓ Reusing discovery snapshot {discovery_file} ({len(snapshot)} tenants)")
+    else:
+        snapshot = discover_tenants()
+        os.makedirs(os.path.dirname(discovery_file), exist_ok=True)
+        with open(discovery_file, "w") as f:
+            json.dump(snapshot, f, indent=2, sort_keys=True)
+        if cache:
+            entry = cache.store("discovery", inputs, [discovery_file])
+
+    outputs = entry["outputs"] if entry else {discovery_file: hash_file(discovery_file)}
+    manifest.add_stage("discovery", inputs, outputs, cached=cached)
+    return snapshot
+
+
+def load_multi_user_identities(env: str, token_file: str = None):
+    """
+    Load the multi-user identities for an environment.
+
+    Tenants without a token of their own get their first identity's token, so data
+    discovery can run for them too.
+
+    Returns:
+        IdentityPool, or None when the token file does not exist
+    """
+    global TENANTS_AUTH_TOKEN
+
+    token_file = token_file or f"tokens/multi_user_{env}_latest.json"
+    if not os.path.exists(token_file):
+        print(f"Multi-user token file not found: {token_file}")
+        return None
+
+    identity_pool = IdentityPool.from_multi_user_tokens(token_file)
+    for tenant, identities in identity_pool.identities.items():
+        TENANTS_AUTH_TOKEN.setdefault(tenant, identities[0]["token"])
+
+    print(f"✓ Loaded identities for {len(identity_pool.identities)} tenants from {token_file}")
+    return identity_pool
+
+
+def add_scenario(scenarios, endpoint, tenant, facility_id, auth_token, payload, weight=1,
+                 carrier_count=""):
+    """
+    Add a scenario to the deduplicated table, merging identical rows into one weight.
+
+    Rows are keyed on everything that reaches the wire, so repeating a scenario only
+    bumps its weight instead of writing the same payload again.
+    """
+    key = (endpoint, tenant, facility_id, auth_token, payload)
+    if key in scenarios:
+        scenarios[key]["weight"] += weight
+    else:
+        scenarios[key] = {
+            "api_endpoint": endpoint, "tenantName": tenant, "facilityId": facility_id,
+            "authToken": auth_token, "payload": payload, "weight": weight,
+            "carrierCount": carrier_count
+        }
+
+
+@profiling.traced("generate", "cpu")
+def generate_exhaustive_csv(filename="test_data.csv", expand_weights=False,
+                            forecast_generator=None, forecast_requests=1,
+                            carrier_sampler=None, carrier_subsets=1,
+                            identity_pool=None, binary=False, tenant_data=None):
+    """
+    Generates a deduplicated scenario table for all API payload combinations.
+
+    Each unique request is written once with an integer ``weight`` column that
+    carries its multiplicity (see ``scenario_sampler.WeightedScenarioSampler``).
+
+    Args:
+        filename: Output CSV path
+        expand_weights: Write each row ``weight`` times with weight 1, for
+            consumers that cannot honor the weight column (plain JMeter CSVDataSet)
+        forecast_generator: ForecastWindowGenerator drawing shipment-volume-forecast
+            windows (defaults to one unique window per facility and direction)
+        forecast_requests: Weight of shipment-volume-forecast rows per facility and
+            direction, split between repeated and unique windows by the generator
+        carrier_sampler: CarrierSubsetSampler choosing the carrierIds sent by the
+            carrier endpoints (defaults to the full tenant carrier list)
+        carrier_subsets: Number of carrier subsets drawn per facility
+        identity_pool: IdentityPool of real user tokens per tenant, written to the
+            ``<name>_identities.json`` sidecar so each virtual user gets its own principal
+        binary: Also write the memory-mapped ``<name>.scn`` store (see ``scenario_store``)
+            for the Python load engine
+        tenant_data: Tenant data from prepare_tenant_data (fetched from the API if omitted)
+    """
+    if forecast_generator is None:
+        forecast_generator = ForecastWindowGenerator()
+    if carrier_sampler is None:
+        carrier_sampler = CarrierSubsetSampler()
     
-    all_rows = []
+    scenarios = {}
 
 
-    tenant_data = prepare_tenant_data()
+    if tenant_data is None:
+        tenant_data = prepare_tenant_data()
     if not tenant_data:
         print("No tenant data available. Please check your tenant configurations.")
         return
@@ -307,6 +476,10 @@ def generate_exhaustive_csv(filename="test_data.csv"):
         # Define common parameter sets
         auth_token = data["auth_token"]
 
+        # Every facility-level weight is scaled by the number of carrier subsets so the
+        # endpoint mix stays the same whatever the subset count
+        subset_weight = COUNTER * carrier_subsets
+
         # --- Endpoints requiring only facilityId ---
         simple_endpoints = [
             "yard-availability", 
@@ -314,106 +487,156 @@ def generate_exhaustive_csv(filename="test_data.csv"):
             "task-attention-summary", 
             "door-breakdown-summary"
         ]
-        for endpoint in simple_endpoints:
-            for facility_id in data["facility_ids"]:
-                payload = json.dumps({"facilityId": facility_id})
-                # add this COUNTER times
-                for _ in range(COUNTER):
-                    all_rows.append({
-                        "api_endpoint": endpoint, "tenantName": tenant, "facilityId": facility_id, 
-                        "authToken": auth_token, "payload": payload
-                    })
-                
+        for facility_id in data["facility_ids"]:
+            payload = json.dumps({"facilityId": facility_id})
+            for endpoint in simple_endpoints:
+                add_scenario(scenarios, endpoint, tenant, facility_id, auth_token,
+                             payload, weight=subset_weight)
 
-        # --- Endpoints requiring facilityId and carrierIds ---
-        carrier_endpoints = [
-            "site-occupancy",
-            "dwell-time-summary",
-            "detention-summary"
-        ]
-        for endpoint in carrier_endpoints:
-            for facility_id in data["facility_ids"]:
-                payload = json.dumps({"facilityId": facility_id, "carrierIds": data["carrier_ids"]})
-                for _ in range(COUNTER):
-                    all_rows.append({
-                        "api_endpoint": endpoint, "tenantName": tenant, "facilityId": facility_id, 
-                        "authToken": auth_token, "payload": payload
-                    })
-
-        # --- Trailer Overview Combinations ---
-        params = list(itertools.product(data["facility_ids"], TRAILER_STATES))
-        for p in params:
-            payload = json.dumps({"facilityId": p[0], "carrierIds": data["carrier_ids"], "trailerState": p[1]})
-            all_rows.append({
-                "api_endpoint": "trailer-overview", "tenantName": tenant, "facilityId": p[0],
-                "authToken": auth_token, "payload": payload
-            })
-
-        # --- Trailer Exception Summary Combinations ---
-        # Use only one threshold combination per facility for equal distribution
+        # --- Endpoints requiring carrierIds ---
         for facility_id in data["facility_ids"]:
-            payload = json.dumps({
-                "facilityId": facility_id, 
-                "carrierIds": data["carrier_ids"], 
-                "lastDetectionTimeThresholdHours": 24,  # Use default threshold
-                "inboundLoadedThresholdHours": 48       # Use default threshold
-            })
-            for _ in range(COUNTER):
-                all_rows.append({
-                    "api_endpoint": "trailer-exception-summary", "tenantName": tenant, "facilityId": facility_id,
-                    "authToken": auth_token, "payload": payload
+            for carrier_ids in carrier_sampler.subsets(data["carrier_ids"], carrier_subsets):
+                carrier_count = len(carrier_ids)
+
+                # --- Endpoints requiring facilityId and carrierIds ---
+                # The payload is shared by all three, serialize it once
+                carrier_endpoints = [
+                    "site-occupancy",
+                    "dwell-time-summary",
+                    "detention-summary"
+                ]
+                payload = json.dumps({"facilityId": facility_id, "carrierIds": carrier_ids})
+                for endpoint in carrier_endpoints:
+                    add_scenario(scenarios, endpoint, tenant, facility_id, auth_token,
+                                 payload, weight=COUNTER, carrier_count=carrier_count)
+
+                # --- Trailer Overview Combinations ---
+                for trailer_state in TRAILER_STATES:
+                    payload = json.dumps({"facilityId": facility_id, "carrierIds": carrier_ids, "trailerState": trailer_state})
+                    add_scenario(scenarios, "trailer-overview", tenant, facility_id, auth_token,
+                                 payload, carrier_count=carrier_count)
+
+                # --- Trailer Exception Summary Combinations ---
+                # Use only one threshold combination per facility for equal distribution
+                payload = json.dumps({
+                    "facilityId": facility_id, 
+                    "carrierIds": carrier_ids, 
+                    "lastDetectionTimeThresholdHours": 24,  # Use default threshold
+                    "inboundLoadedThresholdHours": 48       # Use default threshold
                 })
-
-        # --- Shipment Volume Forecast Combinations ---
-        params = list(itertools.product(data["facility_ids"], SHIPMENT_DIRECTIONS))
-        for p in params:
-            payload = json.dumps({
-                "facilityId": p[0],
-                "carrierIds": data["carrier_ids"],
-                "shipmentDirection": p[1],
-                "timeZone": "GMT",
-                "numDays": 7,
-                "startDate": "2025-07-30",
-                "includeShipmentsWithoutCarrier": True
-            })
-            # for _ in range(2):
-            all_rows.append({
-                "api_endpoint": "shipment-volume-forecast", "tenantName": tenant, "facilityId": p[0],
-                "authToken": auth_token, "payload": payload
-            })
+                add_scenario(scenarios, "trailer-exception-summary", tenant, facility_id, auth_token,
+                             payload, weight=COUNTER, carrier_count=carrier_count)
+
+                # --- Shipment Volume Forecast Combinations ---
+                for direction in SHIPMENT_DIRECTIONS:
+                    for window, weight in forecast_generator.windows(forecast_requests):
+                        payload = json.dumps({
+                            "facilityId": facility_id,
+                            "carrierIds": carrier_ids,
+                            "shipmentDirection": direction,
+                            **window
+                        })
+                        add_scenario(scenarios, "shipment-volume-forecast", tenant, facility_id, auth_token,
+                                     payload, weight=weight, carrier_count=carrier_count)
 
     # Write all generated rows to the CSV file
-    with open(filename, "w", newline="") as f:
+    total_weight = 0
+    with profiling.span("file write", "io", file=filename), open(filename, "w", newline="") as f:
         writer = csv.writer(f, quoting=csv.QUOTE_MINIMAL)
         writer.writerow(HEADER)
         
-        for row_dict in all_rows:
+        for row_dict in scenarios.values():
             # Fill in default values for JMeter script compatibility
             row_dict.setdefault("activeUsers", 10)
             row_dict.setdefault("rpmPerUser", 60)
             row_dict.setdefault("rampUpSeconds", 1)
-            # Write the row by getting values from the dictionary, ensuring correct order
-            writer.writerow([row_dict.get(h, "") for h in HEADER])
-
-    print(f"\nSuccessfully generated {len(all_rows)} exhaustive test cases in '{filename}'")
+            total_weight += row_dict["weight"]
+            if expand_weights:
+                row = [1 if h == "weight" else row_dict.get(h, "") for h in HEADER]
+                for _ in range(row_dict["weight"]):
+                    writer.writerow(row)
+            else:
+                # Write the row by getting values from the dictionary, ensuring correct order
+                writer.writerow([row_dict.get(h, "") for h in HEADER])
+
+    print(f"\nSuccessfully generated {len(scenarios)} unique test cases "
+          f"(total weight {total_weight}) in '{filename}'")
+
+    if binary:
+        # The store always holds one weighted record per unique request
+        store_file = store_file_for(filename)
+        with profiling.span("file write", "io", file=store_file):
+            write_scenario_store(store_file, scenarios.values(), HEADER)
+        print(f"✓ Wrote binary scenario store '{store_file}'")
+
+    if identity_pool is not None:
+        identity_pool = identity_pool.restrict_to(tenant_data)
+        identities_file = identities_file_for(filename)
+        identity_pool.save(identities_file)
+        users = sum(identity_pool.size(t) for t in identity_pool.identities)
+        print(f"✓ Wrote {users} identities for {len(identity_pool.identities)} tenants to '{identities_file}'")
+    return len(scenarios)
 
 # Main execution
 if __name__ == "__main__":
-    # Get the environment from command line
-    if len(sys.argv) < 2:
-        print("Usage: python generate_exhaustive_data.py <env>")
-        sys.exit(1)
-    
-    env = sys.argv[1].lower()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate the scenario table for the stress test")
+    parser.add_argument("env", choices=list(ENVIRONMENTS),
+                        type=str.lower, help="Target environment")
+    parser.add_argument("--output", "-o", default="test_data.csv",
+                        help="Output CSV path (default: test_data.csv)")
+    parser.add_argument("--expand-weights", action="store_true",
+                        help="Repeat each row 'weight' times instead of writing the weight column only")
+    parser.add_argument("--forecast-requests", type=int, default=1,
+                        help="shipment-volume-forecast requests per facility and direction (default: 1)")
+    parser.add_argument("--forecast-repeat-ratio", type=float, default=0.0,
+                        help="Share of forecast requests reusing a hot (cacheable) window, 0-1 (default: 0)")
+    parser.add_argument("--forecast-hot-keys", type=int, default=1,
+                        help="Number of hot forecast windows per facility and direction (default: 1)")
+    parser.add_argument("--carrier-mode", choices=CARRIER_SUBSET_MODES, default="full",
+                        help="How carrierIds subsets are drawn for carrier endpoints (default: full)")
+    parser.add_argument("--carrier-subsets", type=int, default=1,
+                        help="carrierIds subsets drawn per facility (default: 1)")
+    parser.add_argument("--multi-user", action="store_true",
+                        help="Spread virtual users over identities from tokens/multi_user_{env}_latest.json")
+    parser.add_argument("--multi-user-tokens", default=None,
+                        help="Multi-user token file to use instead of the latest one (implies --multi-user)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed for reproducible payload parameters")
+    parser.add_argument("--binary", action="store_true",
+                        help="Also write a memory-mapped <output>.scn store for load_engine.py")
+    parser.add_argument("--fast-tokens", action="store_true",
+                        help="Mint tokens via token exchange/impersonation (leaves a Keycloak SSO session per tenant)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Do not reuse cached tokens, discovery snapshot or data (see run_manifest.py)")
+    parser.add_argument("--discovery-max-age", type=float, default=24,
+                        help="Hours a cached facility/carrier discovery snapshot is reused (default: 24)")
+    parser.add_argument("--run-duration", type=float, default=0,
+                        help="Planned test length in seconds, ramp-up included; reused tokens must outlive it")
+    parser.add_argument("--min-token-validity", type=float, default=None,
+                        help="Seconds cached tokens must still be valid to be reused "
+                             f"(default: --run-duration + {TOKEN_VALIDITY_MARGIN})")
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="PREFIX",
+                        help="Write a stage trace (PREFIX.trace.json) and cProfile dump (PREFIX.prof)")
+    args = parser.parse_args()
+    if args.profile is not None:
+        profiling.start(args.profile or profiling.default_prefix("generate_exhaustive_data"))
+
+    env = ENVIRONMENT = args.env
+    cache = None if args.no_cache else StageCache()
+    manifest = RunManifest("generation")
     
     # Initialize tokens for the environment
     print(f"Initializing for {env} environment...")
+    min_validity = args.min_token_validity
+    if min_validity is None:
+        min_validity = args.run_duration + TOKEN_VALIDITY_MARGIN
+    resolve_tokens(env, cache, manifest, min_validity, fast=args.fast_tokens)
     
-    # First try to load from file
-    if not load_tokens_from_file(env):
-        # If no file found, generate fresh tokens
-        print(f"No cached tokens found. Generating fresh tokens for {env}...")
-        refresh_tokens_for_environment(env, force_refresh=True)
+    identity_pool = None
+    if args.multi_user or args.multi_user_tokens:
+        identity_pool = load_multi_user_identities(env, args.multi_user_tokens)
     
     # Check if we have tokens now
     if not TENANTS_AUTH_TOKEN:
@@ -424,6 +647,62 @@ if __name__ == "__main__":
         print("")
     else:
         print(f"\n✓ Loaded tokens for {len(TENANTS_AUTH_TOKEN)} tenants")
-    
-    # Run the generator
-    generate_exhaustive_csv()
\ No newline at end of file
+
+    snapshot = resolve_discovery(env, cache, manifest, args.discovery_max_age * 3600)
+
+    # Data stage: the generated files depend on the discovery snapshot, the tokens written
+    # into every row, the identities, the generator options, the generator's source and the
+    # date (forecast windows are relative to today)
+    outputs = [args.output]
+    if args.binary:
+        outputs.append(store_file_for(args.output))
+    multi_user_file = None
+    if identity_pool is not None:
+        outputs.append(identities_file_for(args.output))
+        multi_user_file = args.multi_user_tokens or f"tokens/multi_user_{env}_latest.json"
+    options = {
+        key: value for key, value in vars(args).items()
+        if key not in ("no_cache", "discovery_max_age", "min_token_validity", "run_duration", "profile", "fast_tokens")
+    }
+    data_inputs = {
+        "generator": source_version(),
+        "options": options,
+        "discovery": manifest.stages["discovery"]["outputs"][discovery_file_for(env)],
+        "tokens": hash_inputs(TENANTS_AUTH_TOKEN),
+        "identities": hash_file(multi_user_file) if multi_user_file else None,
+        "date": date.today().isoformat()
+    }
+
+    # Without a seed every run draws new payload parameters; a cached file would replay old ones
+    data_cache = cache if args.seed is not None else None
+    entry = data_cache.lookup("data", data_inputs) if data_cache else None
+    if entry:
+        cache.restore(entry)
+        print(f"✓ Inputs unchanged, reusing {', '.join(entry['outputs'])} (use --no-cache to regenerate)")
+        manifest.add_stage("data", data_inputs, entry["outputs"], cached=True)
+    else:
+        # Run the generator
+        forecast_generator = ForecastWindowGenerator(
+            repeat_ratio=args.forecast_repeat_ratio,
+            hot_keys=args.forecast_hot_keys,
+            seed=args.seed
+        )
+        carrier_sampler = CarrierSubsetSampler(args.carrier_mode, seed=args.seed)
+        count = generate_exhaustive_csv(args.output, expand_weights=args.expand_weights,
+                                        forecast_generator=forecast_generator,
+                                        forecast_requests=args.forecast_requests,
+                                        carrier_sampler=carrier_sampler,
+                                        carrier_subsets=args.carrier_subsets,
+                                        identity_pool=identity_pool,
+                                        binary=args.binary,
+                                        tenant_data=prepare_tenant_data(snapshot))
+        if not count:
+            sys.exit(1)
+        if data_cache:
+            manifest.add_stage("data", data_inputs, data_cache.store("data", data_inputs, outputs)["outputs"],
+                               cached=False)
+        else:
+            manifest.add_stage("data", data_inputs, {path: hash_file(path) for path in outputs}, cached=False)
+
+    manifest.write(manifest_file_for(args.output))
+    print(f"✓ Generation manifest {manifest.run_id}: {manifest_file_for(args.output)}")
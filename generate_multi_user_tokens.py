@@ -7,13 +7,18 @@ Generates tokens for multiple users across different tenants
 import json
 import sys
 import os
-from typing import Dict, List, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
 
 # Import existing token generators
-from keycloak_admin_token_generator import KeycloakAdminTokenGenerator
+import profiling
+from config_loader import ENVIRONMENTS, load_json_config
+from keycloak_admin_token_generator import AdminTokenManager, KeycloakAdminTokenGenerator
 from generate_bearer_token import BearerTokenGenerator
+from load_engine import positive_int
 
 
 class MultiUserTokenGenerator:
@@ -44,14 +49,20 @@ class MultiUserTokenGenerator:
             sys.exit(1)
             
         try:
-            with open(self.config_file, 'r') as f:
-                return json.load(f)
+            return load_json_config(self.config_file)
         except json.JSONDecodeError as e:
             print(f"Error parsing configuration file: {e}")
             sys.exit(1)
     
-    def generate_tokens_for_all_users(self) -> Dict:
-        """Generate tokens for all users in the configuration"""
+    def generate_tokens_for_all_users(self, fast: bool = False, workers: int = 8) -> Dict:
+        """
+        Generate tokens for all users in the configuration
+
+        Args:
+            fast: Mint all users' tokens in one concurrent pass via token exchange /
+                impersonation, falling back to the login flow per tenant
+            workers: Number of users processed concurrently
+        """
         
         print("=" * 70)
         print("Multi-User Token Generation")
@@ -69,87 +80,162 @@ class MultiUserTokenGenerator:
             return self.results
         
         # Initialize Keycloak admin generator for tenant switching
-        keycloak_gen = KeycloakAdminTokenGenerator(self.environment)
+        exchange_client = {
+            "exchange_client_id": self.config.get("exchange_client_id"),
+            "exchange_client_secret": self.config.get("exchange_client_secret")
+        }
+        keycloak_gen = KeycloakAdminTokenGenerator(self.environment, **exchange_client)
+        
+        # One admin credential manager shared by every user; it renews the admin token
+        # before it expires instead of re-authenticating on a schedule or after failures
+        admin_tokens = keycloak_gen.get_admin_token_manager(admin_username, admin_password)
+        
+        if fast:
+            return self._generate_tokens_fast(keycloak_gen, admin_tokens, workers)
+        
+        # Each user's tenant chain is independent (the tenant is a per-user attribute),
+        # so users run as concurrent jobs; tenants of one user stay in order
+        users = self.config.get("users", [])
+        for user_config in users:
+            self.results["users"][user_config.get("email")] = {
+                "description": user_config.get("description", ""),
+                "tenants": {},
+                "success_count": 0,
+                "failure_count": 0
+            }
+        
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {
+                executor.submit(self._process_user, user_config, admin_tokens, exchange_client): user_config.get("email")
+                for user_config in users
+            }
+            for future in as_completed(futures):
+                user_email = futures[future]
+                try:
+                    user_tokens, elapsed = future.result()
+                except Exception as e:
+                    print(f"  ✗ {user_email}: {e}")
+                    user_tokens, elapsed = {}, 0.0
+                
+                print(f"\n{'─' * 70}")
+                print(f"Finished user: {user_email} ({elapsed:.1f}s)")
+                print("─" * 70)
+                self._record_user_tokens(user_email, user_tokens)
+                self.results["users"][user_email]["elapsed_seconds"] = round(elapsed, 2)
+        
+        print(f"\n✓ Processed {len(users)} users in {time.time() - start:.1f}s with {workers} workers")
+        return self.results
+    
+    @profiling.traced("user")
+    def _process_user(
+        self,
+        user_config: Dict,
+        admin_tokens: AdminTokenManager,
+        exchange_client: Dict
+    ) -> Tuple[Dict[str, Optional[str]], float]:
+        """
+        Run one user's token chain; executed as an independent concurrent job
+
+        Returns:
+            Tuple of ({tenant: token or None}, elapsed seconds)
+        """
+        start = time.time()
+        user_email = user_config.get("email")
+        user_password = user_config.get("password")
+        user_tenants = user_config.get("tenants", [])
+        
+        print(f"Processing user: {user_email} (tenants: {', '.join(user_tenants) or 'default'})")
+        
+        if user_tenants:
+            # Use Keycloak admin API to switch tenants; a generator per job keeps
+            # HTTP sessions out of other threads
+            keycloak_gen = KeycloakAdminTokenGenerator(self.environment, **exchange_client)
+            user_tokens = self._generate_user_tenant_tokens(
+                keycloak_gen,
+                admin_tokens,
+                user_email,
+                user_password,
+                user_tenants
+            )
+        else:
+            # No specific tenants - generate default token
+            print("  Generating token with default tenant...")
+            user_tokens = {"default": self._generate_default_token(user_email, user_password)}
         
-        # Process each user
+        return user_tokens, time.time() - start
+    
+    def _generate_tokens_fast(
+        self,
+        keycloak_gen: KeycloakAdminTokenGenerator,
+        admin_tokens: AdminTokenManager,
+        workers: int
+    ) -> Dict:
+        """Mint tokens for all users with tenants in one batched, concurrent pass"""
+        batch = []
         for user_config in self.config.get("users", []):
             user_email = user_config.get("email")
-            user_password = user_config.get("password")
-            user_tenants = user_config.get("tenants", [])
-            description = user_config.get("description", "")
-            
-            print(f"\n{'─' * 70}")
-            print(f"Processing user: {user_email}")
-            if description:
-                print(f"Description: {description}")
-            print(f"Tenants: {', '.join(user_tenants)}")
-            print("─" * 70)
-            
-            # Initialize user result structure
             self.results["users"][user_email] = {
-                "description": description,
+                "description": user_config.get("description", ""),
                 "tenants": {},
                 "success_count": 0,
                 "failure_count": 0
             }
-            
-            # Generate tokens for each tenant this user has access to
-            if user_tenants:
-                # Use Keycloak admin API to switch tenants
-                user_tokens = self._generate_user_tenant_tokens(
-                    keycloak_gen,
-                    admin_username,
-                    admin_password,
-                    user_email,
-                    user_password,
-                    user_tenants
-                )
-                
-                # Store results
-                for tenant, token in user_tokens.items():
-                    if token:
-                        self.results["users"][user_email]["tenants"][tenant] = {
-                            "token": token,
-                            "status": "success"
-                        }
-                        self.results["users"][user_email]["success_count"] += 1
-                        print(f"  ✓ {tenant}: Token generated")
-                    else:
-                        self.results["users"][user_email]["tenants"][tenant] = {
-                            "token": None,
-                            "status": "failed",
-                            "error": "Failed to generate token"
-                        }
-                        self.results["users"][user_email]["failure_count"] += 1
-                        print(f"  ✗ {tenant}: Failed to generate token")
+            if user_config.get("tenants"):
+                batch.append({
+                    "email": user_email,
+                    "password": user_config.get("password"),
+                    "tenants": user_config.get("tenants")
+                })
             else:
-                # No specific tenants - generate default token
-                print("  Generating token with default tenant...")
-                token = self._generate_default_token(user_email, user_password)
-                
-                if token:
-                    self.results["users"][user_email]["tenants"]["default"] = {
-                        "token": token,
-                        "status": "success"
-                    }
-                    self.results["users"][user_email]["success_count"] = 1
-                    print(f"  ✓ Default token generated")
-                else:
-                    self.results["users"][user_email]["tenants"]["default"] = {
-                        "token": None,
-                        "status": "failed",
-                        "error": "Failed to generate token"
-                    }
-                    self.results["users"][user_email]["failure_count"] = 1
-                    print(f"  ✗ Failed to generate default token")
+                start = time.time()
+                token = self._generate_default_token(user_email, user_config.get("password"))
+                self._record_user_tokens(user_email, {"default": token})
+                self.results["users"][user_email]["elapsed_seconds"] = round(time.time() - start, 2)
+        
+        # Jobs of all users overlap, so a user's time runs from the start of the batch
+        timings = {}
+        minted = keycloak_gen.mint_tokens_batch(
+            admin_tokens.admin_username,
+            admin_tokens.admin_password,
+            batch,
+            max_workers=workers,
+            admin_tokens=admin_tokens,
+            timings=timings
+        )
+        for user in batch:
+            self._record_user_tokens(
+                user["email"],
+                minted.get(user["email"]) or {tenant: None for tenant in user["tenants"]}
+            )
+            self.results["users"][user["email"]]["elapsed_seconds"] = round(timings.get(user["email"], 0.0), 2)
         
         return self.results
     
+    def _record_user_tokens(self, user_email: str, user_tokens: Dict[str, Optional[str]]):
+        """Store a user's tenant tokens in the results structure"""
+        user_result = self.results["users"][user_email]
+        for tenant, token in user_tokens.items():
+            if token:
+                user_result["tenants"][tenant] = {
+                    "token": token,
+                    "status": "success"
+                }
+                user_result["success_count"] += 1
+                print(f"  ✓ {tenant}: Token generated")
+            else:
+                user_result["tenants"][tenant] = {
+                    "token": None,
+                    "status": "failed",
+                    "error": "Failed to generate token"
+                }
+                user_result["failure_count"] += 1
+                print(f"  ✗ {tenant}: Failed to generate token")
+    
     def _generate_user_tenant_tokens(
         self,
         keycloak_gen: KeycloakAdminTokenGenerator,
-        admin_username: str,
-        admin_password: str,
+        admin_tokens: AdminTokenManager,
         user_email: str,
         user_password: str,
         tenants: List[str]
@@ -159,13 +245,12 @@ class MultiUserTokenGenerator:
         tokens = {}
         
         # Get admin token
-        admin_token = keycloak_gen.get_admin_token(admin_username, admin_password)
-        if not admin_token:
+        if not admin_tokens.get_token():
             print(f"  ✗ Failed to authenticate as admin")
             return tokens
         
-        # Find user
-        user = keycloak_gen.find_user(admin_token, user_email)
+        # Find user; a rejected admin token is renewed and the call retried once
+        user = admin_tokens.call(keycloak_gen.find_user, user_email)
         if not user:
             print(f"  ✗ User not found: {user_email}")
             # Try to generate tokens without tenant switching
@@ -179,21 +264,9 @@ class MultiUserTokenGenerator:
         
         # Generate token for each tenant
         for tenant in tenants:
-            # Check if admin token needs refresh (every 10 tenants or on failure)
-            if len(tokens) % 10 == 0 and len(tokens) > 0:
-                admin_token = keycloak_gen.get_admin_token(admin_username, admin_password)
-                if not admin_token:
-                    print(f"  ✗ Failed to refresh admin token")
-                    break
-            
-            # Update user tenant
-            success = keycloak_gen.update_user_tenant(admin_token, user_id, tenant)
-            
-            # If failed, try refreshing admin token
-            if not success:
-                admin_token = keycloak_gen.get_admin_token(admin_username, admin_password)
-                if admin_token:
-                    success = keycloak_gen.update_user_tenant(admin_token, user_id, tenant)
+            # Update user tenant; the manager hands out a token that is not about to expire
+            # and renews it when the Admin API rejects it
+            success = admin_tokens.call(keycloak_gen.update_user_tenant, user_id, tenant)
             
             if success:
                 # Generate token for this tenant
@@ -218,6 +291,7 @@ class MultiUserTokenGenerator:
             print(f"  Error generating default token: {e}")
         return None
     
+    @profiling.traced("file write", "io")
     def save_results(self, output_file: str = None):
         """Save generated tokens to JSON file"""
         if not output_file:
@@ -259,6 +333,8 @@ class MultiUserTokenGenerator:
             
             print(f"\n{user_email}:")
             print(f"  Total tenants: {total}")
+            if "elapsed_seconds" in user_data:
+                print(f"  Time: {user_data['elapsed_seconds']:.1f}s")
             print(f"  Successful: {success}")
             print(f"  Failed: {failure}")
             
@@ -294,20 +370,41 @@ def main():
     )
     parser.add_argument(
         "--env", "-e",
-        choices=["local", "dev", "qat", "stress", "staging", "prod"],
+        choices=list(ENVIRONMENTS),
         help="Override environment from config file"
     )
     parser.add_argument(
         "--output", "-o",
         help="Output file path for tokens"
     )
+    parser.add_argument(
+        "--fast",
+        action="store_true",
+        help="Mint tokens via token exchange/impersonation in one concurrent pass"
+    )
+    parser.add_argument(
+        "--workers",
+        type=positive_int,
+        default=8,
+        help="Users processed concurrently (default: 8)"
+    )
     parser.add_argument(
         "--validate",
         action="store_true",
         help="Validate existing tokens without regenerating"
     )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="PREFIX",
+        help="Write a stage trace (PREFIX.trace.json) and cProfile dump (PREFIX.prof)"
+    )
     
     args = parser.parse_args()
+    if args.profile is not None:
+        profiling.start(args.profile or profiling.default_prefix("generate_multi_user_tokens"))
     
     # Check if config file exists
     if not os.path.exists(args.config):
@@ -327,7 +424,7 @@ def main():
     
     # Generate tokens
     print("\nStarting multi-user token generation...")
-    generator.generate_tokens_for_all_users()
+    generator.generate_tokens_for_all_users(fast=args.fast, workers=args.workers)
     
     # Save results
     output_file = generator.save_results(args.output)
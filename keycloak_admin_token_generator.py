@@ -5,77 +5,215 @@ Uses Keycloak Admin API to programmatically change user's tenant_id and generate
 """
 
 import json
-import base64
+import re
+import uuid
 import requests
 import os
-from typing import Dict, List, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
 from datetime import datetime
 import time
 
+import profiling
+from config_loader import ENVIRONMENTS, get_base_url
+from token_introspection import decode_token, get_tenant
+
+
+class AdminTokenRejected(Exception):
+    """The Admin API answered 401 to the admin access token."""
+
+
+class AdminTokenManager:
+    """
+    Shared Keycloak admin credentials with proactive refresh.
+
+    Caches the admin access and refresh tokens and renews them shortly before the
+    access token expires (refresh grant first, password grant when the refresh token
+    is gone), so callers never hand an expired token to the Admin API. Safe to share
+    across concurrent workers.
+    """
+
+    def __init__(
+        self,
+        token_url: str,
+        admin_username: str,
+        admin_password: str,
+        refresh_margin: float = 10.0
+    ):
+        """
+        Initialize the manager.
+
+        Args:
+            token_url: Master realm token endpoint
+            admin_username: Keycloak admin username
+            admin_password: Keycloak admin password
+            refresh_margin: Seconds before expiry at which the token is renewed
+                (capped at half the token lifetime for short-lived tokens)
+        """
+        self.token_url = token_url
+        self.admin_username = admin_username
+        self.admin_password = admin_password
+        self.refresh_margin = refresh_margin
+        self.session = requests.Session()
+        self.lock = threading.Lock()
+
+        self.access_token = None
+        self.refresh_token = None
+        self.refresh_at = 0.0
+        self.refresh_expires_at = 0.0
+        self.refresh_count = 0
+
+    def get_token(self) -> Optional[str]:
+        """Return a valid admin access token, renewing it if it is about to expire."""
+        token = self.access_token
+        if token and time.time() < self.refresh_at:
+            return token
+
+        with self.lock:
+            # Another worker may have renewed the token while we waited for the lock
+            if self.access_token and time.time() < self.refresh_at:
+                return self.access_token
+            return self._renew()
+
+    def invalidate(self, token: Optional[str] = None):
+        """
+        Drop the cached access token, e.g. after the Admin API rejected it.
+
+        Args:
+            token: The rejected token; if another worker already replaced it, nothing is dropped
+        """
+        with self.lock:
+            if token is None or token == self.access_token:
+                self.access_token = None
+                self.refresh_at = 0.0
+
+    def call(self, func: Callable, *args, **kwargs):
+        """
+        Run an Admin API call as func(admin_token, *args, **kwargs).
+
+        When the Admin API rejects the token (revoked session, realm key rotation),
+        the token is renewed and the call retried once.
+
+        Returns:
+            The call's result, or None without a valid admin token
+        """
+        for attempt in range(2):
+            token = self.get_token()
+            if not token:
+                return None
+            try:
+                return func(token, *args, **kwargs)
+            except AdminTokenRejected:
+                self.invalidate(token)
+                if attempt == 0:
+                    print("  ⚠ Admin token rejected (401), re-authenticating and retrying")
+        print("  ✗ Admin token rejected again after re-authentication")
+        return None
+
+    @profiling.traced("admin auth", "network")
+    def _renew(self) -> Optional[str]:
+        """Fetch a new token pair. Must be called with the lock held."""
+        requested_at = time.time()
+        token_data = None
+
+        if self.refresh_token and requested_at < self.refresh_expires_at - 1:
+            token_data = self._request_tokens({
+                "client_id": "admin-cli",
+                "grant_type": "refresh_token",
+                "refresh_token": self.refresh_token
+            })
+
+        if token_data is None:
+            print(f"Authenticating as Keycloak admin...")
+            token_data = self._request_tokens({
+                "client_id": "admin-cli",
+                "username": self.admin_username,
+                "password": self.admin_password,
+                "grant_type": "password"
+            })
+            if token_data is None:
+                self.access_token = None
+                return None
+            print("✓ Admin authentication successful")
+
+        # Lifetimes are counted from when the request was sent, so they err on the early side
+        lifetime = float(token_data.get("expires_in", 60))
+        margin = min(self.refresh_margin, lifetime / 2)
+        self.access_token = token_data.get("access_token")
+        self.refresh_token = token_data.get("refresh_token")
+        self.refresh_at = requested_at + lifetime - margin
+        self.refresh_expires_at = requested_at + float(token_data.get("refresh_expires_in", 0))
+        self.refresh_count += 1
+        return self.access_token
+
+    def _request_tokens(self, data: Dict) -> Optional[Dict]:
+        """POST a grant to the token endpoint and return the token response."""
+        try:
+            response = self.session.post(
+                self.token_url,
+                data=data,
+                headers={"Content-Type": "application/x-www-form-urlencoded"}
+            )
+            if response.status_code == 200:
+                return response.json()
+            print(f"✗ Admin token request ({data['grant_type']}) failed: {response.status_code}")
+            print(f"Response: {response.text[:500]}")
+        except Exception as e:
+            print(f"✗ Error getting admin token: {e}")
+        return None
+
 
 class KeycloakAdminTokenGenerator:
     """Generate tokens using Keycloak Admin API to change user attributes."""
     
-    def __init__(self, environment: str = "staging"):
-        """Initialize the Keycloak admin token generator."""
+    def __init__(
+        self,
+        environment: str = "staging",
+        exchange_client_id: Optional[str] = None,
+        exchange_client_secret: Optional[str] = None
+    ):
+        """
+        Initialize the Keycloak admin token generator.
+
+        Args:
+            environment: Target environment (local, dev, qat, stress, staging, prod)
+            exchange_client_id: Optional confidential client allowed to use token exchange
+            exchange_client_secret: Secret of the token exchange client
+        """
         self.environment = environment
+        self.exchange_client_id = exchange_client_id
+        self.exchange_client_secret = exchange_client_secret
         self.setup_environment_urls()
         self.admin_session = requests.Session()
         
+    def close(self):
+        """Close the Admin API session."""
+        self.admin_session.close()
+
     def setup_environment_urls(self):
         """Set up URLs based on environment."""
-        env_configs = {
-            "local": "http://api-proxy:8000",
-            "dev": "https://dy-dev.fourkites.com",
-            "qat": "https://dy-qat.fourkites.com", 
-            "stress": "https://dy-stress.fourkites.com",
-            "staging": "https://dy-staging.fourkites.com",
-            "prod": "https://dy.fourkites.com"
-        }
-        
-        self.base_url = env_configs.get(self.environment, env_configs["staging"])
+        try:
+            self.base_url = get_base_url(self.environment)
+        except ValueError:
+            self.base_url = get_base_url("staging")
         self.keycloak_base = f"{self.base_url}/keycloak"
         self.realm = "YMS"
+        self.client_id = "ymsui"
         
         # Keycloak Admin API endpoints
         self.admin_token_url = f"{self.keycloak_base}/realms/master/protocol/openid-connect/token"
         self.users_url = f"{self.keycloak_base}/admin/realms/{self.realm}/users"
         self.user_token_url = f"{self.keycloak_base}/realms/{self.realm}/protocol/openid-connect/token"
+        self.user_auth_url = f"{self.keycloak_base}/realms/{self.realm}/protocol/openid-connect/auth"
         
-    def get_admin_token(self, admin_username: str, admin_password: str) -> Optional[str]:
-        """Get Keycloak admin access token."""
-        try:
-            print(f"Authenticating as Keycloak admin...")
-            
-            # Try with master realm client
-            data = {
-                "client_id": "admin-cli",
-                "username": admin_username,
-                "password": admin_password,
-                "grant_type": "password"
-            }
-            
-            response = self.admin_session.post(
-                self.admin_token_url,
-                data=data,
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            )
-            
-            if response.status_code == 200:
-                token_data = response.json()
-                print("✓ Admin authentication successful")
-                return token_data.get("access_token")
-            else:
-                print(f"✗ Admin authentication failed: {response.status_code}")
-                print(f"Response: {response.text[:500]}")
-                return None
-                
-        except Exception as e:
-            print(f"✗ Error getting admin token: {e}")
-            return None
+    def get_admin_token_manager(self, admin_username: str, admin_password: str) -> AdminTokenManager:
+        """Create a shared admin token manager for this environment."""
+        return AdminTokenManager(self.admin_token_url, admin_username, admin_password)
     
+    @profiling.traced("find user", "network")
     def find_user(self, admin_token: str, user_email: str) -> Optional[Dict]:
-        """Find user by email in Keycloak."""
+        """Find user by email in Keycloak (raises AdminTokenRejected on 401, see AdminTokenManager.call)."""
         try:
             print(f"Searching for user: {user_email}")
             
@@ -92,6 +230,8 @@ class KeycloakAdminTokenGenerator:
                 headers=headers,
                 params=params
             )
+            if response.status_code == 401:
+                raise AdminTokenRejected()
             
             # If no users found with email, try username
             if response.status_code == 200 and not response.json():
@@ -116,12 +256,15 @@ class KeycloakAdminTokenGenerator:
                 print(f"Response: {response.text[:500]}")
                 return None
                 
+        except AdminTokenRejected:
+            raise
         except Exception as e:
             print(f"✗ Error finding user: {e}")
             return None
     
+    @profiling.traced("attribute update", "network")
     def update_user_tenant(self, admin_token: str, user_id: str, tenant_id: str) -> bool:
-        """Update user's tenant_id attribute in Keycloak."""
+        """Update user's tenant_id attribute in Keycloak (raises AdminTokenRejected on 401)."""
         try:
             print(f"  Updating user tenant to: {tenant_id}")
             
@@ -133,6 +276,8 @@ class KeycloakAdminTokenGenerator:
             # Get current user data first
             user_url = f"{self.users_url}/{user_id}"
             response = self.admin_session.get(user_url, headers=headers)
+            if response.status_code == 401:
+                raise AdminTokenRejected()
             
             if response.status_code != 200:
                 print(f"  ✗ Failed to get user data: {response.status_code}")
@@ -153,6 +298,8 @@ class KeycloakAdminTokenGenerator:
                 headers=headers,
                 json=user_data
             )
+            if response.status_code == 401:
+                raise AdminTokenRejected()
             
             if response.status_code in [200, 204]:
                 print(f"  ✓ User tenant updated to: {tenant_id}")
@@ -162,12 +309,21 @@ class KeycloakAdminTokenGenerator:
                 print(f"  Response: {response.text[:500]}")
                 return False
                 
+        except AdminTokenRejected:
+            raise
         except Exception as e:
             print(f"  ✗ Error updating user tenant: {e}")
             return False
     
+    @profiling.traced("impersonation", "network")
     def get_user_token_with_impersonation(self, admin_token: str, user_id: str) -> Optional[str]:
-        """Get token for user using admin impersonation."""
+        """
+        Get token for user using admin impersonation.
+
+        The impersonation endpoint sets a realm SSO session cookie for the user; a
+        silent (prompt=none) authorization request on that session then yields a code
+        that is exchanged for the token. No IdP/SAML login round trips are involved.
+        """
         try:
             print(f"  Getting token via impersonation...")
             
@@ -176,36 +332,238 @@ class KeycloakAdminTokenGenerator:
                 "Content-Type": "application/json"
             }
             
-            # Use impersonation endpoint
+            # Use impersonation endpoint; a dedicated session keeps the impersonated
+            # SSO cookies away from the admin session and makes concurrent calls safe
             impersonate_url = f"{self.users_url}/{user_id}/impersonation"
+            with requests.Session() as session:
+                response = session.post(
+                    impersonate_url,
+                    headers=headers
+                )
+                if response.status_code == 401:
+                    raise AdminTokenRejected()
             
-            response = self.admin_session.post(
-                impersonate_url,
-                headers=headers
+                if response.status_code != 200:
+                    print(f"  ✗ Impersonation failed: {response.status_code}")
+                    return None
+
+                # Silent login on the impersonated session to get an authorization code
+                auth_params = {
+                    "client_id": self.client_id,
+                    "redirect_uri": self.base_url.rstrip('/'),
+                    "state": str(uuid.uuid4()),
+                    "nonce": str(uuid.uuid4()),
+                    "response_mode": "fragment",
+                    "response_type": "code",
+                    "scope": "openid",
+                    "prompt": "none"
+                }
+                auth_response = session.get(self.user_auth_url, params=auth_params, allow_redirects=False)
+                location = auth_response.headers.get("Location", "")
+                code_match = re.search(r'[#&?]code=([^&]+)', location)
+                if not code_match:
+                    print(f"  ✗ No authorization code after impersonation: {auth_response.status_code}")
+                    return None
+
+                token_response = session.post(
+                    self.user_token_url,
+                    data={
+                        "code": code_match.group(1).strip(),
+                        "grant_type": "authorization_code",
+                        "client_id": self.client_id,
+                        "redirect_uri": self.base_url.rstrip('/')
+                    },
+                    headers={"Content-Type": "application/x-www-form-urlencoded"}
+                )
+                if token_response.status_code != 200:
+                    print(f"  ✗ Code exchange failed: {token_response.status_code}")
+                    return None
+
+                print(f"  ✓ Token obtained via impersonation")
+                return token_response.json().get("access_token")
+                
+        except AdminTokenRejected:
+            raise
+        except Exception as e:
+            print(f"  ✗ Error with impersonation: {e}")
+            return None
+
+    @profiling.traced("token exchange", "network")
+    def get_user_token_with_exchange(self, user_id: str) -> Optional[str]:
+        """
+        Get token for user through Keycloak token exchange (direct impersonation).
+
+        Requires a confidential client in the realm that is allowed to impersonate
+        users, configured with exchange_client_id / exchange_client_secret.
+        """
+        if not self.exchange_client_id or not self.exchange_client_secret:
+            return None
+
+        try:
+            print(f"  Getting token via token exchange...")
+            response = requests.post(
+                self.user_token_url,
+                data={
+                    "grant_type": "urn:ietf:params:oauth:grant-type:token-exchange",
+                    "client_id": self.exchange_client_id,
+                    "client_secret": self.exchange_client_secret,
+                    "requested_subject": user_id,
+                    "requested_token_type": "urn:ietf:params:oauth:token-type:access_token",
+                    "audience": self.client_id
+                },
+                headers={"Content-Type": "application/x-www-form-urlencoded"}
             )
-            
+
             if response.status_code == 200:
-                # The response might contain cookies or redirect info
-                # We need to extract the actual token
-                impersonation_data = response.json()
-                
-                # Try to get token from the impersonation response
-                if "redirect" in impersonation_data:
-                    # Follow redirect to get actual token
-                    redirect_url = impersonation_data["redirect"]
-                    token_response = self.admin_session.get(redirect_url)
-                    # Extract token from response
-                    # This depends on your Keycloak configuration
-                    
-                print(f"  ✓ Token obtained via impersonation")
-                return None  # Need to implement token extraction
+                print(f"  ✓ Token obtained via token exchange")
+                return response.json().get("access_token")
             else:
-                print(f"  ✗ Impersonation failed: {response.status_code}")
+                print(f"  ✗ Token exchange failed: {response.status_code}")
                 return None
-                
+
         except Exception as e:
-            print(f"  ✗ Error with impersonation: {e}")
+            print(f"  ✗ Error with token exchange: {e}")
             return None
+
+    def get_user_token_fast(self, admin_token: str, user_id: str, tenant_id: str) -> Optional[str]:
+        """
+        Mint a token without a login flow, preferring token exchange over impersonation.
+
+        Returns None when neither mechanism produces a token carrying `tenant_id`, so the
+        caller can fall back to the SAML login path.
+        """
+        token = self.get_user_token_with_exchange(user_id)
+        if not token:
+            token = self.get_user_token_with_impersonation(admin_token, user_id)
+        if not token:
+            return None
+
+        actual_tenant = self._extract_tenant_from_token(token)
+        if actual_tenant != tenant_id:
+            print(f"  ⚠ Fast token has tenant '{actual_tenant}' instead of '{tenant_id}'")
+            return None
+        return token
+
+    def _find_user(self, admin_tokens: AdminTokenManager, user_email: str) -> Optional[Dict]:
+        return admin_tokens.call(self.find_user, user_email)
+
+    def _mint_tenant_token(
+        self,
+        admin_tokens: AdminTokenManager,
+        user_lock: threading.Lock,
+        user_email: str,
+        user_password: str,
+        user_id: str,
+        tenant: str
+    ) -> Optional[str]:
+        """
+        Mint one user's token for one tenant using the fast path.
+
+        The tenant is a user attribute read when the token is issued, so the update
+        and the mint hold the user's lock; tokens that cannot be minted fast fall
+        back to the SAML login.
+        """
+        with user_lock:
+            if not admin_tokens.call(self.update_user_tenant, user_id, tenant):
+                return None
+
+            token = admin_tokens.call(self.get_user_token_fast, user_id, tenant)
+            if not token:
+                print(f"  Falling back to login flow for tenant: {tenant}")
+                token = self.get_user_token_direct(user_email, user_password, tenant)
+        return f"Bearer {token}" if token else None
+
+    def _run_job(self, method: str, *args):
+        """Run a method on a generator of its own (sessions are not shared across threads), then close it."""
+        generator = KeycloakAdminTokenGenerator(self.environment, self.exchange_client_id, self.exchange_client_secret)
+        try:
+            return getattr(generator, method)(*args)
+        finally:
+            generator.close()
+
+    def mint_tokens_batch(
+        self,
+        admin_username: str,
+        admin_password: str,
+        users: List[Dict],
+        max_workers: int = 8,
+        admin_tokens: Optional[AdminTokenManager] = None,
+        timings: Optional[Dict[str, float]] = None
+    ) -> Dict[str, Dict[str, Optional[str]]]:
+        """
+        Mint tokens for many users and tenants in one concurrent pass.
+
+        Users are looked up concurrently, then every (user, tenant) pair is its own
+        job. Pairs of different users run in parallel; pairs of the same user take
+        turns on its tenant attribute, with the lookups and token requests of other
+        users overlapping them.
+
+        Args:
+            admin_username: Keycloak admin username
+            admin_password: Keycloak admin password
+            users: List of {"email", "password", "tenants"} entries
+            max_workers: Number of jobs processed concurrently
+            admin_tokens: Shared admin token manager (created from the credentials if omitted)
+            timings: Optional dictionary filled with user email -> seconds from the start
+                of the batch until the user's last token was done
+
+        Returns:
+            Dictionary mapping user email to {tenant: bearer token or None}
+        """
+        results = {}
+        timings = timings if timings is not None else {}
+        admin_tokens = admin_tokens or self.get_admin_token_manager(admin_username, admin_password)
+        if not admin_tokens.get_token():
+            print("✗ Failed to authenticate as admin. Cannot proceed.")
+            return results
+
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            lookups = {
+                executor.submit(self._run_job, "_find_user", admin_tokens, user["email"]): user
+                for user in users
+            }
+            futures = {}
+            for lookup in as_completed(lookups):
+                user = lookups[lookup]
+                results[user["email"]] = {tenant: None for tenant in user["tenants"]}
+                timings[user["email"]] = time.time() - start
+                try:
+                    found = lookup.result()
+                except Exception as e:
+                    print(f"✗ User lookup failed for {user['email']}: {e}")
+                    continue
+                if not found:
+                    continue
+
+                user_lock = threading.Lock()
+                for tenant in user["tenants"]:
+                    future = executor.submit(
+                        self._run_job,
+                        "_mint_tenant_token",
+                        admin_tokens,
+                        user_lock,
+                        user["email"],
+                        user["password"],
+                        found.get("id"),
+                        tenant
+                    )
+                    futures[future] = (user["email"], tenant)
+
+            for future in as_completed(futures):
+                user_email, tenant = futures[future]
+                try:
+                    results[user_email][tenant] = future.result()
+                except Exception as e:
+                    print(f"✗ Token minting failed for {user_email}/{tenant}: {e}")
+                timings[user_email] = time.time() - start
+
+        elapsed = time.time() - start
+        minted = sum(1 for tokens in results.values() for token in tokens.values() if token)
+        rate = minted / elapsed if elapsed > 0 else 0.0
+        print(f"\n✓ Minted {minted} tokens for {len(results)} users in {elapsed:.1f}s ({rate:.2f} tokens/s), "
+              f"admin token renewed {admin_tokens.refresh_count}x")
+        return results
     
     def get_user_token_direct(self, username: str, password: str, tenant_id: str) -> Optional[str]:
         """Get token for user directly after tenant update."""
@@ -219,7 +577,8 @@ class KeycloakAdminTokenGenerator:
             token_gen = BearerTokenGenerator(self.environment)
             
             # Wait a bit for Keycloak to propagate the attribute change
-            time.sleep(2)
+            with profiling.span("propagation wait", "wait"):
+                time.sleep(2)
             
             # Get fresh token with updated tenant
             token = token_gen.get_bearer_token(username, password)
@@ -248,9 +607,19 @@ class KeycloakAdminTokenGenerator:
         admin_password: str,
         user_email: str,
         user_password: str,
-        tenants: List[str]
+        tenants: List[str],
+        fast: bool = False
     ) -> Dict[str, str]:
-        """Generate tokens for all specified tenants."""
+        """
+        Generate tokens for all specified tenants.
+
+        With fast=True tokens are minted through token exchange / impersonation and
+        only fall back to the SAML login flow for tenants where that fails.
+        """
+        if fast:
+            users = [{"email": user_email, "password": user_password, "tenants": tenants}]
+            return self.mint_tokens_batch(admin_username, admin_password, users).get(user_email, {})
+
         tokens = {}
         
         print(f"{'='*60}")
@@ -262,14 +631,14 @@ class KeycloakAdminTokenGenerator:
         print(f"Target tenants: {', '.join(tenants)}")
         print(f"{'='*60}")
         
-        # Step 1: Get admin token
-        admin_token = self.get_admin_token(admin_username, admin_password)
-        if not admin_token:
+        # Step 1: Get admin token (renewed proactively before it expires)
+        admin_tokens = self.get_admin_token_manager(admin_username, admin_password)
+        if not admin_tokens.get_token():
             print("✗ Failed to authenticate as admin. Cannot proceed.")
             return tokens
         
         # Step 2: Find the user
-        user = self.find_user(admin_token, user_email)
+        user = admin_tokens.call(self.find_user, user_email)
         if not user:
             print("✗ User not found. Cannot proceed.")
             return tokens
@@ -283,18 +652,7 @@ class KeycloakAdminTokenGenerator:
             print(f"\n--- Processing tenant: {tenant} ---")
             
             # Update user's tenant attribute
-            success = self.update_user_tenant(admin_token, user_id, tenant)
-            
-            # If we get a 401, the admin token has expired - refresh it
-            if not success:
-                print("  Admin token may have expired, refreshing...")
-                admin_token = self.get_admin_token(admin_username, admin_password)
-                if admin_token:
-                    print("  ✓ Admin token refreshed")
-                    # Try again with fresh token
-                    success = self.update_user_tenant(admin_token, user_id, tenant)
-                else:
-                    print("  ✗ Failed to refresh admin token")
+            success = admin_tokens.call(self.update_user_tenant, user_id, tenant)
             
             if success:
                 # Get fresh token for this tenant
@@ -315,21 +673,12 @@ class KeycloakAdminTokenGenerator:
     def _extract_tenant_from_token(self, token: str) -> str:
         """Extract tenant_id from JWT token."""
         try:
-            if token.startswith('Bearer '):
-                token = token[7:]
-            
-            parts = token.split('.')
-            if len(parts) != 3:
-                return "INVALID_TOKEN"
-            
-            payload_encoded = parts[1]
-            payload_padding = payload_encoded + '=' * (4 - len(payload_encoded) % 4)
-            payload = json.loads(base64.urlsafe_b64decode(payload_padding))
-            
-            return payload.get('tenant_id', 'NO_TENANT_ID')
-        except Exception as e:
+            tenant_id = get_tenant(token)
+            return tenant_id if tenant_id is not None else 'NO_TENANT_ID'
+        except ValueError as e:
             return f"ERROR: {str(e)}"
     
+    @profiling.traced("file write", "io")
     def save_tokens(self, tokens: Dict[str, str], filename: str = None):
         """Save tokens to a JSON file."""
         # Use default filename if not provided
@@ -370,30 +719,16 @@ class KeycloakAdminTokenGenerator:
     def _decode_full_token(self, token: str) -> dict:
         """Decode and return full token information."""
         try:
-            if token.startswith('Bearer '):
-                token = token[7:]
-            
-            parts = token.split('.')
-            if len(parts) != 3:
-                return {}
-            
-            payload_encoded = parts[1]
-            payload_padding = payload_encoded + '=' * (4 - len(payload_encoded) % 4)
-            payload = json.loads(base64.urlsafe_b64decode(payload_padding))
-            
-            # Convert exp timestamp to datetime
-            if 'exp' in payload:
-                exp_dt = datetime.fromtimestamp(payload['exp'])
-                payload['exp_datetime'] = exp_dt.isoformat()
-            
-            return {
-                "tenant_id": payload.get('tenant_id'),
-                "user": payload.get('preferred_username'),
-                "exp_datetime": payload.get('exp_datetime')
-            }
-        except:
+            info = decode_token(token)
+        except ValueError:
             return {}
-
+        
+        return {
+            "tenant_id": info.tenant_id,
+            "user": info.user,
+            # Convert exp timestamp to datetime
+            "exp_datetime": datetime.fromtimestamp(info.exp).isoformat() if info.exp is not None else None
+        }
 
 def main():
     """Main function for CLI usage."""
@@ -403,7 +738,7 @@ def main():
         description='Generate bearer tokens using Keycloak Admin API to change tenant'
     )
     parser.add_argument('environment', 
-                        choices=['local', 'dev', 'qat', 'stress', 'staging', 'prod'],
+                        choices=list(ENVIRONMENTS),
                         help='Target environment')
     parser.add_argument('admin_username', help='Keycloak admin username')
     parser.add_argument('admin_password', help='Keycloak admin password')
@@ -415,17 +750,32 @@ def main():
                         help='List of tenant IDs')
     parser.add_argument('--output', '-o', default=None,
                         help='Output file for tokens (default: tokens/{env}.json)')
+    parser.add_argument('--fast', action='store_true',
+                        help='Mint via token exchange/impersonation, falling back to SAML login')
+    parser.add_argument('--exchange-client-id', default=None,
+                        help='Confidential client used for token exchange (fast mode)')
+    parser.add_argument('--exchange-client-secret', default=None,
+                        help='Secret of the token exchange client')
+    parser.add_argument('--profile', nargs='?', const='', default=None, metavar='PREFIX',
+                        help='Write a stage trace (PREFIX.trace.json) and cProfile dump (PREFIX.prof)')
     
     args = parser.parse_args()
+    if args.profile is not None:
+        profiling.start(args.profile or profiling.default_prefix("keycloak_admin_token_generator"))
     
     # Generate tokens
-    generator = KeycloakAdminTokenGenerator(args.environment)
+    generator = KeycloakAdminTokenGenerator(
+        args.environment,
+        exchange_client_id=args.exchange_client_id,
+        exchange_client_secret=args.exchange_client_secret
+    )
     tokens = generator.generate_tokens_for_all_tenants(
         args.admin_username,
         args.admin_password,
         args.user_email,
         args.user_password,
-        args.tenants
+        args.tenants,
+        fast=args.fast
     )
     
     # Save tokens
@@ -0,0 +1,913 @@
+#!/usr/bin/env python3
+"""
+Python Load Engine for YMS Dashboard Service
+Replays the weighted scenario table against the dashboard API and writes
+JMeter-compatible (JTL CSV) results, with an optional unmeasured warmup phase
+and a session mode that loads whole dashboard pages.
+"""
+
+import csv
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import requests
+
+from analyze_results import print_stats_table, read_samples, summarize_by, summarize_by_endpoint
+from circuit_breaker import BREAKER_ACTIONS, TRIPPED_STATUS, CircuitBreaker, breaker_file_for
+from client_monitor import (
+    ClientMonitor, client_file_for, evaluate_saturation, print_saturation_report, read_client_samples
+)
+from config_loader import ENVIRONMENTS, get_base_url
+from phase_timing import (
+    PhaseRecorder, TimedHTTPAdapter, analyze_phases, phases_file_for, print_phase_report, start_timing
+)
+from request_tracing import (
+    REQUEST_ID_HEADER, SERVER_TIMING_HEADER, TRACEPARENT_HEADER, SlowestReservoir, new_trace_ids,
+    parse_server_timing, print_slowest, slowest_file_for
+)
+from scenario_sampler import IdentityPool, SeededScheduler, identities_file_for, load_scenarios
+
+
+API_PATH = "/yms-dashboard-service/api/v1"
+PAGE_LABEL = "dashboard-page"
+
+# Column layout of the results file: JMeter's CSV JTL columns followed by the sample
+# variables run_test.sh asks JMeter to save, so analyze_results.py reads both alike
+JTL_FIELDS = [
+    "timeStamp", "elapsed", "label", "responseCode", "responseMessage", "threadName",
+    "success", "failureMessage", "bytes", "sentBytes", "Latency", "Connect",
+    "api_endpoint", "tenantName", "facilityId", "carrierCount", "requestId"
+]
+
+
+def _head_bytes(start_line: str, headers) -> int:
+    """Size of an HTTP/1.1 start line plus headers as sent on the wire."""
+    return len(start_line) + 2 + sum(len(name) + len(value) + 4 for name, value in headers.items()) + 2
+
+
+def warmup_file_for(results_file: str) -> str:
+    """Path of the warmup results belonging to a results file."""
+    root, ext = os.path.splitext(results_file)
+    return f"{root}_warmup{ext or '.jtl'}"
+
+
+def pages_file_for(results_file: str) -> str:
+    """Path of the page-level results belonging to a results file."""
+    root, ext = os.path.splitext(results_file)
+    return f"{root}_pages{ext or '.jtl'}"
+
+
+def build_dashboard_pages(scenarios: List[Dict], endpoints: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Group scenarios into dashboard pages, one per tenant and facility.
+
+    A page holds the scenario variants of every endpoint the facility's dashboard
+    calls; each page load picks one variant per endpoint.
+
+    Args:
+        scenarios: Rows of the scenario table
+        endpoints: Endpoints shown on the page (defaults to all endpoints in the table)
+
+    Returns:
+        List of {"tenantName", "facilityId", "calls", "weight"} dictionaries, where
+        "calls" maps endpoint to its scenario rows
+    """
+    calls = defaultdict(lambda: defaultdict(list))
+    for scenario in scenarios:
+        if endpoints and scenario["api_endpoint"] not in endpoints:
+            continue
+        calls[(scenario["tenantName"], scenario["facilityId"])][scenario["api_endpoint"]].append(scenario)
+
+    pages = []
+    for (tenant, facility_id), by_endpoint in sorted(calls.items()):
+        pages.append({
+            "tenantName": tenant,
+            "facilityId": facility_id,
+            "calls": dict(by_endpoint),
+            # Facility popularity follows the traffic its scenarios represent
+            "weight": sum(s["weight"] for rows in by_endpoint.values() for s in rows)
+        })
+    return pages
+
+
+def target_file_for(results_file: str) -> str:
+    """Path of the targeted-slice results belonging to a results file."""
+    root, ext = os.path.splitext(results_file)
+    return f"{root}_target{ext or '.jtl'}"
+
+
+def split_targets(scenarios: Sequence[Dict], targets: List[str]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Split scenarios into the targeted slice and the background.
+
+    Args:
+        scenarios: Rows of the scenario table
+        targets: Tenant names, facility ids, or tenant:facility pairs
+
+    Returns:
+        Tuple of (targeted, background) scenario lists
+    """
+    pairs = {tuple(target.split(":", 1)) for target in targets if ":" in target}
+    names = {target for target in targets if ":" not in target}
+
+    targeted, background = [], []
+    for scenario in scenarios:
+        tenant, facility_id = scenario["tenantName"], scenario["facilityId"]
+        if tenant in names or facility_id in names or (tenant, facility_id) in pairs:
+            targeted.append(scenario)
+        else:
+            background.append(scenario)
+    return targeted, background
+
+
+def select_warmup_scenarios(scenarios: List[Dict], share: float, seed: Optional[int] = None) -> List[Dict]:
+    """
+    Pick the scenarios replayed during warmup.
+
+    Takes `share` of the rows of every (endpoint, tenant) group, and at least one,
+    so each endpoint's code path, connection and caches are primed for every tenant.
+    """
+    if share <= 0:
+        return []
+
+    rng = random.Random(seed)
+    groups = defaultdict(list)
+    for scenario in scenarios:
+        groups[(scenario["api_endpoint"], scenario["tenantName"])].append(scenario)
+
+    selected = []
+    for key in sorted(groups):
+        group = groups[key]
+        selected.extend(rng.sample(group, min(len(group), max(1, math.ceil(share * len(group))))))
+    rng.shuffle(selected)
+    return selected
+
+
+class ResultWriter:
+    """Thread-safe JTL (CSV) writer shared by the virtual users of a phase."""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.file = open(filename, "w", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=JTL_FIELDS, extrasaction="ignore")
+        self.writer.writeheader()
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def write(self, sample: Dict):
+        with self.lock:
+            self.writer.writerow(sample)
+            self.count += 1
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class LoadEngine:
+    """Drive the dashboard endpoints with threads of virtual users, like test_plan.jmx."""
+
+    def __init__(
+        self,
+        base_url: str,
+        scenarios: List[Dict],
+        identity_pool: Optional[IdentityPool] = None,
+        seed: Optional[int] = None,
+        connect_timeout: float = 30.0,
+        response_timeout: float = 60.0
+    ):
+        """
+        Initialize the engine.
+
+        Args:
+            base_url: Environment base URL
+            scenarios: Rows of the scenario table (see scenario_sampler.load_scenarios)
+            identity_pool: Optional per-tenant user identities assigned to virtual users
+            seed: Schedule seed; the same seed and data give every virtual user the
+                same scenario sequence (random if omitted, see .seed)
+            connect_timeout: Connect timeout in seconds (test_plan.jmx: 30s)
+            response_timeout: Response timeout in seconds (test_plan.jmx: 60s)
+        """
+        self.base_url = base_url.rstrip("/")
+        self.scenarios = scenarios
+        self.scheduler = SeededScheduler(scenarios, seed=seed)
+        self.identity_pool = identity_pool
+        self.seed = self.scheduler.seed
+        self.timeout = (connect_timeout, response_timeout)
+        self.stop_event = threading.Event()
+        # Next scheduled send per paced virtual user, None while its request is in flight
+        self.next_due = {}
+        # Receives the DNS/connect/TLS/TTFB/body split of every request when set
+        self.phase_recorder: Optional[PhaseRecorder] = None
+        # Keeps the slowest requests per endpoint with their trace ids when set
+        self.reservoir: Optional[SlowestReservoir] = None
+        # Stops or throttles the run when the target degrades, when set
+        self.breaker: Optional[CircuitBreaker] = None
+
+    def enable_breaker(self, breaker: CircuitBreaker):
+        """Protect the target with `breaker`; a stopping breaker ends all phases on its trip."""
+        if breaker.action == "stop":
+            breaker.on_trip = lambda event: self.stop_event.set()
+        self.breaker = breaker
+
+    def _slowdown(self) -> float:
+        return self.breaker.slowdown if self.breaker is not None else 1.0
+
+    @staticmethod
+    def new_session(pool_size: int = 1) -> requests.Session:
+        """HTTP session whose connections time their DNS lookup, connect and TLS handshake."""
+        session = requests.Session()
+        adapter = TimedHTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def schedule_backlog(self, slack: float = 0.1) -> int:
+        """
+        Number of virtual users whose next request is due but not sent.
+
+        A user that is not waiting on a response but has passed its scheduled
+        send time is held back by the client itself (threads, GIL, CPU).
+        """
+        cutoff = time.time() - slack
+        return sum(1 for due in list(self.next_due.values()) if due is not None and due < cutoff)
+
+    def send(self, session: requests.Session, scenario: Dict, thread_name: str) -> Dict:
+        """Send one scenario request and return its sample record."""
+        endpoint = scenario["api_endpoint"]
+        payload = scenario["payload"].encode("utf-8")
+        request_id, traceparent = new_trace_ids()
+        headers = {
+            "tenant": scenario["tenantName"],
+            "Authorization": scenario["authToken"],
+            "Content-Type": "application/json",
+            REQUEST_ID_HEADER: request_id,
+            TRACEPARENT_HEADER: traceparent
+        }
+
+        timings = start_timing()
+        started = time.time()
+        start = time.perf_counter()
+        latency = 0.0
+        server_timing = {}
+        try:
+            # Streamed so the headers (time to first byte) and the body read can be told apart
+            response = session.post(
+                f"{self.base_url}{API_PATH}/{endpoint}",
+                data=payload,
+                headers=headers,
+                timeout=self.timeout,
+                stream=True
+            )
+            latency = time.perf_counter() - start
+            response.content  # reads and caches the whole body
+            elapsed = time.perf_counter() - start
+            success = response.status_code == 200
+            code = str(response.status_code)
+            message = response.reason or ""
+            # Wire sizes like JMeter's bytes/sentBytes: head plus (possibly compressed) body
+            request = response.request
+            sent = _head_bytes(f"{request.method} {request.path_url} HTTP/1.1", request.headers) + len(payload)
+            received = _head_bytes(f"HTTP/1.1 {code} {message}", response.headers) + response.raw.tell()
+            server_timing = parse_server_timing(response.headers.get(SERVER_TIMING_HEADER))
+        except requests.RequestException as e:
+            elapsed = time.perf_counter() - start
+            success = False
+            code = f"Non HTTP response code: {type(e).__name__}"
+            message = str(e)[:200]
+            sent = len(payload)
+            received = 0
+        ended = time.time()
+
+        connect = timings["dns"] + timings["connect"] + timings["tls"]
+        if latency:
+            timings["ttfb"] = max(0.0, latency - connect)
+            timings["body"] = elapsed - latency
+        if self.phase_recorder is not None:
+            self.phase_recorder.record(int(started * 1000), endpoint, elapsed, timings)
+        if self.breaker is not None:
+            self.breaker.record(ended, elapsed * 1000, code)
+        if self.reservoir is not None:
+            self.reservoir.offer(endpoint, elapsed * 1000, {
+                "timestamp": int(started * 1000),
+                "request_id": request_id,
+                "traceparent": traceparent,
+                "tenant": scenario["tenantName"],
+                "facility": scenario["facilityId"],
+                "code": code,
+                "payload": scenario["payload"],
+                "phases": {phase: round(value * 1000, 3) for phase, value in timings.items()},
+                "server_timing": server_timing
+            })
+
+        return {
+            "timeStamp": int(started * 1000),
+            "elapsed": int(elapsed * 1000),
+            "label": f"Dynamic API Request - {endpoint} - {scenario['tenantName']} - Facility {scenario['facilityId']}",
+            "responseCode": code,
+            "responseMessage": message,
+            "threadName": thread_name,
+            "success": "true" if success else "false",
+            "failureMessage": "" if success else f"Expected response code 200, got {code}",
+            "bytes": received,
+            "sentBytes": sent,
+            "Latency": int(latency * 1000),
+            "Connect": int(connect * 1000),
+            "api_endpoint": endpoint,
+            "tenantName": scenario["tenantName"],
+            "facilityId": scenario["facilityId"],
+            "carrierCount": scenario.get("carrierCount", ""),
+            "requestId": request_id,
+            "_ended": ended
+        }
+
+    def _virtual_user(
+        self,
+        index: int,
+        thread_name: str,
+        writer: ResultWriter,
+        start_at: float,
+        deadline: float,
+        rpm: float,
+        next_scenario: Callable[[int], Optional[Dict]]
+    ):
+        """One virtual user: own connection pool, paced at `rpm` requests per minute."""
+        interval = 60.0 / rpm if rpm > 0 else 0.0
+        session = self.new_session()
+
+        if self.stop_event.wait(max(0.0, start_at - time.time())):
+            return
+
+        next_send = time.time()
+        self.next_due[index] = next_send
+        while not self.stop_event.is_set() and time.time() < deadline:
+            scenario = next_scenario(index)
+            if scenario is None:
+                break
+            if self.identity_pool is not None:
+                scenario = self.identity_pool.apply(scenario, index)
+
+            self.next_due[index] = None
+            writer.write(self.send(session, scenario, thread_name))
+
+            # Fixed schedule like JMeter's constant throughput timer; a user that fell
+            # behind by more than one interval resumes from now instead of bursting
+            next_send += interval * self._slowdown()
+            now = time.time()
+            if next_send < now - interval:
+                next_send = now
+            self.next_due[index] = next_send
+            if self.stop_event.wait(max(0.0, min(next_send, deadline) - now)):
+                break
+
+        self.next_due.pop(index, None)
+        session.close()
+
+    def run_phase(
+        self,
+        phase: str,
+        results_file: str,
+        threads: int,
+        duration: float,
+        rpm: float,
+        rampup: float = 0.0,
+        next_scenario: Optional[Callable[[int], Optional[Dict]]] = None
+    ) -> int:
+        """
+        Run one phase and write its samples to `results_file`.
+
+        Args:
+            phase: Phase name, used in thread names
+            results_file: JTL output path
+            threads: Number of virtual users
+            duration: Phase length in seconds, ramp-up included (as in JMeter)
+            rpm: Requests per minute per virtual user
+            rampup: Seconds over which virtual users are started
+            next_scenario: Callable returning the next scenario for a virtual user,
+                or None to stop it (defaults to the virtual user's seeded stream)
+
+        Returns:
+            Number of samples written
+        """
+        writer = ResultWriter(results_file)
+        start = time.time()
+        workers = self._start_users(phase, writer, threads, start, start + duration, rpm, rampup,
+                                    next_scenario or self.scheduler.next)
+        self._wait(workers, [writer])
+        return writer.count
+
+    def _start_users(
+        self,
+        phase: str,
+        writer: ResultWriter,
+        threads: int,
+        start: float,
+        deadline: float,
+        rpm: float,
+        rampup: float,
+        next_scenario: Callable[[int], Optional[Dict]],
+        first_index: int = 0
+    ) -> List[threading.Thread]:
+        """Start paced virtual users; indices from `first_index` keep identities distinct across phases."""
+        workers = []
+        for i in range(threads):
+            start_at = start + (rampup * i / threads if threads else 0)
+            worker = threading.Thread(
+                target=self._virtual_user,
+                args=(first_index + i, f"{phase} 1-{i + 1}", writer, start_at, deadline, rpm, next_scenario),
+                daemon=True
+            )
+            worker.start()
+            workers.append(worker)
+        return workers
+
+    def _wait(self, workers: List[threading.Thread], writers: List[ResultWriter]):
+        """Wait for virtual users to finish (Ctrl+C stops them), then close the writers."""
+        try:
+            for worker in workers:
+                while worker.is_alive():
+                    worker.join(0.5)
+        except KeyboardInterrupt:
+            print("\nInterrupted, stopping virtual users...")
+            self.stop_event.set()
+            for worker in workers:
+                worker.join()
+        finally:
+            for writer in writers:
+                writer.close()
+
+    def run_targeted(
+        self,
+        results_file: str,
+        targets: List[str],
+        threads: int,
+        duration: float,
+        rpm: float,
+        rampup: float = 0.0,
+        target_threads: int = 1,
+        target_rpm: float = 60.0
+    ) -> Tuple[int, int]:
+        """
+        Concentrate a fixed rate on selected tenants/facilities over background load.
+
+        The targeted slice runs in its own virtual users at `target_rpm` in total and
+        writes to the `_target` companion file; the background users keep sending the
+        remaining scenarios to `results_file`, so both sides get separate statistics.
+
+        Args:
+            results_file: JTL output path for background samples
+            targets: Tenant names, facility ids, or tenant:facility pairs
+            threads: Number of background virtual users
+            duration: Run length in seconds, ramp-up included
+            rpm: Requests per minute per background virtual user
+            rampup: Seconds over which virtual users are started
+            target_threads: Number of virtual users for the targeted slice
+            target_rpm: Total requests per minute on the targeted slice
+
+        Returns:
+            Tuple of (background samples, targeted samples) written
+        """
+        target, background = split_targets(self.scenarios, targets)
+        if not target:
+            raise ValueError(f"No scenarios match the targets: {', '.join(targets)}")
+
+        print(f"Targeting {len(target)} scenarios ({', '.join(targets)}) at {target_rpm:g} rpm, "
+              f"{len(background)} background scenarios at {rpm:g} rpm per user")
+
+        writer = ResultWriter(results_file)
+        target_writer = ResultWriter(target_file_for(results_file))
+        start = time.time()
+        deadline = start + duration
+
+        workers = []
+        if background and threads:
+            workers += self._start_users("Background", writer, threads, start, deadline, rpm, rampup,
+                                         SeededScheduler(background, seed=self.seed).next)
+        workers += self._start_users("Target", target_writer, target_threads, start, deadline,
+                                     target_rpm / target_threads, rampup,
+                                     SeededScheduler(target, seed=self.seed).next, first_index=threads)
+        self._wait(workers, [writer, target_writer])
+        return writer.count, target_writer.count
+
+    def load_page(
+        self,
+        sessions: List[requests.Session],
+        executor: ThreadPoolExecutor,
+        page: Dict,
+        rng: random.Random,
+        virtual_user: int,
+        thread_name: str
+    ) -> Tuple[Dict, List[Dict]]:
+        """
+        Load one dashboard page: all of its endpoint calls in parallel.
+
+        Call n of the page goes through sessions[n], so no session is used by two
+        executor threads at once (requests.Session is not thread-safe).
+
+        Returns:
+            Tuple of the page sample and the per-call samples
+        """
+        calls = []
+        for endpoint in sorted(page["calls"]):
+            rows = page["calls"][endpoint]
+            scenario = rows[0] if len(rows) == 1 else rng.choices(rows, weights=[s["weight"] for s in rows])[0]
+            if self.identity_pool is not None:
+                scenario = self.identity_pool.apply(scenario, virtual_user)
+            calls.append(scenario)
+
+        started = time.time()
+        samples = list(executor.map(
+            lambda session, scenario: self.send(session, scenario, thread_name), sessions, calls
+        ))
+        # The page is ready when its slowest call returns
+        elapsed = max(sample["_ended"] for sample in samples) - started
+        failed = [sample for sample in samples if sample["success"] != "true"]
+
+        page_sample = {
+            "timeStamp": int(started * 1000),
+            "elapsed": int(elapsed * 1000),
+            "label": f"Dashboard Page - {page['tenantName']} - Facility {page['facilityId']}",
+            "responseCode": failed[0]["responseCode"] if failed else "200",
+            "responseMessage": f"{len(failed)} of {len(samples)} calls failed" if failed else "OK",
+            "threadName": thread_name,
+            "success": "false" if failed else "true",
+            "failureMessage": failed[0]["failureMessage"] if failed else "",
+            "bytes": sum(sample["bytes"] for sample in samples),
+            "sentBytes": sum(sample["sentBytes"] for sample in samples),
+            "Latency": max(sample["Latency"] for sample in samples),
+            "Connect": "",
+            "api_endpoint": PAGE_LABEL,
+            "tenantName": page["tenantName"],
+            "facilityId": page["facilityId"],
+            "carrierCount": ""
+        }
+        return page_sample, samples
+
+    def _session_user(
+        self,
+        index: int,
+        writer: ResultWriter,
+        page_writer: ResultWriter,
+        start_at: float,
+        deadline: float,
+        pages: List[Dict],
+        think_time: float,
+        refresh_interval: float,
+        refreshes: int
+    ):
+        """
+        One virtual user browsing dashboards: open a facility's page, poll it
+        `refreshes` times every `refresh_interval` seconds, think, open the next one.
+        """
+        thread_name = f"Session 1-{index + 1}"
+        rng = self.scheduler.rng_for(f"session-{index}")
+        cumulative_weights = list(accumulate(page["weight"] for page in pages))
+        width = max(len(page["calls"]) for page in pages)
+
+        # Browser-like: one connection per parallel call, reused across page loads
+        sessions = [self.new_session() for _ in range(width)]
+        executor = ThreadPoolExecutor(max_workers=width, thread_name_prefix=thread_name)
+        try:
+            if self.stop_event.wait(max(0.0, start_at - time.time())):
+                return
+
+            while not self.stop_event.is_set() and time.time() < deadline:
+                page = rng.choices(pages, cum_weights=cumulative_weights)[0]
+                for round_number in range(refreshes + 1):
+                    pause = refresh_interval * self._slowdown()
+                    if round_number and self.stop_event.wait(max(0.0, min(pause, deadline - time.time()))):
+                        break
+                    if time.time() >= deadline:
+                        break
+                    page_sample, samples = self.load_page(sessions, executor, page, rng, index, thread_name)
+                    for sample in samples:
+                        writer.write(sample)
+                    page_writer.write(page_sample)
+
+                # Think time varies +/-50% around the mean, so users do not move in lockstep
+                pause = think_time * rng.uniform(0.5, 1.5) * self._slowdown()
+                if self.stop_event.wait(max(0.0, min(pause, deadline - time.time()))):
+                    break
+        finally:
+            executor.shutdown(wait=True)
+            for session in sessions:
+                session.close()
+
+    def run_sessions(
+        self,
+        results_file: str,
+        threads: int,
+        duration: float,
+        rampup: float = 0.0,
+        think_time: float = 5.0,
+        refresh_interval: float = 30.0,
+        refreshes: int = 3,
+        endpoints: Optional[List[str]] = None
+    ) -> Tuple[int, int]:
+        """
+        Run the session model: each virtual user loads whole dashboard pages.
+
+        Per-call samples go to `results_file`, page-level samples (the fan-out as a
+        whole) to its `_pages` companion file.
+
+        Args:
+            results_file: JTL output path for per-call samples
+            threads: Number of virtual users
+            duration: Run length in seconds, ramp-up included
+            rampup: Seconds over which virtual users are started
+            think_time: Mean pause in seconds before opening the next dashboard
+            refresh_interval: Seconds between polls of an open dashboard
+            refreshes: Polls per dashboard visit after the initial load
+            endpoints: Endpoints shown on the page (defaults to all in the table)
+
+        Returns:
+            Tuple of (call samples, page samples) written
+        """
+        pages = build_dashboard_pages(self.scenarios, endpoints)
+        if not pages:
+            raise ValueError("No dashboard pages: no scenarios match the page endpoints")
+
+        widths = sorted({len(page["calls"]) for page in pages})
+        print(f"Sessions: {len(pages)} dashboard pages, {widths[0]}-{widths[-1]} parallel calls each, "
+              f"think {think_time:g}s, refresh every {refresh_interval:g}s x{refreshes}")
+
+        writer = ResultWriter(results_file)
+        page_writer = ResultWriter(pages_file_for(results_file))
+        start = time.time()
+        deadline = start + duration
+
+        workers = []
+        for i in range(threads):
+            start_at = start + (rampup * i / threads if threads else 0)
+            worker = threading.Thread(
+                target=self._session_user,
+                args=(i, writer, page_writer, start_at, deadline, pages, think_time, refresh_interval, refreshes),
+                daemon=True
+            )
+            worker.start()
+            workers.append(worker)
+
+        self._wait(workers, [writer, page_writer])
+        return writer.count, page_writer.count
+
+    def run_warmup(
+        self,
+        results_file: str,
+        share: float,
+        rpm: float,
+        threads: int = 2,
+        max_duration: float = 300.0
+    ) -> int:
+        """
+        Replay a share of every scenario at a low rate before the measured phase.
+
+        Samples go to their own results file, so cold-start latencies are recorded
+        but never mixed into the measured statistics.
+
+        Args:
+            results_file: JTL output path for warmup samples
+            share: Share (0-1) of each endpoint/tenant group's scenarios to replay
+            rpm: Total warmup rate in requests per minute
+            threads: Number of warmup virtual users
+            max_duration: Upper bound on the warmup length in seconds
+
+        Returns:
+            Number of warmup samples written
+        """
+        selected = select_warmup_scenarios(self.scenarios, share, self.seed)
+        if not selected:
+            return 0
+
+        queue = iter(selected)
+        lock = threading.Lock()
+
+        def next_scenario(index):
+            with lock:
+                return next(queue, None)
+
+        expected = len(selected) / rpm * 60 if rpm > 0 else 0
+        print(f"Warmup: {len(selected)} requests at {rpm:g} rpm "
+              f"(~{min(expected, max_duration):.0f}s, max {max_duration:.0f}s)")
+        return self.run_phase("Warmup", results_file, threads, max_duration, rpm / threads, next_scenario=next_scenario)
+
+
+def print_warmup_comparison(warmup_stats: Dict[str, Dict], measured_stats: Dict[str, Dict]):
+    """Compare cold (warmup) and warm (measured) median latency per endpoint."""
+    print("\nCold-start cost (warmup p50 vs measured p50, ms)")
+    print("-" * 86)
+    print(f"{'endpoint':<30} {'warmup':>8} {'measured':>9} {'ratio':>7}")
+    for endpoint, stats in warmup_stats.items():
+        measured = measured_stats.get(endpoint)
+        if not measured or not measured["count"]:
+            continue
+        ratio = stats["p50"] / measured["p50"] if measured["p50"] else 0.0
+        print(f"{endpoint:<30} {stats['p50']:>8.0f} {measured['p50']:>9.0f} {ratio:>6.1f}x")
+
+
+def print_target_comparison(target_stats: Dict[str, Dict], background_stats: Dict[str, Dict]):
+    """Compare the targeted slice with the background per endpoint (p50 and p95)."""
+    print("\nTargeted slice vs background (ms)")
+    print("-" * 86)
+    print(f"{'endpoint':<30} {'target p50':>11} {'bg p50':>8} {'target p95':>11} {'bg p95':>8} {'p95 ratio':>10}")
+    for endpoint, stats in target_stats.items():
+        background = background_stats.get(endpoint)
+        if not background or not background["count"]:
+            continue
+        ratio = stats["p95"] / background["p95"] if background["p95"] else 0.0
+        print(f"{endpoint:<30} {stats['p50']:>11.0f} {background['p50']:>8.0f} "
+              f"{stats['p95']:>11.0f} {background['p95']:>8.0f} {ratio:>9.1f}x")
+
+
+def positive_int(value: str) -> int:
+    """argparse type for counts of virtual users or workers, which must be at least 1."""
+    import argparse
+
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the dashboard stress test with the Python load engine")
+    parser.add_argument("env", choices=list(ENVIRONMENTS), help="Target environment")
+    parser.add_argument("-t", "--threads", type=positive_int, default=10, help="Number of virtual users (default: 10)")
+    parser.add_argument("-r", "--rampup", type=float, default=1, help="Ramp-up time in seconds (default: 1)")
+    parser.add_argument("-d", "--duration", type=float, default=10, help="Test duration in seconds (default: 10)")
+    parser.add_argument("--rpm", type=float, default=3, help="Requests per minute per user (default: 3)")
+    parser.add_argument("-f", "--data", default="test_data.csv", help="Scenario file (default: test_data.csv)")
+    parser.add_argument("-o", "--output", default=None, help="Results file (default: results_timestamp.jtl)")
+    parser.add_argument("--base-url", default=None, help="Override the environment base URL")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Schedule seed: same seed and data replay the same request order per user")
+    parser.add_argument("--warmup-share", type=float, default=0.0,
+                        help="Share (0-1) of each endpoint/tenant's scenarios sent before measuring (default: 0)")
+    parser.add_argument("--warmup-rpm", type=float, default=60,
+                        help="Total warmup rate in requests per minute (default: 60)")
+    parser.add_argument("--warmup-threads", type=positive_int, default=2, help="Warmup virtual users (default: 2)")
+    parser.add_argument("--warmup-max-duration", type=float, default=300,
+                        help="Upper bound on warmup length in seconds (default: 300)")
+    parser.add_argument("--session", action="store_true",
+                        help="Load whole dashboard pages (parallel calls per tenant/facility) instead of single requests")
+    parser.add_argument("--think-time", type=float, default=5,
+                        help="Session mode: mean pause before opening the next dashboard, seconds (default: 5)")
+    parser.add_argument("--refresh-interval", type=float, default=30,
+                        help="Session mode: seconds between polls of an open dashboard (default: 30)")
+    parser.add_argument("--refreshes", type=int, default=3,
+                        help="Session mode: polls per dashboard visit after the first load (default: 3)")
+    parser.add_argument("--page-endpoints", default=None,
+                        help="Session mode: comma-separated endpoints on the page (default: all in the data file)")
+    parser.add_argument("--target", default=None,
+                        help="Comma-separated tenants, facility ids or tenant:facility pairs to load in isolation")
+    parser.add_argument("--target-rpm", type=float, default=60,
+                        help="Targeting mode: total requests per minute on the targeted slice (default: 60)")
+    parser.add_argument("--target-threads", type=positive_int, default=5,
+                        help="Targeting mode: virtual users for the targeted slice (default: 5)")
+    parser.add_argument("--slowest", type=int, default=10,
+                        help="Slowest requests kept per endpoint with trace ids and payloads (default: 10)")
+    parser.add_argument("--breaker", choices=BREAKER_ACTIONS, default=None,
+                        help="Stop or throttle the run when the target's error rate or p95 breaches its limit")
+    parser.add_argument("--max-error-rate", type=float, default=0.5,
+                        help="Breaker: highest tolerated share (0-1) of 5xx/timeouts in the window (default: 0.5)")
+    parser.add_argument("--max-p95-ms", type=float, default=None,
+                        help="Breaker: highest tolerated p95 latency in the window (default: none)")
+    parser.add_argument("--breaker-window", type=float, default=30,
+                        help="Breaker: sliding window in seconds (default: 30)")
+    parser.add_argument("--throttle-factor", type=float, default=4,
+                        help="Breaker: pacing slowdown while throttled (default: 4)")
+    parser.add_argument("--breaker-cooldown", type=float, default=60,
+                        help="Breaker: seconds throttled before recovery is checked (default: 60)")
+    parser.add_argument("--no-client-monitor", action="store_true",
+                        help="Do not sample this process's CPU/memory/sockets into results_*_client.csv")
+    args = parser.parse_args()
+
+    results_file = args.output or f"results_{time.strftime('%Y%m%d_%H%M%S')}.jtl"
+    scenarios = load_scenarios(args.data)
+    identity_pool = None
+    if os.path.exists(identities_file_for(args.data)):
+        identity_pool = IdentityPool.from_file(identities_file_for(args.data))
+        print(f"✓ Using identities from {identities_file_for(args.data)}")
+
+    base_url = args.base_url or get_base_url(args.env)
+    engine = LoadEngine(base_url, scenarios, identity_pool, seed=args.seed)
+    if args.breaker:
+        engine.enable_breaker(CircuitBreaker(
+            args.max_error_rate, args.max_p95_ms, args.breaker_window,
+            action=args.breaker, slowdown=args.throttle_factor, cooldown_seconds=args.breaker_cooldown
+        ))
+
+    print(f"Running Python load engine against {args.env}:")
+    print(f"  Threads: {args.threads}")
+    print(f"  Ramp-up: {args.rampup} seconds")
+    print(f"  Duration: {args.duration} seconds")
+    if args.session:
+        print(f"  Mode: dashboard sessions (think {args.think_time}s, "
+              f"refresh {args.refresh_interval}s x{args.refreshes})")
+    else:
+        print(f"  Requests per minute per user: {args.rpm}")
+    if args.breaker:
+        limits = f"error rate > {args.max_error_rate * 100:g}%"
+        if args.max_p95_ms:
+            limits += f" or p95 > {args.max_p95_ms:g} ms"
+        print(f"  Circuit breaker: {args.breaker} on {limits} over {args.breaker_window:g}s")
+    if args.target:
+        print(f"  Target: {args.target} ({args.target_rpm} rpm over {args.target_threads} users)")
+    print(f"  Scenarios: {len(scenarios)} from {args.data}")
+    print(f"  Seed: {engine.seed} (schedule fingerprint {engine.scheduler.fingerprint(args.threads)})")
+    print(f"  Results file: {results_file}")
+    print("")
+
+    warmup_file = None
+    if args.warmup_share > 0:
+        warmup_file = warmup_file_for(results_file)
+        count = engine.run_warmup(warmup_file, args.warmup_share, args.warmup_rpm,
+                                  args.warmup_threads, args.warmup_max_duration)
+        print(f"✓ Warmup finished: {count} samples in {warmup_file}\n")
+
+    pages_file = pages_file_for(results_file) if args.session else None
+    target_file = target_file_for(results_file) if args.target else None
+    interrupted = engine.stop_event.is_set()
+    if not interrupted:
+        engine.phase_recorder = PhaseRecorder(phases_file_for(results_file))
+        engine.reservoir = SlowestReservoir(args.slowest)
+    monitor = None
+    if not args.no_client_monitor and not interrupted:
+        monitor = ClientMonitor(client_file_for(results_file), backlog=engine.schedule_backlog).start()
+    if args.session and not interrupted:
+        page_endpoints = args.page_endpoints.split(",") if args.page_endpoints else None
+        count, page_count = engine.run_sessions(
+            results_file, args.threads, args.duration, args.rampup,
+            args.think_time, args.refresh_interval, args.refreshes, page_endpoints
+        )
+        print(f"✓ Test finished: {count} calls in {results_file}, {page_count} page loads in {pages_file}")
+    elif args.target and not interrupted:
+        count, target_count = engine.run_targeted(
+            results_file, args.target.split(","), args.threads, args.duration, args.rpm, args.rampup,
+            args.target_threads, args.target_rpm
+        )
+        print(f"✓ Test finished: {count} background samples in {results_file}, "
+              f"{target_count} targeted samples in {target_file}")
+    elif not interrupted:
+        count = engine.run_phase("Load", results_file, args.threads, args.duration, args.rpm, args.rampup)
+        print(f"✓ Test finished: {count} samples in {results_file}")
+    if monitor:
+        monitor.stop()
+        print(f"✓ Client resources: {monitor.count} samples in {monitor.output_file}")
+    if engine.phase_recorder:
+        engine.phase_recorder.close()
+        print(f"✓ Request phases: {engine.phase_recorder.count} requests in {engine.phase_recorder.filename}")
+    if engine.breaker:
+        engine.breaker.write(breaker_file_for(results_file))
+        if engine.breaker.tripped:
+            print(f"✗ Circuit breaker tripped {sum(e['event'] == 'trip' for e in engine.breaker.events)}x, "
+                  f"first at {engine.breaker.events[0]['time']}: {breaker_file_for(results_file)}")
+    if engine.reservoir:
+        engine.reservoir.write(slowest_file_for(results_file))
+        print(f"✓ Slowest requests per endpoint: {slowest_file_for(results_file)}")
+
+    measured_stats = summarize_by_endpoint(read_samples(results_file)) if os.path.exists(results_file) else {}
+    print_stats_table(measured_stats, "Background latency (ms) by endpoint" if target_file else "Latency (ms) by endpoint",
+                      "endpoint")
+    if pages_file and os.path.exists(pages_file):
+        page_stats = summarize_by_endpoint(read_samples(pages_file))
+        print_stats_table(page_stats, "Page latency (ms) - slowest call of each fan-out", "page")
+    if target_file and os.path.exists(target_file):
+        target_stats = summarize_by_endpoint(read_samples(target_file))
+        print_stats_table(target_stats, "Targeted slice latency (ms) by endpoint", "endpoint")
+        print_stats_table(
+            summarize_by(read_samples(target_file), lambda sample: f"{sample['tenant']}/{sample['facility']}"),
+            "Targeted slice latency (ms) by tenant/facility", "tenant/facility"
+        )
+        print_target_comparison(target_stats, measured_stats)
+    if warmup_file:
+        warmup_stats = summarize_by_endpoint(read_samples(warmup_file))
+        print_stats_table(warmup_stats, "Warmup latency (ms) by endpoint - excluded from the results above", "endpoint")
+        print_warmup_comparison(warmup_stats, measured_stats)
+    if engine.phase_recorder and engine.phase_recorder.count:
+        print_phase_report(analyze_phases(engine.phase_recorder.filename))
+    if engine.reservoir:
+        print_slowest(engine.reservoir.slowest(), limit=3)
+
+    status = 0
+    if monitor and monitor.count:
+        report = evaluate_saturation(read_client_samples(monitor.output_file))
+        if not print_saturation_report(report, monitor.count):
+            status = 3
+    if engine.breaker and engine.breaker.tripped:
+        status = TRIPPED_STATUS
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
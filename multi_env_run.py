@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Multi-Environment Runs for YMS Dashboard Service
+Fires the same seeded scenario schedule at several environments at once from one
+process and compares their latency per endpoint side by side.
+
+Every environment gets its own LoadEngine (own connection pools, results file,
+phase timings and slowest requests) over the same scenario table and seed, so
+virtual user n sends the same requests in the same order everywhere. Only the
+base URL and the tokens differ: each tenant's authToken is swapped for the one
+in tokens/{env}.json.
+"""
+
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from analyze_results import read_samples, summarize, summarize_by_endpoint
+from client_monitor import (
+    ClientMonitor, client_file_for, evaluate_saturation, print_saturation_report, read_client_samples
+)
+from config_loader import ENVIRONMENTS, get_base_url
+from load_engine import LoadEngine, positive_int
+from phase_timing import PhaseRecorder, phases_file_for
+from request_tracing import SlowestReservoir, slowest_file_for
+from scenario_sampler import IdentityPool, load_scenarios
+
+ALL_ENDPOINTS = "ALL"
+
+
+def parse_env_spec(spec: str) -> Tuple[str, Optional[str]]:
+    """
+    Split an environment argument into name and base URL override.
+
+    Args:
+        spec: "qat" or "staging=https://staging.example.com"
+
+    Returns:
+        Tuple of (environment, base URL or None for the configured one)
+    """
+    env, _, base_url = spec.partition("=")
+    env = env.strip().lower()
+    if env not in ENVIRONMENTS:
+        raise ValueError(f"Unknown environment: {env} (expected one of {', '.join(ENVIRONMENTS)})")
+    return env, base_url.strip() or None
+
+
+def env_results_file(results_file: str, env: str) -> str:
+    """Results file of one environment: <root>_<env>.jtl."""
+    root, ext = os.path.splitext(results_file)
+    return f"{root}_{env}{ext or '.jtl'}"
+
+
+def identity_pool_for(env: str, token_file: Optional[str] = None) -> Optional[IdentityPool]:
+    """Tokens of an environment as a one-identity-per-tenant pool (None if there is no token store)."""
+    token_file = token_file or f"tokens/{env}.json"
+    if not os.path.exists(token_file):
+        return None
+    return IdentityPool.from_token_store(token_file)
+
+
+class EnvironmentRun:
+    """One environment of a multi-environment run."""
+
+    def __init__(self, env: str, base_url: str, engine: LoadEngine, results_file: str):
+        self.env = env
+        self.base_url = base_url
+        self.engine = engine
+        self.results_file = results_file
+        self.count = 0
+
+    def run(self, threads: int, duration: float, rpm: float, rampup: float):
+        self.count = self.engine.run_phase(self.env, self.results_file, threads, duration, rpm, rampup)
+
+
+def run_environments(runs: List[EnvironmentRun], threads: int, duration: float, rpm: float, rampup: float):
+    """Run all environments concurrently; Ctrl+C stops every one of them."""
+    workers = [
+        threading.Thread(target=run.run, args=(threads, duration, rpm, rampup), name=run.env, daemon=True)
+        for run in runs
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            while worker.is_alive():
+                worker.join(0.5)
+    except KeyboardInterrupt:
+        print("\nInterrupted, stopping virtual users in all environments...")
+        for run in runs:
+            run.engine.stop_event.set()
+        for worker in workers:
+            worker.join()
+
+
+def compare_environments(results_files: Dict[str, str]) -> Dict[str, Dict[str, Dict]]:
+    """
+    Latency statistics per endpoint and environment.
+
+    Args:
+        results_files: Environment -> results file
+
+    Returns:
+        Dictionary of endpoint -> environment -> statistics (see analyze_results.summarize);
+        the ALL row summarizes every endpoint together
+    """
+    comparison = {}
+    for env, filename in results_files.items():
+        if not os.path.exists(filename):
+            continue
+        samples = list(read_samples(filename))
+        for endpoint, stats in summarize_by_endpoint(samples).items():
+            comparison.setdefault(endpoint, {})[env] = stats
+        comparison.setdefault(ALL_ENDPOINTS, {})[env] = summarize(
+            [sample["elapsed"] for sample in samples], sum(not sample["success"] for sample in samples)
+        )
+    return {endpoint: comparison[endpoint] for endpoint in sorted(comparison, key=lambda e: (e == ALL_ENDPOINTS, e))}
+
+
+def print_environment_comparison(comparison: Dict[str, Dict[str, Dict]], envs: List[str]):
+    """Print p50/p95/error rate per endpoint side by side, with p95 relative to the first environment."""
+    baseline = envs[0]
+    print(f"\nLatency (ms) by endpoint and environment - p50/p95, error %, p95 vs {baseline}")
+    print("-" * (32 + 26 * len(envs)))
+    print(f"{'endpoint':<30} " + " ".join(f"{env:>25}" for env in envs))
+    for endpoint, by_env in comparison.items():
+        cells = []
+        for env in envs:
+            stats = by_env.get(env)
+            if not stats or not stats["count"]:
+                cells.append(f"{'-':>25}")
+                continue
+            cell = f"{stats['p50']:.0f}/{stats['p95']:.0f} {stats['errors'] / stats['count'] * 100:.1f}%"
+            base = by_env.get(baseline)
+            if env != baseline and base and base["p95"]:
+                cell += f" {stats['p95'] / base['p95']:.1f}x"
+            cells.append(f"{cell:>25}")
+        print(f"{endpoint:<30} " + " ".join(cells))
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the same seeded load against several environments at once")
+    parser.add_argument("envs", nargs="+", metavar="ENV[=BASE_URL]",
+                        help="Environments to compare, the first is the baseline (e.g. qat staging)")
+    parser.add_argument("-t", "--threads", type=positive_int, default=10, help="Virtual users per environment (default: 10)")
+    parser.add_argument("-r", "--rampup", type=float, default=1, help="Ramp-up time in seconds (default: 1)")
+    parser.add_argument("-d", "--duration", type=float, default=10, help="Test duration in seconds (default: 10)")
+    parser.add_argument("--rpm", type=float, default=3, help="Requests per minute per user (default: 3)")
+    parser.add_argument("-f", "--data", default="test_data.csv", help="Scenario file (default: test_data.csv)")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Results file root; each environment writes <root>_<env>.jtl (default: results_timestamp.jtl)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Schedule seed shared by all environments (random if omitted, printed)")
+    parser.add_argument("--tokens", action="append", default=[], metavar="ENV=FILE",
+                        help="Token store of an environment (default: tokens/{env}.json, repeatable)")
+    parser.add_argument("--slowest", type=int, default=10,
+                        help="Slowest requests kept per endpoint and environment (default: 10)")
+    parser.add_argument("--no-client-monitor", action="store_true",
+                        help="Do not sample this process's CPU/memory/sockets into results_*_client.csv")
+    args = parser.parse_args()
+
+    try:
+        specs = [parse_env_spec(spec) for spec in args.envs]
+    except ValueError as e:
+        print(f"✗ {e}")
+        return 1
+    if len({env for env, _ in specs}) != len(specs):
+        print("✗ Each environment can only be given once")
+        return 1
+    malformed = [option for option in args.tokens if "=" not in option]
+    if malformed:
+        print(f"✗ --tokens expects ENV=FILE, got: {', '.join(malformed)}")
+        return 1
+    token_files = {env.strip().lower(): path for env, path in (option.split("=", 1) for option in args.tokens)}
+
+    results_file = args.output or f"results_{time.strftime('%Y%m%d_%H%M%S')}.jtl"
+    scenarios = load_scenarios(args.data)
+    tenants = {scenario["tenantName"] for scenario in scenarios}
+
+    runs = []
+    seed = args.seed
+    for env, base_url in specs:
+        identity_pool = identity_pool_for(env, token_files.get(env))
+        if identity_pool is None:
+            print(f"⚠ No token store for {env}, sending the tokens from {args.data}")
+        else:
+            missing = sorted(tenants - set(identity_pool.identities))
+            if missing:
+                print(f"⚠ {env}: no tokens for {', '.join(missing)}, sending the tokens from {args.data}")
+        engine = LoadEngine(base_url or get_base_url(env), scenarios, identity_pool, seed=seed)
+        # The first engine picks the seed when none was given; the others reuse it
+        seed = engine.seed
+        engine.phase_recorder = PhaseRecorder(phases_file_for(env_results_file(results_file, env)))
+        engine.reservoir = SlowestReservoir(args.slowest)
+        runs.append(EnvironmentRun(env, engine.base_url, engine, env_results_file(results_file, env)))
+
+    print(f"Running Python load engine against {len(runs)} environments at once:")
+    for run in runs:
+        print(f"  {run.env}: {run.base_url} -> {run.results_file}")
+    print(f"  Threads: {args.threads} per environment")
+    print(f"  Ramp-up: {args.rampup} seconds")
+    print(f"  Duration: {args.duration} seconds")
+    print(f"  Requests per minute per user: {args.rpm}")
+    print(f"  Scenarios: {len(scenarios)} from {args.data}")
+    print(f"  Seed: {seed} (schedule fingerprint {runs[0].engine.scheduler.fingerprint(args.threads)})")
+    print("")
+
+    monitor = None
+    if not args.no_client_monitor:
+        monitor = ClientMonitor(
+            client_file_for(results_file),
+            backlog=lambda: sum(run.engine.schedule_backlog() for run in runs)
+        ).start()
+    run_environments(runs, args.threads, args.duration, args.rpm, args.rampup)
+
+    if monitor:
+        monitor.stop()
+        print(f"✓ Client resources: {monitor.count} samples in {monitor.output_file}")
+    for run in runs:
+        run.engine.phase_recorder.close()
+        run.engine.reservoir.write(slowest_file_for(run.results_file))
+        print(f"✓ {run.env}: {run.count} samples in {run.results_file} "
+              f"(phases {run.engine.phase_recorder.filename}, slowest {slowest_file_for(run.results_file)})")
+
+    envs = [run.env for run in runs]
+    print_environment_comparison(compare_environments({run.env: run.results_file for run in runs}), envs)
+
+    status = 0
+    if monitor and monitor.count:
+        # One process drives every environment, so a saturated client skews all of them
+        report = evaluate_saturation(read_client_samples(monitor.output_file))
+        if not print_saturation_report(report, monitor.count):
+            status = 3
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Payload Parameter Generators for YMS Dashboard Service
+Draws request parameters from a configurable space instead of fixed values,
+so the load does not collapse onto a handful of cached queries.
+"""
+
+import random
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+FORECAST_TIMEZONES = [
+    "GMT",
+    "America/New_York",
+    "America/Chicago",
+    "America/Denver",
+    "America/Los_Angeles",
+    "Europe/London",
+    "Asia/Kolkata"
+]
+FORECAST_NUM_DAYS = [1, 3, 7, 14, 30]
+
+
+class ForecastWindowGenerator:
+    """
+    Generate shipment-volume-forecast query windows with an explicit repeat ratio.
+
+    For every batch of requests, `repeat_ratio` of them are spread over a small pool
+    of "hot" windows (the warm/cached path) and the rest get a window that is unique
+    within the batch (the cold path). Repeats are returned as weights so they fit the
+    deduplicated scenario table.
+
+    The ratio describes the generated rows, not the run: consumers that replay rows
+    (JMeter's recycling CSV, the engine's draws with replacement) send a "unique"
+    window again once it is cached. Generate at least as many windows per facility and
+    direction as the run sends forecast requests there to keep the cold share.
+    """
+
+    def __init__(
+        self,
+        repeat_ratio: float = 0.0,
+        hot_keys: int = 1,
+        start_offset_days: Tuple[int, int] = (-14, 14),
+        num_days: Optional[Sequence[int]] = None,
+        timezones: Optional[Sequence[str]] = None,
+        without_carrier_ratio: float = 0.5,
+        seed: Optional[int] = None,
+        today: Optional[date] = None
+    ):
+        """
+        Initialize the generator.
+
+        Args:
+            repeat_ratio: Share of requests (0-1) that reuse one of the hot windows
+            hot_keys: Number of distinct hot windows the repeated share is spread over
+            start_offset_days: Inclusive range of startDate offsets relative to today
+            num_days: Candidate numDays values
+            timezones: Candidate timeZone values
+            without_carrier_ratio: Probability of includeShipmentsWithoutCarrier=True
+            seed: Optional seed for reproducible payloads
+            today: Reference date (defaults to the current date)
+        """
+        if not 0.0 <= repeat_ratio <= 1.0:
+            raise ValueError(f"repeat_ratio must be between 0 and 1, got {repeat_ratio}")
+        if hot_keys < 1:
+            raise ValueError(f"hot_keys must be at least 1, got {hot_keys}")
+
+        self.repeat_ratio = repeat_ratio
+        self.hot_keys = hot_keys
+        self.start_offset_days = start_offset_days
+        self.num_days = list(num_days or FORECAST_NUM_DAYS)
+        self.timezones = list(timezones or FORECAST_TIMEZONES)
+        self.without_carrier_ratio = without_carrier_ratio
+        self.rng = random.Random(seed)
+        self.today = today or date.today()
+
+    @property
+    def space_size(self) -> int:
+        """Number of distinct windows the parameter space can produce."""
+        low, high = self.start_offset_days
+        return (high - low + 1) * len(self.num_days) * len(self.timezones) * 2
+
+    def random_window(self) -> Dict:
+        """Draw one window from the parameter space."""
+        offset = self.rng.randint(*self.start_offset_days)
+        return {
+            "timeZone": self.rng.choice(self.timezones),
+            "numDays": self.rng.choice(self.num_days),
+            "startDate": (self.today + timedelta(days=offset)).isoformat(),
+            "includeShipmentsWithoutCarrier": self.rng.random() < self.without_carrier_ratio
+        }
+
+    def windows(self, count: int) -> List[Tuple[Dict, int]]:
+        """
+        Generate windows for `count` requests.
+
+        Args:
+            count: Total number of requests the windows should represent
+
+        Returns:
+            List of (window, weight) pairs whose weights sum to `count`
+        """
+        repeated = round(count * self.repeat_ratio)
+        unique = count - repeated
+        hot = min(self.hot_keys, repeated)
+        if hot + unique > self.space_size:
+            raise ValueError(
+                f"Parameter space has {self.space_size} windows, cannot draw {hot + unique} distinct ones"
+            )
+
+        seen = set()
+        distinct = []
+        while len(distinct) < hot + unique:
+            window = self.random_window()
+            key = tuple(window.values())
+            if key not in seen:
+                seen.add(key)
+                distinct.append(window)
+
+        result = []
+        # Spread the repeated share evenly over the hot windows
+        for i, window in enumerate(distinct[:hot]):
+            weight = repeated // hot + (1 if i < repeated % hot else 0)
+            result.append((window, weight))
+        for window in distinct[hot:]:
+            result.append((window, 1))
+        return result
+
+
+CARRIER_SUBSET_MODES = ["full", "uniform", "realistic", "sweep", "adversarial"]
+
+
+class CarrierSubsetSampler:
+    """
+    Draw carrierIds subsets to cover a range of IN-list cardinalities.
+
+    Modes:
+        full: always the complete tenant carrier list (previous behavior)
+        uniform: subset size uniform between 1 and all carriers
+        realistic: small subsets favored, size decays geometrically
+        sweep: sizes spread on a log scale from 1 to all carriers
+        adversarial: the maximal list every time, in shuffled order
+    """
+
+    def __init__(self, mode: str = "full", decay: float = 0.5, seed: Optional[int] = None):
+        """
+        Initialize the sampler.
+
+        Args:
+            mode: One of CARRIER_SUBSET_MODES
+            decay: Probability of growing the subset by one more carrier in realistic mode
+            seed: Optional seed for reproducible subsets
+        """
+        if mode not in CARRIER_SUBSET_MODES:
+            raise ValueError(f"Invalid carrier subset mode: {mode}. Must be one of {CARRIER_SUBSET_MODES}")
+        if not 0.0 <= decay < 1.0:
+            raise ValueError(f"decay must be in [0, 1), got {decay}")
+
+        self.mode = mode
+        self.decay = decay
+        self.rng = random.Random(seed)
+
+    def _size(self, total: int, index: int, count: int) -> int:
+        """Pick the subset size for the index-th of `count` draws."""
+        if self.mode in ("full", "adversarial"):
+            return total
+        if self.mode == "uniform":
+            return self.rng.randint(1, total)
+        if self.mode == "realistic":
+            size = 1
+            while size < total and self.rng.random() < self.decay:
+                size += 1
+            return size
+        # sweep: 1 ... total, evenly spaced in log space
+        if count == 1:
+            return total
+        return max(1, round(total ** (index / (count - 1))))
+
+    def subsets(self, carrier_ids: List, count: int = 1) -> List[List]:
+        """
+        Draw `count` carrier subsets.
+
+        Args:
+            carrier_ids: Full carrier list of the tenant
+            count: Number of subsets to draw
+
+        Returns:
+            List of carrier id lists
+        """
+        if not carrier_ids:
+            return [[] for _ in range(count)]
+        if self.mode == "full":
+            return [list(carrier_ids) for _ in range(count)]
+
+        total = len(carrier_ids)
+        result = []
+        for i in range(count):
+            size = self._size(total, i, count)
+            if size == total and self.mode != "adversarial":
+                result.append(list(carrier_ids))
+            else:
+                result.append(self.rng.sample(carrier_ids, size))
+        return result
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Request Phase Timing for YMS Dashboard Service
+Splits each request of the Python load engine into DNS lookup, TCP connect, TLS
+handshake, time to first byte and body read, and reports which phase dominates
+the latency tail.
+
+The breakdown comes from urllib3 connection classes that time their own socket
+setup; requests made over a reused keep-alive connection have zero DNS, connect
+and TLS time. TTFB runs from the end of connection setup to the response headers
+(request upload and server processing); body runs until the last byte is read.
+"""
+
+import csv
+import os
+import socket
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from soak_analysis import LatencyHistogram
+
+
+PHASES = ["dns", "connect", "tls", "ttfb", "body"]
+PHASE_FIELDS = ["timeStamp", "api_endpoint", "elapsed"] + [f"{phase}_ms" for phase in PHASES]
+
+# Share of the slowest requests per endpoint whose breakdown is reported as "the tail"
+TAIL_PERCENTILE = 99
+
+_local = threading.local()
+
+
+def phases_file_for(results_file: str) -> str:
+    """Path of the per-request phase timings belonging to a results file."""
+    root, _ = os.path.splitext(results_file)
+    return f"{root}_phases.csv"
+
+
+def start_timing() -> Dict[str, float]:
+    """
+    Start collecting connection phases for the calling thread's next request.
+
+    Returns:
+        Dictionary of phase -> seconds, filled in while the request runs
+    """
+    _local.timings = timings = dict.fromkeys(PHASES, 0.0)
+    return timings
+
+
+def _record(phase: str, seconds: float):
+    timings = getattr(_local, "timings", None)
+    if timings is not None:
+        timings[phase] += seconds
+
+
+class _TimedConnectionMixin:
+    """Resolve the host separately from connecting, so both can be timed."""
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        address = None
+        try:
+            address = socket.getaddrinfo(self._dns_host, self.port, 0, socket.SOCK_STREAM)[0][4][0]
+        except (socket.gaierror, IndexError):
+            # Let urllib3 resolve again and raise its own NameResolutionError
+            pass
+        resolved = time.perf_counter()
+        _record("dns", resolved - start)
+
+        dns_host = self._dns_host
+        if address:
+            self._dns_host = address
+        try:
+            return super()._new_conn()
+        finally:
+            self._dns_host = dns_host
+            _record("connect", time.perf_counter() - resolved)
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def connect(self):
+        timings = getattr(_local, "timings", None)
+        before = timings["dns"] + timings["connect"] if timings else 0.0
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            # Everything connect() spends beyond resolving and connecting is the handshake
+            setup = timings["dns"] + timings["connect"] - before if timings else 0.0
+            _record("tls", max(0.0, time.perf_counter() - start - setup))
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """requests adapter whose connections report DNS, connect and TLS time."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool
+        }
+
+
+class PhaseRecorder:
+    """Thread-safe writer of per-request phase timings (milliseconds)."""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.file = open(filename, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(PHASE_FIELDS)
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def record(self, timestamp: int, endpoint: str, elapsed: float, timings: Dict[str, float]):
+        row = [timestamp, endpoint, f"{elapsed * 1000:.3f}"]
+        row += [f"{timings[phase] * 1000:.3f}" for phase in PHASES]
+        with self.lock:
+            self.writer.writerow(row)
+            self.count += 1
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+def _read_phase_rows(filename: str):
+    with open(filename, newline="") as f:
+        for row in csv.DictReader(f):
+            yield (row["api_endpoint"], float(row["elapsed"]),
+                   [float(row[f"{phase}_ms"]) for phase in PHASES])
+
+
+def analyze_phases(filename: str, tail_percentile: float = TAIL_PERCENTILE) -> Dict[str, Dict]:
+    """
+    Per-endpoint phase histograms and the breakdown of the latency tail.
+
+    Two passes over the file keep memory bounded: the first fills the histograms
+    and finds each endpoint's tail threshold, the second averages the phases of
+    the requests at or above it.
+
+    Returns:
+        Dictionary of endpoint -> count, new_connections, percentiles (phase ->
+        p50/p99), tail_count and tail_share (phase -> share of tail latency)
+    """
+    histograms = defaultdict(lambda: {phase: LatencyHistogram() for phase in PHASES + ["total"]})
+    new_connections = defaultdict(int)
+    for endpoint, elapsed, values in _read_phase_rows(filename):
+        histogram = histograms[endpoint]
+        histogram["total"].add(elapsed)
+        for phase, value in zip(PHASES, values):
+            histogram[phase].add(value)
+        if values[PHASES.index("connect")] > 0:
+            new_connections[endpoint] += 1
+
+    # Histogram bins overstate the percentile by up to 2%, so compare against the bin's lower edge
+    thresholds = {
+        endpoint: histogram["total"].percentile(tail_percentile) / 1.02
+        for endpoint, histogram in histograms.items()
+    }
+    tail_sums = defaultdict(lambda: [0.0] * len(PHASES))
+    tail_counts = defaultdict(int)
+    for endpoint, elapsed, values in _read_phase_rows(filename):
+        if elapsed >= thresholds[endpoint]:
+            tail_counts[endpoint] += 1
+            sums = tail_sums[endpoint]
+            for i, value in enumerate(values):
+                sums[i] += value
+
+    report = {}
+    for endpoint in sorted(histograms):
+        histogram = histograms[endpoint]
+        tail_total = sum(tail_sums[endpoint])
+        report[endpoint] = {
+            "count": histogram["total"].count,
+            "new_connections": new_connections[endpoint],
+            "percentiles": {
+                phase: {"p50": histogram[phase].percentile(50), "p99": histogram[phase].percentile(99)}
+                for phase in PHASES + ["total"]
+            },
+            "tail_count": tail_counts[endpoint],
+            "tail_share": {
+                phase: (tail_sums[endpoint][i] / tail_total if tail_total else 0.0)
+                for i, phase in enumerate(PHASES)
+            }
+        }
+    return report
+
+
+def print_phase_report(report: Dict[str, Dict], tail_percentile: float = TAIL_PERCENTILE):
+    """Print phase percentiles and the dominant phase of each endpoint's tail."""
+    print("\nLatency phases (ms) by endpoint - p50/p99")
+    print("-" * 112)
+    print(f"{'endpoint':<30} {'new conn':>8} " + " ".join(f"{phase:>12}" for phase in PHASES + ["total"]))
+    for endpoint, stats in report.items():
+        new_share = stats["new_connections"] / stats["count"] * 100 if stats["count"] else 0.0
+        cells = [
+            f"{stats['percentiles'][phase]['p50']:.1f}/{stats['percentiles'][phase]['p99']:.1f}"
+            for phase in PHASES + ["total"]
+        ]
+        print(f"{endpoint:<30} {new_share:>7.1f}% " + " ".join(f"{cell:>12}" for cell in cells))
+
+    print(f"\nTail breakdown (requests at or above p{tail_percentile:g}) - share of tail latency")
+    print("-" * 112)
+    print(f"{'endpoint':<30} {'tail':>6} " + " ".join(f"{phase:>8}" for phase in PHASES) + "  dominant")
+    for endpoint, stats in report.items():
+        shares = stats["tail_share"]
+        dominant = max(PHASES, key=lambda phase: shares[phase])
+        print(f"{endpoint:<30} {stats['tail_count']:>6} "
+              + " ".join(f"{shares[phase] * 100:>7.1f}%" for phase in PHASES)
+              + f"  {dominant}")
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Report DNS/connect/TLS/TTFB/body latency phases of a run")
+    parser.add_argument("phases", help="Phase timings (results_*_phases.csv written by load_engine.py)")
+    parser.add_argument("--tail", type=float, default=TAIL_PERCENTILE,
+                        help=f"Percentile where the tail starts (default: {TAIL_PERCENTILE})")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.phases):
+        print(f"✗ No such file: {args.phases}")
+        return 1
+    report = analyze_phases(args.phases, args.tail)
+    if not report:
+        print(f"✗ No requests in {args.phases}")
+        return 1
+    print_phase_report(report, args.tail)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Profiling Hooks for YMS Dashboard Service
+Per-stage spans and a cProfile dump for the token and data generation scripts,
+so a slow run shows whether the time goes to the network, deliberate waits or
+Python CPU.
+
+Spans are no-ops until start() is called (the scripts' --profile flag). At exit
+the spans are written as a Chrome trace timeline (<prefix>.trace.json, open in
+chrome://tracing or ui.perfetto.dev) and the merged cProfile statistics of all
+threads as <prefix>.prof (python -m pstats, snakeviz). Each span records wall
+and thread CPU time: wall far above CPU means the stage was waiting.
+"""
+
+import atexit
+import cProfile
+import functools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional
+
+
+class _Tracer:
+    """Collects finished spans and the per-thread profilers of one process."""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.origin = time.perf_counter()
+        self.events: List[Dict] = []
+        self.thread_names: Dict[int, str] = {}
+        self.lock = threading.Lock()
+        self.main_profile = cProfile.Profile()
+        self.thread_profiles: List[cProfile.Profile] = []
+
+    def add(self, name: str, category: str, start: float, wall: float, cpu: float, args: Dict):
+        thread = threading.current_thread()
+        with self.lock:
+            self.thread_names.setdefault(thread.ident, thread.name)
+            self.events.append({
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": (start - self.origin) * 1e6,
+                "dur": wall * 1e6,
+                "pid": os.getpid(),
+                "tid": thread.ident,
+                "args": {**args, "cpu_ms": round(cpu * 1000, 3)}
+            })
+
+    def profile_thread(self, *_):
+        # Runs once as the profile function of each new thread, then hands over to cProfile
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active; drop this hook so it does not run on every call
+            sys.setprofile(None)
+            return
+        with self.lock:
+            self.thread_profiles.append(profile)
+
+
+_tracer: Optional[_Tracer] = None
+
+
+def default_prefix(script: str) -> str:
+    """Output prefix for a script's profile: profile_<script>_<timestamp>."""
+    return f"profile_{script}_{time.strftime('%Y%m%d_%H%M%S')}"
+
+
+def start(prefix: str):
+    """
+    Start profiling: enable spans and cProfile (in this and every new thread).
+
+    The trace and profile are written when the process exits.
+
+    Args:
+        prefix: Output path without extension
+    """
+    global _tracer
+    if _tracer is not None:
+        return
+    _tracer = _Tracer(prefix)
+    if sys.version_info < (3, 12):
+        # Python 3.12+ profiles every thread from the main profiler and allows only one
+        threading.setprofile(_tracer.profile_thread)
+    _tracer.main_profile.enable()
+    atexit.register(stop)
+
+
+@contextmanager
+def _span(name: str, category: str, args: Dict):
+    start_wall = time.perf_counter()
+    start_cpu = time.thread_time()
+    try:
+        yield
+    finally:
+        _tracer.add(name, category, start_wall, time.perf_counter() - start_wall,
+                    time.thread_time() - start_cpu, args)
+
+
+def span(name: str, category: str = "stage", **args):
+    """
+    Context manager timing one stage; does nothing unless profiling was started.
+
+    Args:
+        name: Stage name shown on the timeline
+        category: Group of the stage (network, wait, cpu, io, stage)
+        **args: Details shown with the span (tenant, user, ...)
+    """
+    if _tracer is None:
+        return nullcontext()
+    return _span(name, category, args)
+
+
+def traced(name: str, category: str = "stage"):
+    """Decorator running a function inside span(name, category)."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with _span(name, category, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class StepSpans:
+    """Consecutive steps of one flow: starting a step ends the previous one."""
+
+    def __init__(self, prefix: str, category: str = "network", **args):
+        self.prefix = prefix
+        self.category = category
+        self.args = args
+        self.current = None
+
+    def step(self, name: str):
+        """End the running step (if any) and start `name`."""
+        self.end()
+        if _tracer is not None:
+            self.current = (f"{self.prefix}: {name}", time.perf_counter(), time.thread_time())
+
+    def end(self):
+        """End the running step."""
+        if self.current is not None and _tracer is not None:
+            name, start_wall, start_cpu = self.current
+            _tracer.add(name, self.category, start_wall, time.perf_counter() - start_wall,
+                        time.thread_time() - start_cpu, self.args)
+        self.current = None
+
+
+def summarize_spans(events: List[Dict]) -> Dict[str, Dict]:
+    """Span name -> count, category, total/max wall ms and total CPU ms."""
+    summary = defaultdict(lambda: {"count": 0, "category": "", "wall_ms": 0.0, "max_ms": 0.0, "cpu_ms": 0.0})
+    for event in events:
+        stats = summary[event["name"]]
+        stats["count"] += 1
+        stats["category"] = event["cat"]
+        stats["wall_ms"] += event["dur"] / 1000
+        stats["max_ms"] = max(stats["max_ms"], event["dur"] / 1000)
+        stats["cpu_ms"] += event["args"]["cpu_ms"]
+    return dict(sorted(summary.items(), key=lambda item: -item[1]["wall_ms"]))
+
+
+def print_span_summary(summary: Dict[str, Dict]):
+    """Print time per stage, slowest first, with the share spent on CPU."""
+    print("\nProfile: time per stage (wall far above CPU = waiting on network or sleeps)")
+    print("-" * 100)
+    print(f"{'stage':<44} {'category':<9} {'count':>6} {'total ms':>11} {'max ms':>10} {'cpu':>6}")
+    for name, stats in summary.items():
+        cpu_share = stats["cpu_ms"] / stats["wall_ms"] * 100 if stats["wall_ms"] else 0.0
+        print(f"{name[:44]:<44} {stats['category']:<9} {stats['count']:>6} {stats['wall_ms']:>11.1f} "
+              f"{stats['max_ms']:>10.1f} {cpu_share:>5.0f}%")
+
+
+def stop():
+    """Stop profiling and write <prefix>.trace.json and <prefix>.prof."""
+    global _tracer
+    tracer = _tracer
+    if tracer is None:
+        return
+    _tracer = None
+    threading.setprofile(None)
+    tracer.main_profile.disable()
+
+    stats = pstats.Stats(tracer.main_profile)
+    for profile in tracer.thread_profiles:
+        # Collecting a profile disables it in the calling thread, whose own profiler is off by now
+        stats.add(profile)
+    stats.dump_stats(f"{tracer.prefix}.prof")
+
+    metadata = [
+        {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": ident, "args": {"name": name}}
+        for ident, name in tracer.thread_names.items()
+    ]
+    with open(f"{tracer.prefix}.trace.json", "w") as f:
+        json.dump({"traceEvents": metadata + tracer.events, "displayTimeUnit": "ms"}, f)
+
+    print_span_summary(summarize_spans(tracer.events))
+    print(f"\n✓ Profile written: {tracer.prefix}.trace.json (chrome://tracing) and {tracer.prefix}.prof (pstats)")
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize a profile written with --profile")
+    parser.add_argument("file", help="<prefix>.trace.json or <prefix>.prof")
+    parser.add_argument("-n", "--limit", type=int, default=25, help="Functions to list for .prof files (default: 25)")
+    parser.add_argument("--sort", default="cumulative", help="pstats sort key for .prof files (default: cumulative)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.file):
+        print(f"✗ No such file: {args.file}")
+        return 1
+    if args.file.endswith(".prof"):
+        pstats.Stats(args.file).strip_dirs().sort_stats(args.sort).print_stats(args.limit)
+        return 0
+    with open(args.file) as f:
+        events = [event for event in json.load(f)["traceEvents"] if event["ph"] == "X"]
+    if not events:
+        print(f"✗ No spans in {args.file}")
+        return 1
+    print_span_summary(summarize_spans(events))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Request Tracing for YMS Dashboard Service
+Tags every request with an X-Request-ID and a W3C traceparent header, parses
+Server-Timing response headers, and keeps the slowest requests per endpoint so
+a p99 outlier in the report leads straight to its server-side trace.
+
+The request ID is the trace id of the traceparent header (32 hex digits), so the
+same value finds the request in access logs and in the tracing backend.
+"""
+
+import csv
+import heapq
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+REQUEST_ID_HEADER = "X-Request-ID"
+TRACEPARENT_HEADER = "traceparent"
+SERVER_TIMING_HEADER = "Server-Timing"
+
+# Split on commas / semicolons that are not inside quoted strings (desc="a, b")
+_METRICS = re.compile(r'(?:[^,"]|"(?:[^"\\]|\\.)*")+')
+_PARAMS = re.compile(r'(?:[^;"]|"(?:[^"\\]|\\.)*")+')
+
+
+def slowest_file_for(results_file: str) -> str:
+    """Path of the slowest-requests reservoir belonging to a results file."""
+    root, _ = os.path.splitext(results_file)
+    return f"{root}_slowest.json"
+
+
+def new_trace_ids() -> Tuple[str, str]:
+    """
+    Fresh ids for one request.
+
+    Returns:
+        Tuple of (request id, traceparent header value); the request id is the trace id
+    """
+    trace_id = os.urandom(16).hex()
+    span_id = os.urandom(8).hex()
+    return trace_id, f"00-{trace_id}-{span_id}-01"
+
+
+def parse_server_timing(value: Optional[str]) -> Dict[str, float]:
+    """
+    Parse a Server-Timing header into metric -> duration (ms).
+
+    Metrics without a dur parameter count as 0; repeated metrics are summed.
+    """
+    metrics = {}
+    if not value:
+        return metrics
+    for metric in _METRICS.findall(value):
+        parts = [part.strip() for part in _PARAMS.findall(metric)]
+        if not parts or not parts[0]:
+            continue
+        duration = 0.0
+        for param in parts[1:]:
+            key, _, param_value = param.partition("=")
+            if key.strip().lower() == "dur":
+                try:
+                    duration = float(param_value.strip().strip('"'))
+                except ValueError:
+                    pass
+        metrics[parts[0]] = metrics.get(parts[0], 0.0) + duration
+    return metrics
+
+
+class SlowestReservoir:
+    """The N slowest requests per endpoint, kept as one min-heap each (thread-safe)."""
+
+    def __init__(self, size: int = 10):
+        self.size = size
+        self.heaps = {}
+        self.lock = threading.Lock()
+        self._order = itertools.count()
+
+    def offer(self, endpoint: str, elapsed_ms: float, record: Dict):
+        """Keep `record` if it is among the slowest `size` requests of its endpoint."""
+        with self.lock:
+            heap = self.heaps.setdefault(endpoint, [])
+            entry = (elapsed_ms, next(self._order), record)
+            if len(heap) < self.size:
+                heapq.heappush(heap, entry)
+            elif elapsed_ms > heap[0][0]:
+                heapq.heapreplace(heap, entry)
+
+    def slowest(self) -> Dict[str, List[Dict]]:
+        """Endpoint -> kept requests, slowest first."""
+        with self.lock:
+            return {
+                endpoint: [dict(record, elapsed=elapsed) for elapsed, _, record in sorted(heap, reverse=True)]
+                for endpoint, heap in sorted(self.heaps.items())
+            }
+
+    def write(self, filename: str):
+        with open(filename, "w") as f:
+            json.dump(self.slowest(), f, indent=2)
+
+
+def read_slowest(filename: str) -> Dict[str, List[Dict]]:
+    """Load a reservoir written by SlowestReservoir.write."""
+    with open(filename) as f:
+        return json.load(f)
+
+
+def slowest_from_results(filename: str, size: int = 10) -> Dict[str, List[Dict]]:
+    """
+    Slowest requests per endpoint of any results file with a requestId column.
+
+    Works for JMeter results too (run_test.sh saves requestId); payloads and timing
+    breakdowns are only in the Python engine's reservoir.
+    """
+    from analyze_results import parse_sample
+
+    reservoir = SlowestReservoir(size)
+    with open(filename, newline="") as f:
+        for row in csv.DictReader(f):
+            sample = parse_sample(row)
+            reservoir.offer(sample["endpoint"], sample["elapsed"], {
+                "timestamp": sample["timestamp"],
+                "request_id": row.get("requestId", ""),
+                "tenant": sample["tenant"],
+                "facility": sample["facility"],
+                "code": row.get("responseCode", "")
+            })
+    return reservoir.slowest()
+
+
+def _format_timings(timings: Dict[str, float]) -> str:
+    return " ".join(f"{name}={value:.1f}" for name, value in timings.items() if value)
+
+
+def print_slowest(slowest: Dict[str, List[Dict]], limit: int = 5, show_payload: bool = False):
+    """Print the slowest requests per endpoint with their request ids and timing breakdowns."""
+    print(f"\nSlowest requests per endpoint (top {limit}) - search the request id in the service traces")
+    print("-" * 112)
+    for endpoint, records in slowest.items():
+        print(f"{endpoint}")
+        for record in records[:limit]:
+            print(f"  {record['elapsed']:>8.0f} ms  {record.get('request_id') or '-':<32}  "
+                  f"{record['tenant']}/{record['facility']}  {record.get('code', '')}")
+            if record.get("phases"):
+                print(f"               client: {_format_timings(record['phases'])}")
+            if record.get("server_timing"):
+                print(f"               server: {_format_timings(record['server_timing'])}")
+            if show_payload and record.get("payload"):
+                print(f"               payload: {record['payload']}")
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show the slowest requests of a run with their trace ids")
+    parser.add_argument("file", help="results_*_slowest.json from load_engine.py, or any JTL results file")
+    parser.add_argument("-n", "--limit", type=int, default=5, help="Requests per endpoint (default: 5)")
+    parser.add_argument("--endpoint", default=None, help="Only this endpoint")
+    parser.add_argument("--payload", action="store_true", help="Also print request payloads")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.file):
+        print(f"✗ No such file: {args.file}")
+        return 1
+    if args.file.endswith(".json"):
+        slowest = read_slowest(args.file)
+    else:
+        slowest = slowest_from_results(args.file, args.limit)
+    if args.endpoint:
+        slowest = {endpoint: records for endpoint, records in slowest.items() if endpoint == args.endpoint}
+    if not slowest:
+        print(f"✗ No requests in {args.file}")
+        return 1
+    print_slowest(slowest, args.limit, args.payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Run Manifest for YMS Dashboard Service
+Ties the pipeline's artifacts together and caches stage outputs by their inputs.
+
+Every stage (token minting, tenant discovery, data generation) is keyed by a hash
+of its inputs: configuration, discovery snapshot, tokens, arguments and generator
+source. Outputs are kept in a content-addressed store under .cache/, so a rerun
+with unchanged inputs restores them instead of minting tokens or calling the API.
+The store is kept below CACHE_MAX_BYTES by evicting the least recently used
+entries; `prune` shrinks it further or drops entries by age.
+
+A manifest (<file>_manifest.json) records which inputs and outputs a data file or
+a test run was built from, and whether each stage came from the cache.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+CACHE_DIR = ".cache"
+# Size limit of the object store; scenario CSVs and .scn stores can be hundreds of MB each
+CACHE_MAX_BYTES = 5 * 1024 ** 3
+MANIFEST_VERSION = 1
+
+# Source files whose content defines the generator version of the data stage
+GENERATOR_SOURCES = ["generate_exhaustive_data.py", "payload_generators.py", "scenario_store.py", "scenario_sampler.py"]
+
+
+def manifest_file_for(path: str) -> str:
+    """Path of the manifest belonging to a data or results file."""
+    root, _ = os.path.splitext(path)
+    return f"{root}_manifest.json"
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_inputs(inputs: Dict) -> str:
+    """SHA-256 of a JSON-serializable input description (key order does not matter)."""
+    canonical = json.dumps(inputs, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def source_version(files: Iterable[str] = GENERATOR_SOURCES) -> str:
+    """Combined hash of source files (missing files count as empty)."""
+    base = os.path.dirname(os.path.abspath(__file__))
+    return hash_inputs({
+        name: hash_file(os.path.join(base, name)) if os.path.exists(os.path.join(base, name)) else None
+        for name in files
+    })
+
+
+class StageCache:
+    """
+    Content-addressed store of stage outputs.
+
+    objects/<aa>/<digest>      file contents by SHA-256
+    stages/<stage>/<key>.json  outputs (path -> digest) produced for an input key
+
+    An entry's modification time is its last use: lookups that hit touch it, and
+    pruning evicts the least recently used entries first.
+    """
+
+    def __init__(self, root: str = CACHE_DIR, max_bytes: Optional[int] = CACHE_MAX_BYTES):
+        """
+        Initialize the cache.
+
+        Args:
+            root: Cache directory
+            max_bytes: Object store size kept after every store (None: unlimited)
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def _entry_path(self, stage: str, key: str) -> str:
+        return os.path.join(self.root, "stages", stage, f"{key}.json")
+
+    def lookup(self, stage: str, inputs: Dict, max_age: Optional[float] = None) -> Optional[Dict]:
+        """
+        Cached entry for a stage's inputs.
+
+        Args:
+            stage: Stage name
+            inputs: Input description (hashed into the key)
+            max_age: Ignore entries older than this many seconds
+
+        Returns:
+            Entry with key, created and outputs (path -> digest), or None
+        """
+        path = self._entry_path(stage, hash_inputs(inputs))
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            entry = json.load(f)
+        if max_age is not None and time.time() - entry["created"] > max_age:
+            return None
+        if not all(os.path.exists(self._object_path(digest)) for digest in entry["outputs"].values()):
+            return None
+        os.utime(path)
+        return entry
+
+    def store(self, stage: str, inputs: Dict, outputs: List[str]) -> Dict:
+        """Copy a stage's output files into the store and record them under its inputs."""
+        entry = {"stage": stage, "key": hash_inputs(inputs), "created": time.time(), "outputs": {}}
+        for path in outputs:
+            digest = hash_file(path)
+            target = self._object_path(digest)
+            if not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copyfile(path, f"{target}.tmp")
+                os.replace(f"{target}.tmp", target)
+            entry["outputs"][path] = digest
+
+        path = self._entry_path(stage, entry["key"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(entry, f, indent=2)
+        os.replace(f"{path}.tmp", path)
+        if self.max_bytes is not None:
+            self.prune(self.max_bytes, keep=path)
+        return entry
+
+    def _entries(self) -> List[Tuple[float, str, Dict]]:
+        """(last use, entry path, entry) of every stage entry, least recently used first."""
+        entries = []
+        stages = os.path.join(self.root, "stages")
+        for stage in os.listdir(stages) if os.path.isdir(stages) else []:
+            for name in os.listdir(os.path.join(stages, stage)):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(stages, stage, name)
+                try:
+                    with open(path) as f:
+                        entries.append((os.path.getmtime(path), path, json.load(f)))
+                except (OSError, ValueError):
+                    continue
+        return sorted(entries, key=lambda item: item[0])
+
+    def _object_sizes(self) -> Dict[str, int]:
+        """Size of every stored object by digest."""
+        sizes = {}
+        for directory, _, names in os.walk(os.path.join(self.root, "objects")):
+            for name in names:
+                # Copies still being written end in .tmp and belong to no entry yet
+                if not name.endswith(".tmp"):
+                    sizes[name] = os.path.getsize(os.path.join(directory, name))
+        return sizes
+
+    def prune(
+        self,
+        max_bytes: Optional[int] = None,
+        max_age: Optional[float] = None,
+        keep: Optional[str] = None
+    ) -> Tuple[int, int]:
+        """
+        Evict entries unused for `max_age` seconds, then the least recently used ones
+        until the objects still referenced fit in `max_bytes`, and delete every object
+        no entry references.
+
+        Args:
+            max_bytes: Size limit of the object store (None: no limit)
+            max_age: Evict entries not used for this many seconds (None: no limit)
+            keep: Entry path that is never evicted (the one just stored)
+
+        Returns:
+            Tuple of (entries evicted, bytes freed)
+        """
+        sizes = self._object_sizes()
+        entries = self._entries()
+        references = Counter(digest for _, _, entry in entries for digest in set(entry["outputs"].values()))
+        total = sum(sizes.get(digest, 0) for digest in references)
+
+        evicted = 0
+        now = time.time()
+        for used, path, entry in entries:
+            expired = max_age is not None and now - used > max_age
+            over = max_bytes is not None and total > max_bytes
+            if path == keep or not (expired or over):
+                continue
+            os.remove(path)
+            evicted += 1
+            for digest in set(entry["outputs"].values()):
+                references[digest] -= 1
+                if not references[digest]:
+                    del references[digest]
+                    total -= sizes.get(digest, 0)
+
+        freed = 0
+        for digest, size in sizes.items():
+            if digest not in references:
+                os.remove(self._object_path(digest))
+                freed += size
+        return evicted, freed
+
+    def restore(self, entry: Dict):
+        """Write a cached entry's outputs back to their paths (files already up to date are left alone)."""
+        for path, digest in entry["outputs"].items():
+            if os.path.exists(path) and hash_file(path) == digest:
+                continue
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.copyfile(self._object_path(digest), f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+
+
+class RunManifest:
+    """Stage records of one pipeline invocation, written as JSON."""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.created = time.strftime("%Y-%m-%d %H:%M:%S")
+        self.stages = {}
+        self.extra = {}
+
+    def add_stage(self, name: str, inputs: Dict, outputs: Dict[str, str], cached: bool):
+        """Record a stage with its input key, output digests and whether it was restored from the cache."""
+        self.stages[name] = {
+            "key": hash_inputs(inputs),
+            "inputs": inputs,
+            "outputs": outputs,
+            "cached": cached
+        }
+
+    @property
+    def run_id(self) -> str:
+        """Content address of the manifest: hash of its stages' inputs and outputs."""
+        return hash_inputs({name: [stage["key"], stage["outputs"]] for name, stage in self.stages.items()})[:16]
+
+    def as_dict(self) -> Dict:
+        return {
+            "version": MANIFEST_VERSION,
+            "kind": self.kind,
+            "run_id": self.run_id,
+            "created": self.created,
+            "stages": self.stages,
+            **self.extra
+        }
+
+    def write(self, filename: str):
+        with open(filename, "w") as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+
+def read_manifest(filename: str) -> Optional[Dict]:
+    """Load a manifest, or None if there is none."""
+    if not os.path.exists(filename):
+        return None
+    with open(filename) as f:
+        return json.load(f)
+
+
+def _existing(paths: Iterable[str]) -> Dict[str, str]:
+    return {path: hash_file(path) for path in paths if path and os.path.isfile(path)}
+
+
+def record_run(results_file: str, data_file: str, test_plan: Optional[str], engine: str,
+               options: Dict, report_dir: Optional[str] = None) -> str:
+    """
+    Write the manifest of a finished test run.
+
+    It embeds the data file's generation manifest (tokens, discovery, generator
+    stages), so a results file can be traced back to everything it was built from.
+
+    Returns:
+        Path of the written manifest
+    """
+    from client_monitor import client_file_for
+    from scenario_sampler import identities_file_for
+
+    root, ext = os.path.splitext(results_file)
+    inputs = {
+        "data": _existing([data_file, identities_file_for(data_file)]),
+        "test_plan": _existing([test_plan]) if engine == "jmeter" else {},
+        "engine": engine,
+        "options": options
+    }
+    companions = [f"{root}_{suffix}{ext or '.jtl'}" for suffix in ("warmup", "pages", "target")]
+    companions += [client_file_for(results_file)] + [
+        f"{root}_{suffix}" for suffix in ("phases.csv", "slowest.json", "breaker.json")
+    ]
+    manifest = RunManifest("run")
+    manifest.add_stage("run", inputs, _existing([results_file] + companions), cached=False)
+    manifest.extra["generation"] = read_manifest(manifest_file_for(data_file))
+    if report_dir:
+        manifest.extra["report"] = report_dir
+
+    filename = manifest_file_for(results_file)
+    manifest.write(filename)
+    return filename
+
+
+def print_manifest(manifest: Dict):
+    """Print the stages of a manifest (and of the generation it embeds)."""
+    print(f"\n{manifest['kind'].capitalize()} manifest {manifest['run_id']} ({manifest['created']})")
+    print("-" * 86)
+    for name, stage in manifest["stages"].items():
+        source = "cached" if stage["cached"] else "built"
+        print(f"{name:<12} {source:<7} key {stage['key'][:12]}")
+        for path, digest in stage["outputs"].items():
+            print(f"    {path:<56} {digest[:12]}")
+    if manifest.get("report"):
+        print(f"report       {manifest['report']}")
+    if manifest.get("generation"):
+        print_manifest(manifest["generation"])
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Record and inspect run manifests")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record = subparsers.add_parser("record", help="Write the manifest of a finished test run")
+    record.add_argument("results", help="Results file of the run")
+    record.add_argument("--data", default="test_data.csv", help="Scenario file used (default: test_data.csv)")
+    record.add_argument("--plan", default="test_plan.jmx", help="JMeter test plan used (default: test_plan.jmx)")
+    record.add_argument("--engine", default="jmeter", help="Load engine (default: jmeter)")
+    record.add_argument("--report", default=None, help="HTML report directory of the run")
+    record.add_argument("--option", action="append", default=[], metavar="KEY=VALUE",
+                        help="Run option to record (repeatable)")
+
+    show = subparsers.add_parser("show", help="Print a manifest")
+    show.add_argument("manifest", help="Manifest file (or the data/results file it belongs to)")
+
+    prune = subparsers.add_parser("prune", help="Shrink the stage cache, least recently used entries first")
+    prune.add_argument("--max-size", type=float, default=CACHE_MAX_BYTES / 1024 ** 3,
+                       help=f"Size limit in GB (default: {CACHE_MAX_BYTES / 1024 ** 3:g})")
+    prune.add_argument("--max-age", type=float, default=None, help="Evict entries unused for this many days")
+    prune.add_argument("--cache", default=CACHE_DIR, help=f"Cache directory (default: {CACHE_DIR})")
+    args = parser.parse_args()
+
+    if args.command == "prune":
+        max_age = args.max_age * 86400 if args.max_age is not None else None
+        evicted, freed = StageCache(args.cache, max_bytes=None).prune(int(args.max_size * 1024 ** 3), max_age)
+        print(f"✓ Evicted {evicted} cache entries, freed {freed / 1024 ** 2:.1f} MB in {args.cache}/")
+        return 0
+
+    if args.command == "record":
+        options = dict(option.split("=", 1) for option in args.option if "=" in option)
+        filename = record_run(args.results, args.data, args.plan, args.engine, options, args.report)
+        print(f"✓ Run manifest: {filename}")
+        return 0
+
+    filename = args.manifest if args.manifest.endswith("_manifest.json") else manifest_file_for(args.manifest)
+    manifest = read_manifest(filename)
+    if manifest is None:
+        print(f"✗ No manifest: {filename}")
+        return 1
+    print_manifest(manifest)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
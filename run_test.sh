@@ -9,9 +9,21 @@ export PATH="/opt/homebrew/Cellar/jmeter/5.6.3/bin:$PATH"
 THREADS=10
 RAMPUP=1
 DURATION=10
-RPM=3
+# Per-user rate; without --rpm, 60 for JMeter (the plan's own default) and 3 for the Python engine
+RPM=""
 TEST_FILE="test_plan.jmx"
 RESULTS_FILE="results_$(date +%Y%m%d_%H%M%S).jtl"
+DATA_FILE="test_data.csv"
+SKIP_PREFLIGHT=false
+ENGINE="jmeter"
+ENV=""
+WARMUP_SHARE=0
+ENGINE_ARGS=()
+SEED=""
+SOAK=false
+BREAKER=""
+BREAKER_ARGS=()
+SOAK_WINDOW=60
 
 # Parse command line arguments
 while [[ $# -gt 0 ]]; do
@@ -40,20 +52,83 @@ while [[ $# -gt 0 ]]; do
       RESULTS_FILE="$2"
       shift 2
       ;;
+    --data)
+      DATA_FILE="$2"
+      shift 2
+      ;;
+    --seed)
+      SEED="$2"
+      shift 2
+      ;;
+    --skip-preflight)
+      SKIP_PREFLIGHT=true
+      shift
+      ;;
+    --breaker)
+      BREAKER="$2"
+      shift 2
+      ;;
+    --max-error-rate)
+      BREAKER_ARGS+=(--max-error-rate "$2")
+      shift 2
+      ;;
+    --max-p95-ms)
+      BREAKER_ARGS+=(--max-p95-ms "$2")
+      shift 2
+      ;;
+    --soak)
+      SOAK=true
+      shift
+      ;;
+    --soak-window)
+      SOAK_WINDOW="$2"
+      shift 2
+      ;;
+    --engine)
+      ENGINE="$2"
+      shift 2
+      ;;
+    -e|--env)
+      ENV="$2"
+      shift 2
+      ;;
+    --warmup-share)
+      WARMUP_SHARE="$2"
+      shift 2
+      ;;
+    --)
+      shift
+      ENGINE_ARGS=("$@")
+      break
+      ;;
     -h|--help)
       echo "Usage: $0 [OPTIONS]"
       echo "Options:"
       echo "  -t, --threads    Number of threads (default: 10)"
       echo "  -r, --rampup     Ramp-up time in seconds (default: 1)"
       echo "  -d, --duration   Test duration in seconds (default: 10)"
-      echo "  --rpm            Requests per minute per user (default: 3)"
+      echo "  --rpm            Requests per minute per user (default: 60 with JMeter, 3 with python)"
       echo "  -f, --file       JMeter test file (default: test_plan.jmx)"
       echo "  -o, --output     Results file name (default: results_timestamp.jtl)"
+      echo "  --data           Scenario file: CSV, or .scn store with python (default: test_data.csv)"
+      echo "  --seed           Replay the same request order per thread for the same seed and data"
+      echo "  --breaker        stop (or throttle, python engine) when the target degrades (exit 5: tripped)"
+      echo "  --max-error-rate Breaker: tolerated share of 5xx/timeouts over 30s (default: 0.5)"
+      echo "  --max-p95-ms     Breaker: tolerated p95 latency over 30s (default: none)"
+      echo "  --soak           Track p99/error/throughput trends while the test runs (exit 4: drift)"
+      echo "  --soak-window    Soak trend window in seconds (default: 60)"
+      echo "  --skip-preflight Do not check token expiry/tenants in $DATA_FILE before the run"
+      echo "  --engine         jmeter (default) or python (load_engine.py)"
+      echo "  -e, --env        Target environment, required with --engine python"
+      echo "  --warmup-share   Python engine: share of each scenario sent as unmeasured warmup (default: 0)"
+      echo "  -- ARGS          Python engine: pass remaining arguments to load_engine.py"
       echo "  -h, --help       Show this help message"
       echo ""
       echo "Examples:"
       echo "  $0 -t 50 -r 30 -d 600  # 50 threads, 30s ramp-up, 10 min duration"
       echo "  $0 -t 10 -d 60         # 10 threads, 60s ramp-up, 1 min duration"
+      echo "  $0 --engine python -e qat -t 50 -d 600 --warmup-share 0.1"
+      echo "  $0 -t 50 -r 300 -d 14400 --soak  # 4 hour soak run"
       exit 0
       ;;
     *)
@@ -64,7 +139,31 @@ while [[ $# -gt 0 ]]; do
   esac
 done
 
-echo "Running JMeter test with:"
+if [ "$ENGINE" != "jmeter" ] && [ "$ENGINE" != "python" ]; then
+  echo "Unknown engine: $ENGINE (expected jmeter or python)"
+  exit 1
+fi
+if [ "$ENGINE" = "python" ] && [ -z "$ENV" ]; then
+  echo "--engine python needs the target environment (-e/--env)"
+  exit 1
+fi
+if [ -n "$BREAKER" ] && [ "$BREAKER" != "stop" ] && [ "$BREAKER" != "throttle" ]; then
+  echo "Unknown breaker action: $BREAKER (expected stop or throttle)"
+  exit 1
+fi
+if [ "$BREAKER" = "throttle" ] && [ "$ENGINE" = "jmeter" ]; then
+  echo "--breaker throttle needs --engine python; JMeter runs can only be stopped"
+  exit 1
+fi
+if [ -z "$RPM" ]; then
+  if [ "$ENGINE" = "jmeter" ]; then
+    RPM=60
+  else
+    RPM=3
+  fi
+fi
+
+echo "Running $ENGINE test with:"
 echo "  Threads: $THREADS"
 echo "  Ramp-up: $RAMPUP seconds"
 echo "  Duration: $DURATION seconds"
@@ -73,23 +172,167 @@ echo "  Test file: $TEST_FILE"
 echo "  Results file: $RESULTS_FILE"
 echo ""
 
-# Run JMeter test
+# Soak mode: follow the results file while the engine writes it, skipping the ramp-up
+start_soak() {
+  SOAK_PID=""
+  if [ "$SOAK" = true ]; then
+    python3 soak_analysis.py "$RESULTS_FILE" --follow --pid "$1" \
+      --window $SOAK_WINDOW --skip $RAMPUP &
+    SOAK_PID=$!
+  fi
+}
+
+finish_soak() {
+  if [ -n "$SOAK_PID" ]; then
+    wait $SOAK_PID
+    SOAK_STATUS=$?
+  fi
+}
+SOAK_STATUS=0
+
+# Run manifest: ties the results to the data, its generation manifest and the run options
+record_manifest() {
+  python3 run_manifest.py record "$RESULTS_FILE" --data "$DATA_FILE" --plan "$TEST_FILE" --engine $ENGINE \
+    --option threads=$THREADS --option rampup=$RAMPUP --option duration=$DURATION --option rpm=$RPM \
+    ${SEED:+--option seed=$SEED} ${ENV:+--option env=$ENV} ${1:+--report "$1"}
+}
+
+# Pre-flight: every token in the scenario data must carry the right tenant and outlive the run
+if [ "$SKIP_PREFLIGHT" = false ] && [ -f "$DATA_FILE" ]; then
+  PREFLIGHT_FILES=("$DATA_FILE")
+  IDENTITIES_FILE="${DATA_FILE%.*}_identities.json"
+  if [ -f "$IDENTITIES_FILE" ]; then
+    PREFLIGHT_FILES+=("$IDENTITIES_FILE")
+  fi
+  if ! python3 analyze_token.py --bulk "${PREFLIGHT_FILES[@]}" --run-duration $((RAMPUP + DURATION)); then
+    echo ""
+    echo "Pre-flight token check failed. Regenerate tokens/data or use --skip-preflight."
+    exit 1
+  fi
+  echo ""
+fi
+
+if [ "$ENGINE" = "python" ]; then
+  # Python engine prints its own per-endpoint (and warmup) summary and client saturation check
+  python3 load_engine.py "$ENV" -f "$DATA_FILE" -o "$RESULTS_FILE" \
+    -t $THREADS -r $RAMPUP -d $DURATION --rpm $RPM \
+    --warmup-share $WARMUP_SHARE ${SEED:+--seed $SEED} \
+    ${BREAKER:+--breaker $BREAKER "${BREAKER_ARGS[@]}"} "${ENGINE_ARGS[@]}" &
+  ENGINE_PID=$!
+  start_soak $ENGINE_PID
+  wait $ENGINE_PID
+  STATUS=$?
+  finish_soak
+  # 3: client saturated, 5: circuit breaker tripped; the results are still complete
+  if [ $STATUS -ne 0 ] && [ $STATUS -ne 3 ] && [ $STATUS -ne 5 ]; then
+    echo ""
+    echo "Test failed! Check the logs for errors."
+    exit 1
+  fi
+  echo ""
+  echo "Test completed successfully!"
+  echo "Results saved to: $RESULTS_FILE"
+  record_manifest
+  echo ""
+  echo "Latency by carrierIds list size:"
+  python3 analyze_results.py "$RESULTS_FILE" --by carriers
+
+  echo ""
+  echo "Latency versus request/response size:"
+  python3 analyze_results.py "$RESULTS_FILE" --by size
+  if [ $STATUS -eq 0 ] && [ $SOAK_STATUS -ne 0 ]; then
+    exit $SOAK_STATUS
+  fi
+  exit $STATUS
+fi
+
+# With a seed, every JMeter thread reads its own pre-drawn shard instead of racing on one CSV.
+# Weighted data and an identities sidecar need shards too: the CSV Data Set ignores the
+# weight column and the shared CSV only holds one token per tenant, so each thread's shard
+# is drawn by weight and carries its own identity (the scheduler picks and prints a seed).
+JMETER_DATA_ARGS=("-Jdata_file=$DATA_FILE")
+if [ -n "$SEED" ] || [ -f "${DATA_FILE%.*}_identities.json" ] \
+    || python3 scenario_sampler.py "$DATA_FILE" --is-weighted; then
+  SHARD_DIR="${RESULTS_FILE%.*}_shards"
+  # Enough rows for the whole run; recycle=true wraps around if a thread sends more
+  PER_THREAD=$(( (RPM * DURATION + 59) / 60 + 1 ))
+  python3 scenario_sampler.py "$DATA_FILE" ${SEED:+--seed $SEED} --shards "$SHARD_DIR" \
+    --workers $THREADS --per-worker $PER_THREAD || exit 1
+  JMETER_DATA_ARGS=("-Jdata_file=$SHARD_DIR/shard_\${__threadNum}.csv" "-Jshare_mode=shareMode.thread")
+  echo ""
+fi
+
+# Run JMeter test, sampling the load generator's own resources next to the results
 jmeter -n -t "$TEST_FILE" -l "$RESULTS_FILE" \
   -Jthreads=$THREADS \
   -Jrampup=$RAMPUP \
   -Jduration=$DURATION \
-  -Jrpm=$RPM
+  -Jrpm=$RPM \
+  -Jsample_variables=api_endpoint,tenantName,facilityId,carrierCount,requestId \
+  "${JMETER_DATA_ARGS[@]}" &
+JMETER_PID=$!
+CLIENT_FILE="${RESULTS_FILE%.*}_client.csv"
+python3 client_monitor.py watch --pid $JMETER_PID -o "$CLIENT_FILE" &
+MONITOR_PID=$!
+start_soak $JMETER_PID
+# Circuit breaker: stop JMeter gracefully (shutdown.sh next to the jmeter binary) when the target degrades
+BREAKER_PID=""
+if [ -n "$BREAKER" ]; then
+  STOP_COMMAND=$(printf '%q' "$(dirname "$(command -v jmeter)")/shutdown.sh")
+  python3 circuit_breaker.py watch "$RESULTS_FILE" --pid $JMETER_PID --stop-command "$STOP_COMMAND" \
+    "${BREAKER_ARGS[@]}" &
+  BREAKER_PID=$!
+fi
+wait $JMETER_PID
+JMETER_STATUS=$?
+wait $MONITOR_PID
+finish_soak
+BREAKER_STATUS=0
+if [ -n "$BREAKER_PID" ]; then
+  wait $BREAKER_PID
+  BREAKER_STATUS=$?
+fi
 
 # Check if test completed successfully
-if [ $? -eq 0 ]; then
+if [ $JMETER_STATUS -eq 0 ]; then
   echo ""
   echo "Test completed successfully!"
   echo "Results saved to: $RESULTS_FILE"
+  echo "Client resources saved to: $CLIENT_FILE"
   
   # Generate summary report
   echo ""
   echo "Generating summary report..."
-  jmeter -g "$RESULTS_FILE" -o "report_$(date +%Y%m%d_%H%M%S)"
+  REPORT_DIR="report_$(date +%Y%m%d_%H%M%S)"
+  jmeter -g "$RESULTS_FILE" -o "$REPORT_DIR"
+  record_manifest "$REPORT_DIR"
+
+  echo ""
+  echo "Latency by carrierIds list size:"
+  python3 analyze_results.py "$RESULTS_FILE" --by carriers
+
+  echo ""
+  echo "Latency versus request/response size:"
+  python3 analyze_results.py "$RESULTS_FILE" --by size
+
+  # Request ids of the slowest requests, to look up in the service traces
+  python3 request_tracing.py "$RESULTS_FILE" -n 3
+
+  # Flag the run when JMeter's box was saturated (latency would be client-side)
+  python3 client_monitor.py check "$CLIENT_FILE"
+  CLIENT_STATUS=$?
+
+  # Stopped early by the circuit breaker (5, trip time in the _breaker.json file) or tripped
+  # without managing to stop JMeter (1); takes precedence over saturation, like the Python engine
+  if [ $BREAKER_STATUS -ne 0 ]; then
+    exit $BREAKER_STATUS
+  fi
+  if [ $CLIENT_STATUS -ne 0 ]; then
+    exit 3
+  fi
+
+  # Significant drift in soak mode (the trend report was printed when the run ended)
+  exit $SOAK_STATUS
 else
   echo ""
   echo "Test failed! Check the logs for errors."
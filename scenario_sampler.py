@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Weighted Scenario Sampler for YMS Dashboard Service
+Loads the deduplicated scenario table and draws rows in proportion to their weight
+"""
+
+import csv
+import hashlib
+import json
+import os
+import random
+import sys
+from bisect import bisect_right
+from collections import Counter, defaultdict
+from datetime import datetime
+from itertools import accumulate
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from scenario_store import ScenarioStore, is_scenario_store
+
+
+def load_scenarios(filename: str = "test_data.csv") -> Sequence[Dict]:
+    """
+    Load scenario rows from a generated CSV file or binary scenario store.
+
+    Files written before the weight column existed are treated as weight 1 per row,
+    so repeated rows in a legacy file still bias the distribution the same way.
+    A binary store (see scenario_store.py) is memory-mapped instead of parsed.
+
+    Args:
+        filename: Path to the scenario CSV or .scn store
+
+    Returns:
+        Sequence of row dictionaries with an integer "weight" key
+    """
+    if is_scenario_store(filename):
+        return ScenarioStore(filename)
+
+    scenarios = []
+    with open(filename, newline="") as f:
+        for row in csv.DictReader(f):
+            weight = int(row.get("weight") or 1)
+            if weight <= 0:
+                continue
+            row["weight"] = weight
+            scenarios.append(row)
+    return scenarios
+
+
+def is_weighted(scenarios: Iterable[Dict]) -> bool:
+    """True if any row carries a weight other than 1 (a plain CSV read would lose the mix)."""
+    return any(scenario["weight"] != 1 for scenario in scenarios)
+
+
+class WeightedScenarioSampler:
+    """Draw scenarios with probability proportional to their weight column."""
+
+    def __init__(self, scenarios: Sequence[Dict], seed: Optional[int] = None):
+        """
+        Initialize the sampler.
+
+        Args:
+            scenarios: Rows as returned by load_scenarios
+            seed: Optional seed for a reproducible draw sequence
+        """
+        if not len(scenarios):
+            raise ValueError("No scenarios to sample from")
+
+        self.scenarios = scenarios
+        if isinstance(scenarios, ScenarioStore):
+            # The store keeps cumulative weights on disk; bisect works on the mapped column
+            self.cumulative_weights = scenarios.cumulative_weights
+        else:
+            self.cumulative_weights = list(accumulate(s["weight"] for s in scenarios))
+        self.total_weight = self.cumulative_weights[-1]
+        self.rng = random.Random(seed)
+
+    @classmethod
+    def from_file(cls, filename: str = "test_data.csv", seed: Optional[int] = None) -> "WeightedScenarioSampler":
+        """Create a sampler directly from a scenario CSV file."""
+        return cls(load_scenarios(filename), seed=seed)
+
+    def __len__(self) -> int:
+        return len(self.scenarios)
+
+    def draw_index(self, rng: random.Random) -> int:
+        """Draw a scenario index using the given random generator."""
+        # Integer weights make the draw exact: r in [0, total) lands on the row whose
+        # cumulative weight range contains it
+        return bisect_right(self.cumulative_weights, rng.randrange(self.total_weight))
+
+    def sample(self) -> Dict:
+        """Draw a single scenario row."""
+        return self.scenarios[self.draw_index(self.rng)]
+
+    def sample_many(self, count: int) -> List[Dict]:
+        """Draw `count` scenario rows (with replacement)."""
+        return self.rng.choices(self.scenarios, cum_weights=self.cumulative_weights, k=count)
+
+    def endpoint_distribution(self) -> Dict[str, float]:
+        """Return the expected share of requests per endpoint."""
+        weights = Counter()
+        for scenario in self.scenarios:
+            weights[scenario["api_endpoint"]] += scenario["weight"]
+        return {endpoint: weight / self.total_weight for endpoint, weight in weights.most_common()}
+
+
+class SeededScheduler:
+    """
+    Reproducible scenario order, one independent stream per worker.
+
+    Every worker draws from its own generator seeded with (seed, worker), so the
+    sequence a worker sends depends only on the seed, the data and its index, never
+    on thread timing. Same seed and data: same requests in the same order per worker.
+    """
+
+    def __init__(self, scenarios: Sequence[Dict], seed: Optional[int] = None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            scenarios: Rows as returned by load_scenarios
+            seed: Schedule seed; a random one is chosen (and kept in .seed) if omitted
+        """
+        self.sampler = WeightedScenarioSampler(scenarios)
+        self.scenarios = scenarios
+        self.seed = seed if seed is not None else random.SystemRandom().randrange(2 ** 32)
+        self._streams = {}
+
+    def rng_for(self, worker) -> random.Random:
+        """Generator of a worker (string seeds hash deterministically across processes)."""
+        return random.Random(f"{self.seed}:{worker}")
+
+    def indices(self, worker: int) -> Iterator[int]:
+        """Endless stream of scenario indices for a worker."""
+        rng = self.rng_for(worker)
+        while True:
+            yield self.sampler.draw_index(rng)
+
+    def shard(self, worker: int) -> Iterator[Dict]:
+        """Endless stream of scenarios for a worker."""
+        for index in self.indices(worker):
+            yield self.scenarios[index]
+
+    def next(self, worker: int) -> Dict:
+        """Next scenario of a worker's stream (each worker must be driven by one thread)."""
+        stream = self._streams.get(worker)
+        if stream is None:
+            stream = self._streams[worker] = self.shard(worker)
+        return next(stream)
+
+    def fingerprint(self, workers: int, count: int = 100) -> str:
+        """Short digest of the first `count` draws of every worker, to compare runs."""
+        digest = hashlib.sha256()
+        for worker in range(workers):
+            stream = self.indices(worker)
+            for _ in range(count):
+                digest.update(next(stream).to_bytes(8, "little"))
+        return digest.hexdigest()[:16]
+
+    def write_shards(self, directory: str, workers: int, count: int,
+                     identity_pool: Optional["IdentityPool"] = None) -> List[str]:
+        """
+        Write each worker's first `count` scenarios to shard_<n>.csv (n from 1, like
+        JMeter's __threadNum), for a CSVDataSet read per thread.
+
+        Args:
+            directory: Output directory
+            workers: Number of shards
+            count: Scenarios per shard
+            identity_pool: Optional identities; each shard carries its worker's tokens,
+                the same assignment the Python engine makes per virtual user
+
+        Returns:
+            Paths of the written shard files
+        """
+        os.makedirs(directory, exist_ok=True)
+        fields = list(self.scenarios[0].keys())
+        paths = []
+        for worker in range(workers):
+            path = os.path.join(directory, f"shard_{worker + 1}.csv")
+            with open(path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=fields)
+                writer.writeheader()
+                stream = self.shard(worker)
+                for _ in range(count):
+                    scenario = next(stream)
+                    if identity_pool is not None:
+                        scenario = identity_pool.apply(scenario, worker)
+                    # Rows are already drawn by weight; each line is one request
+                    writer.writerow(dict(scenario, weight=1))
+            paths.append(path)
+        return paths
+
+
+class IdentityPool:
+    """
+    Real user identities per tenant, so virtual users do not share one principal.
+
+    The scenario table keeps a single authToken per tenant; the pool swaps in the token
+    of the identity assigned to each virtual user. Identities live in a sidecar file,
+    so the scenario table does not grow with the number of users.
+    """
+
+    def __init__(self, identities: Dict[str, List[Dict]], source: Optional[str] = None):
+        """
+        Initialize the pool.
+
+        Args:
+            identities: Mapping of tenant to a list of {"user", "token"} entries
+            source: File the identities were loaded from
+        """
+        self.identities = {tenant: entries for tenant, entries in identities.items() if entries}
+        self.source = source
+
+    @classmethod
+    def from_multi_user_tokens(cls, filename: str) -> "IdentityPool":
+        """Build the pool from a MultiUserTokenGenerator results file."""
+        with open(filename, "r") as f:
+            data = json.load(f)
+
+        identities = defaultdict(list)
+        for user_email, user_data in data.get("users", {}).items():
+            for tenant, token_data in user_data.get("tenants", {}).items():
+                if tenant != "default" and token_data.get("token"):
+                    identities[tenant].append({"user": user_email, "token": token_data["token"]})
+        return cls(dict(identities), source=filename)
+
+    @classmethod
+    def from_token_store(cls, filename: str) -> "IdentityPool":
+        """Build a pool of one identity per tenant from a tokens/{env}.json store."""
+        with open(filename, "r") as f:
+            data = json.load(f)
+
+        identities = {}
+        for tenant, token_data in data.get("tokens", {}).items():
+            if isinstance(token_data, dict) and token_data.get("token"):
+                identities[tenant] = [{"user": token_data.get("user"), "token": token_data["token"]}]
+        return cls(identities, source=filename)
+
+    @classmethod
+    def from_file(cls, filename: str) -> "IdentityPool":
+        """Load a pool written by save(), or a multi-user token results file."""
+        with open(filename, "r") as f:
+            data = json.load(f)
+        if "users" in data:
+            return cls.from_multi_user_tokens(filename)
+        return cls(data.get("tenants", {}), source=data.get("source"))
+
+    def save(self, filename: str):
+        """Write the pool as the identities sidecar of a scenario file."""
+        output = {
+            "generated_at": datetime.now().isoformat(),
+            "source": self.source,
+            "tenants": self.identities
+        }
+        with open(filename, "w") as f:
+            json.dump(output, f, indent=2)
+
+    def restrict_to(self, tenants: Iterable[str]) -> "IdentityPool":
+        """Return a pool holding only the given tenants."""
+        tenants = set(tenants)
+        return IdentityPool(
+            {t: entries for t, entries in self.identities.items() if t in tenants},
+            source=self.source
+        )
+
+    def size(self, tenant: str) -> int:
+        """Number of identities available for a tenant."""
+        return len(self.identities.get(tenant, ()))
+
+    def identity_for(self, tenant: str, virtual_user: int) -> Optional[Dict]:
+        """Identity assigned to a virtual user for a tenant (stable round-robin)."""
+        entries = self.identities.get(tenant)
+        if not entries:
+            return None
+        return entries[virtual_user % len(entries)]
+
+    def apply(self, scenario: Dict, virtual_user: int) -> Dict:
+        """
+        Return the scenario as seen by a virtual user.
+
+        Tenants without identities keep the scenario's own authToken.
+        """
+        identity = self.identity_for(scenario["tenantName"], virtual_user)
+        if identity is None:
+            return scenario
+        return dict(scenario, authToken=identity["token"])
+
+
+def identities_file_for(scenario_file: str) -> str:
+    """Path of the identities sidecar belonging to a scenario file."""
+    root, _ = os.path.splitext(scenario_file)
+    return f"{root}_identities.json"
+
+
+def main():
+    """Print the endpoint distribution of a scenario file, or write per-thread shards."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect a scenario file or write seeded per-thread shards")
+    parser.add_argument("filename", nargs="?", default="test_data.csv", help="Scenario CSV or .scn store")
+    parser.add_argument("--seed", type=int, default=None, help="Schedule seed for --shards")
+    parser.add_argument("--shards", default=None, metavar="DIR",
+                        help="Write one seeded scenario sequence per worker to DIR/shard_<n>.csv")
+    parser.add_argument("--workers", type=int, default=1, help="Number of shards (default: 1)")
+    parser.add_argument("--per-worker", type=int, default=100, help="Scenarios per shard (default: 100)")
+    parser.add_argument("--is-weighted", action="store_true",
+                        help="Only exit 0 if some row has a weight other than 1, else 1")
+    args = parser.parse_args()
+
+    filename = args.filename
+    if args.is_weighted:
+        return 0 if is_weighted(load_scenarios(filename)) else 1
+
+    identities_file = identities_file_for(filename)
+    if args.shards:
+        scheduler = SeededScheduler(load_scenarios(filename), seed=args.seed)
+        identity_pool = None
+        if os.path.exists(identities_file):
+            identity_pool = IdentityPool.from_file(identities_file)
+            print(f"✓ Using identities from {identities_file}")
+        paths = scheduler.write_shards(args.shards, args.workers, args.per_worker, identity_pool)
+        print(f"✓ Wrote {len(paths)} shards of {args.per_worker} scenarios to {args.shards}/ "
+              f"(seed {scheduler.seed}, fingerprint {scheduler.fingerprint(args.workers)})")
+        return
+
+    sampler = WeightedScenarioSampler.from_file(filename)
+
+    print(f"Scenario file: {filename}")
+    print(f"Unique scenarios: {len(sampler)}")
+    print(f"Total weight: {sampler.total_weight}")
+    print("-" * 50)
+    for endpoint, share in sampler.endpoint_distribution().items():
+        print(f"{endpoint:<30} {share * 100:6.2f}%")
+
+    if os.path.exists(identities_file):
+        pool = IdentityPool.from_file(identities_file)
+        print("-" * 50)
+        print(f"Identities ({identities_file}):")
+        for tenant in sorted(pool.identities):
+            print(f"{tenant:<30} {pool.size(tenant):>6} users")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Binary Scenario Store for YMS Dashboard Service
+Memory-mapped scenario table: fixed-size records of string ids pointing into a
+deduplicated string pool, plus a cumulative weight column for weighted sampling.
+
+Opening a store maps the file without parsing it, so multi-million-row tables
+load instantly and worker processes share one copy through the page cache.
+
+Layout (little-endian, sections 8-byte aligned):
+    header           MAGIC, field count, record count, string count, section offsets
+    field names      newline-separated UTF-8, in column order ("weight" included)
+    string index     per string: u64 pool offset, u32 length, u32 padding
+    string pool      UTF-8 bytes of every distinct value
+    records          per row: one u32 string id per field
+    weights          per row: u64 cumulative weight
+"""
+
+import csv
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+MAGIC = b"YMSSCN01"
+SCENARIO_STORE_EXTENSION = ".scn"
+
+# magic, field count, record count, string count, then offsets of field names,
+# string index, string pool, records and weights
+_HEADER = struct.Struct("<8sIQQQQQQQ")
+_STRING_ENTRY = struct.Struct("<QII")
+
+
+def store_file_for(scenario_file: str) -> str:
+    """Path of the binary store belonging to a scenario CSV."""
+    root, _ = os.path.splitext(scenario_file)
+    return f"{root}{SCENARIO_STORE_EXTENSION}"
+
+
+def is_scenario_store(filename: str) -> bool:
+    """True if the file starts with the scenario store magic."""
+    try:
+        with open(filename, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _align(f, boundary: int = 8) -> int:
+    """Pad the file to the next boundary and return the new position."""
+    position = f.tell()
+    padding = -position % boundary
+    if padding:
+        f.write(b"\0" * padding)
+    return position + padding
+
+
+def _little_endian(values: array) -> array:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def write_scenario_store(filename: str, rows: Iterable[Dict], fields: List[str]) -> int:
+    """
+    Write scenario rows as a binary store.
+
+    Args:
+        filename: Output path
+        rows: Row dictionaries with an integer "weight" key
+        fields: Columns in order; "weight" goes to the weight column, the rest are strings
+
+    Returns:
+        Number of records written
+    """
+    string_fields = [field for field in fields if field != "weight"]
+    string_ids = {}
+    strings = []
+    records = array("I")
+    cumulative = array("Q")
+    total = 0
+
+    for row in rows:
+        weight = int(row.get("weight") or 1)
+        if weight <= 0:
+            continue
+        for field in string_fields:
+            value = row.get(field)
+            value = "" if value is None else str(value)
+            string_id = string_ids.get(value)
+            if string_id is None:
+                string_id = string_ids[value] = len(strings)
+                strings.append(value)
+            records.append(string_id)
+        total += weight
+        cumulative.append(total)
+
+    # Write to a temporary file first so readers never map a half-written store
+    temp_file = f"{filename}.tmp"
+    with open(temp_file, "wb") as f:
+        f.write(b"\0" * _HEADER.size)
+
+        fields_offset = f.tell()
+        names = "\n".join(fields).encode("utf-8")
+        f.write(struct.pack("<I", len(names)) + names)
+
+        index_offset = _align(f)
+        encoded = [value.encode("utf-8") for value in strings]
+        pool_position = 0
+        for value in encoded:
+            f.write(_STRING_ENTRY.pack(pool_position, len(value), 0))
+            pool_position += len(value)
+
+        pool_offset = f.tell()
+        for value in encoded:
+            f.write(value)
+
+        records_offset = _align(f)
+        _little_endian(records).tofile(f)
+
+        weights_offset = _align(f)
+        _little_endian(cumulative).tofile(f)
+
+        f.seek(0)
+        f.write(_HEADER.pack(
+            MAGIC, len(string_fields), len(cumulative), len(strings),
+            fields_offset, index_offset, pool_offset, records_offset, weights_offset
+        ))
+    os.replace(temp_file, filename)
+    return len(cumulative)
+
+
+class ScenarioStore:
+    """
+    Read-only, memory-mapped scenario table.
+
+    Behaves like the list returned by scenario_sampler.load_scenarios: indexing
+    returns a row dictionary with an integer "weight" key. Rows are decoded on
+    access; nothing is parsed when the store is opened.
+    """
+
+    def __init__(self, filename: str):
+        """
+        Open a store.
+
+        Args:
+            filename: Path written by write_scenario_store
+
+        Raises:
+            ValueError: If the file is not a scenario store
+        """
+        if sys.byteorder != "little":
+            raise ValueError("Scenario stores can only be mapped on little-endian machines")
+
+        self.filename = filename
+        self._file = open(filename, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, field_count, record_count, string_count, fields_offset, index_offset,
+         pool_offset, records_offset, weights_offset) = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{filename} is not a scenario store")
+
+        (names_length,) = struct.unpack_from("<I", self._map, fields_offset)
+        names = self._map[fields_offset + 4:fields_offset + 4 + names_length].decode("utf-8")
+        self.fields = names.split("\n") if names else []
+        if "weight" not in self.fields:
+            self.fields.append("weight")
+        # Position of each string field within a record
+        self._string_fields = [field for field in self.fields if field != "weight"]
+        self.field_index = {field: i for i, field in enumerate(self._string_fields)}
+
+        self._record_count = record_count
+        self.string_count = string_count
+        self._index_offset = index_offset
+        self._pool_offset = pool_offset
+
+        view = memoryview(self._map)
+        self._records = view[records_offset:records_offset + 4 * field_count * record_count].cast("I")
+        self.cumulative_weights = view[weights_offset:weights_offset + 8 * record_count].cast("Q")
+        self.total_weight = self.cumulative_weights[-1] if record_count else 0
+
+    def __reduce__(self):
+        # Worker processes re-map the file instead of receiving a pickled copy
+        return (ScenarioStore, (self.filename,))
+
+    def __enter__(self) -> "ScenarioStore":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Unmap the file. Rows handed out earlier remain valid."""
+        for view in ("_records", "cumulative_weights"):
+            if hasattr(self, view):
+                getattr(self, view).release()
+        self._map.close()
+        self._file.close()
+
+    def __len__(self) -> int:
+        return self._record_count
+
+    def string(self, string_id: int) -> str:
+        """Value of a pooled string."""
+        offset, length, _ = _STRING_ENTRY.unpack_from(self._map, self._index_offset + string_id * _STRING_ENTRY.size)
+        start = self._pool_offset + offset
+        return self._map[start:start + length].decode("utf-8")
+
+    def weight(self, index: int) -> int:
+        """Weight of one row."""
+        return self.cumulative_weights[index] - (self.cumulative_weights[index - 1] if index else 0)
+
+    def __getitem__(self, index: int) -> Dict:
+        if index < 0:
+            index += self._record_count
+        if not 0 <= index < self._record_count:
+            raise IndexError("scenario index out of range")
+        width = len(self._string_fields)
+        ids = dict(zip(self._string_fields, self._records[index * width:(index + 1) * width]))
+        return {
+            field: self.weight(index) if field == "weight" else self.string(ids[field])
+            for field in self.fields
+        }
+
+    def __iter__(self) -> Iterator[Dict]:
+        for index in range(self._record_count):
+            yield self[index]
+
+    def distinct(self, *fields: str) -> Set[Tuple[str, ...]]:
+        """Distinct value combinations of some fields, compared by string id without decoding rows."""
+        width = len(self._string_fields)
+        columns = [self.field_index[field] for field in fields]
+        ids = {
+            tuple(self._records[base + column] for column in columns)
+            for base in range(0, self._record_count * width, width)
+        }
+        return {tuple(self.string(string_id) for string_id in key) for key in ids}
+
+
+def convert_csv(csv_file: str, store_file: Optional[str] = None) -> str:
+    """
+    Convert a scenario CSV into a binary store next to it.
+
+    Returns:
+        Path of the written store
+    """
+    from scenario_sampler import load_scenarios
+
+    store_file = store_file or store_file_for(csv_file)
+    with open(csv_file, newline="") as f:
+        fields = next(csv.reader(f))
+    write_scenario_store(store_file, load_scenarios(csv_file), fields)
+    return store_file
+
+
+def main():
+    """Main entry point"""
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Convert or inspect binary scenario stores")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert = subparsers.add_parser("convert", help="Write the binary store of a scenario CSV")
+    convert.add_argument("csv", help="Scenario CSV (e.g. test_data.csv)")
+    convert.add_argument("-o", "--output", default=None, help="Store path (default: <csv name>.scn)")
+
+    info = subparsers.add_parser("info", help="Show the size and fields of a store")
+    info.add_argument("store", help="Binary scenario store")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        start = time.perf_counter()
+        store_file = convert_csv(args.csv, args.output)
+        with ScenarioStore(store_file) as store:
+            print(f"✓ Wrote {len(store)} scenarios to {store_file} in {time.perf_counter() - start:.2f}s")
+        return 0
+
+    start = time.perf_counter()
+    with ScenarioStore(args.store) as store:
+        opened = time.perf_counter() - start
+        print(f"Store: {args.store} ({os.path.getsize(args.store) / 1024 / 1024:.1f} MB, opened in {opened * 1000:.2f} ms)")
+        print(f"Scenarios: {len(store)}")
+        print(f"Distinct strings: {store.string_count}")
+        print(f"Total weight: {store.total_weight}")
+        print(f"Fields: {', '.join(store.fields)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Soak Analysis for YMS Dashboard Service
+Cuts long runs into time windows and fits a trend over each endpoint's p99 latency,
+error rate and throughput, to detect slow drift (latency creep, growing errors,
+throughput decay) that aggregate statistics hide.
+
+Memory stays bounded for runs of any length: only the newest windows are kept as
+latency histograms, and closed windows are folded into running regression sums.
+"""
+
+import csv
+import math
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, Iterator, Optional
+
+from analyze_results import parse_sample, read_samples
+from client_monitor import pid_alive
+
+
+ALL_ENDPOINTS = "(all)"
+
+# Trend metrics: unit, smallest mean the relative change threshold is applied to, and
+# the direction that counts as degradation (+1 rising is bad, -1 falling is bad)
+METRICS = {
+    "p99": {"unit": "ms", "floor": 1.0, "bad": 1},
+    "error_rate": {"unit": "%", "floor": 1.0, "bad": 1},
+    "throughput": {"unit": "req/min", "floor": 1.0, "bad": -1}
+}
+
+# Histogram bins grow by 2%, so percentiles are exact to within 2% at any latency
+_BIN_GROWTH = math.log(1.02)
+
+
+class LatencyHistogram:
+    """Sparse log-bucketed histogram: memory depends on the latency range, not the sample count."""
+
+    def __init__(self):
+        self.bins = defaultdict(int)
+        self.count = 0
+
+    def add(self, value_ms: float):
+        self.bins[int(math.log1p(max(0.0, value_ms)) / _BIN_GROWTH)] += 1
+        self.count += 1
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bin holding the nearest-rank percentile."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * pct / 100))
+        seen = 0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen >= rank:
+                return math.expm1((index + 1) * _BIN_GROWTH)
+        return 0.0
+
+
+def _betacf(a: float, b: float, x: float) -> float:
+    """Continued fraction of the incomplete beta function (modified Lentz)."""
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1.0)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    result = d
+    for m in range(1, 300):
+        for numerator in (
+            m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+            -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))
+        ):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            result *= d * c
+        if abs(d * c - 1.0) < 1e-12:
+            break
+    return result
+
+
+def _incomplete_beta(a: float, b: float, x: float) -> float:
+    """Regularized incomplete beta function I_x(a, b)."""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                     + a * math.log(x) + b * math.log1p(-x))
+    if x < (a + 1.0) / (a + b + 2.0):
+        return front * _betacf(a, b, x) / a
+    return 1.0 - front * _betacf(b, a, 1.0 - x) / b
+
+
+def t_test_p_value(t: float, df: int) -> float:
+    """Two-sided p-value of Student's t statistic."""
+    if math.isinf(t):
+        return 0.0
+    return _incomplete_beta(df / 2.0, 0.5, df / (df + t * t))
+
+
+class OnlineRegression:
+    """Least-squares line over a stream of points, kept as six running sums."""
+
+    def __init__(self):
+        self.n = 0
+        self.sx = self.sy = self.sxx = self.sxy = self.syy = 0.0
+        self.x_min = self.x_max = None
+
+    def add(self, x: float, y: float):
+        self.n += 1
+        self.sx += x
+        self.sy += y
+        self.sxx += x * x
+        self.sxy += x * y
+        self.syy += y * y
+        self.x_min = x if self.x_min is None else min(self.x_min, x)
+        self.x_max = x if self.x_max is None else max(self.x_max, x)
+
+    @property
+    def mean(self) -> float:
+        return self.sy / self.n if self.n else 0.0
+
+    def fit(self) -> Optional[Dict]:
+        """
+        Slope, intercept and slope significance.
+
+        Returns:
+            Dictionary with slope, intercept, p_value and mean, or None with fewer than 3 points
+        """
+        if self.n < 3:
+            return None
+        sxx = self.sxx - self.sx * self.sx / self.n
+        if sxx <= 0:
+            return None
+        sxy = self.sxy - self.sx * self.sy / self.n
+        syy = self.syy - self.sy * self.sy / self.n
+        slope = sxy / sxx
+        intercept = (self.sy - slope * self.sx) / self.n
+
+        # t-test of slope != 0 with n - 2 degrees of freedom
+        residual = max(0.0, syy - slope * sxy)
+        standard_error = math.sqrt(residual / (self.n - 2) / sxx)
+        if standard_error == 0:
+            p_value = 0.0 if slope else 1.0
+        else:
+            p_value = t_test_p_value(slope / standard_error, self.n - 2)
+        return {"slope": slope, "intercept": intercept, "p_value": p_value, "mean": self.mean}
+
+
+class _Window:
+    __slots__ = ("histogram", "errors")
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.errors = 0
+
+
+class SoakAnalyzer:
+    """Windowed trend analysis over a stream of samples."""
+
+    def __init__(
+        self,
+        window_seconds: float = 60.0,
+        alpha: float = 0.01,
+        min_change: float = 0.1,
+        lateness_windows: int = 1,
+        skip_seconds: float = 0.0
+    ):
+        """
+        Initialize the analyzer.
+
+        Args:
+            window_seconds: Length of one window
+            alpha: Significance level of the slope test
+            min_change: Smallest change over the run, relative to the metric's mean,
+                that counts as drift (keeps tiny but significant slopes out)
+            lateness_windows: Windows kept open for samples that arrive out of order
+            skip_seconds: Ignore samples from the first seconds of the run (ramp-up)
+        """
+        self.window_ms = int(window_seconds * 1000)
+        self.alpha = alpha
+        self.min_change = min_change
+        self.lateness_windows = lateness_windows
+        self.skip_ms = int(skip_seconds * 1000)
+        self.first_ms = None
+        self.skipped_samples = 0
+
+        self.start_ms = None
+        self.open_windows = defaultdict(dict)  # window index -> endpoint -> _Window
+        self.closed_through = -1
+        self.windows_closed = 0
+        self.late_samples = 0
+        self.samples = 0
+        self.regressions = defaultdict(lambda: {metric: OnlineRegression() for metric in METRICS})
+
+    def add(self, sample: Dict):
+        """Add one sample (as produced by analyze_results.parse_sample)."""
+        if self.first_ms is None:
+            self.first_ms = sample["timestamp"]
+        if sample["timestamp"] < self.first_ms + self.skip_ms:
+            self.skipped_samples += 1
+            return
+        if self.start_ms is None:
+            self.start_ms = sample["timestamp"] - sample["timestamp"] % self.window_ms
+        index = (sample["timestamp"] - self.start_ms) // self.window_ms
+        if index <= self.closed_through:
+            self.late_samples += 1
+            return
+
+        self.samples += 1
+        windows = self.open_windows[index]
+        for endpoint in (sample["endpoint"], ALL_ENDPOINTS):
+            window = windows.get(endpoint)
+            if window is None:
+                window = windows[endpoint] = _Window()
+            window.histogram.add(sample["elapsed"])
+            if not sample["success"]:
+                window.errors += 1
+
+        # Close windows that can no longer receive samples
+        newest = max(self.open_windows)
+        for old in sorted(self.open_windows):
+            if old >= newest - self.lateness_windows:
+                break
+            self._close(old)
+
+    def _close(self, index: int, last: bool = False):
+        windows = self.open_windows.pop(index)
+        # The first and last windows are usually partial; their request counts would
+        # read as a throughput dip, so they only feed the latency and error trends
+        partial = index == 0 or last
+        # x is the window midpoint in hours since the start of the run
+        hours = (index + 0.5) * self.window_ms / 3_600_000
+        minutes = self.window_ms / 60_000
+        for endpoint, window in windows.items():
+            regression = self.regressions[endpoint]
+            count = window.histogram.count
+            regression["p99"].add(hours, window.histogram.percentile(99))
+            regression["error_rate"].add(hours, 100.0 * window.errors / count)
+            if not partial:
+                regression["throughput"].add(hours, count / minutes)
+        self.closed_through = max(self.closed_through, index)
+        self.windows_closed += 1
+
+    def flush(self):
+        """Close every open window (end of the run)."""
+        indices = sorted(self.open_windows)
+        for index in indices:
+            self._close(index, last=index == indices[-1])
+
+    def trends(self) -> Dict[str, Dict[str, Dict]]:
+        """
+        Trend of every metric per endpoint.
+
+        Returns:
+            Mapping of endpoint to metric to the fit plus "change" (over the observed
+            span), "drift" (significant and large enough) and "degrading" (drift in
+            the bad direction), for endpoints with at least 3 windows
+        """
+        report = {}
+        for endpoint in sorted(self.regressions, key=lambda e: (e == ALL_ENDPOINTS, e)):
+            metrics = {}
+            for metric, regression in self.regressions[endpoint].items():
+                fit = regression.fit()
+                if fit is None:
+                    continue
+                span = regression.x_max - regression.x_min
+                change = fit["slope"] * span
+                threshold = self.min_change * max(abs(fit["mean"]), METRICS[metric]["floor"])
+                drift = fit["p_value"] < self.alpha and abs(change) >= threshold
+                fit.update(
+                    windows=regression.n,
+                    change=change,
+                    drift=drift,
+                    degrading=drift and change * METRICS[metric]["bad"] > 0
+                )
+                metrics[metric] = fit
+            if metrics:
+                report[endpoint] = metrics
+        return report
+
+
+def follow_samples(filename: str, pid: Optional[int] = None, poll: float = 1.0) -> Iterator[Dict]:
+    """
+    Stream samples from a results file while it is being written.
+
+    Stops once the writing process `pid` has exited and the file is drained
+    (or on Ctrl+C when no pid is given).
+    """
+    while not os.path.exists(filename):
+        if pid is not None and not pid_alive(pid):
+            return
+        time.sleep(poll)
+
+    with open(filename, newline="") as f:
+        header = None
+        pending = ""
+        while True:
+            line = f.readline()
+            if line:
+                pending += line
+                if not pending.endswith("\n"):
+                    continue
+                row = next(csv.reader([pending]))
+                pending = ""
+                if header is None:
+                    header = row
+                elif len(row) == len(header):
+                    yield parse_sample(dict(zip(header, row)))
+                continue
+
+            if pid is not None and not pid_alive(pid):
+                # One last pass for anything written just before the process exited
+                for line in f:
+                    pending += line
+                    if pending.endswith("\n"):
+                        row = next(csv.reader([pending]))
+                        pending = ""
+                        if header is not None and len(row) == len(header):
+                            yield parse_sample(dict(zip(header, row)))
+                return
+            time.sleep(poll)
+
+
+def print_trend_report(analyzer: SoakAnalyzer, title: str = "Soak trends") -> bool:
+    """
+    Print per-endpoint trends.
+
+    Returns:
+        True if no metric is degrading significantly
+    """
+    report = analyzer.trends()
+    print(f"\n{title} ({analyzer.windows_closed} windows of {analyzer.window_ms / 1000:g}s, "
+          f"{analyzer.samples} samples, {analyzer.late_samples} late, {analyzer.skipped_samples} skipped)")
+    print("-" * 100)
+    print(f"{'endpoint':<30} {'metric':<11} {'mean':>9} {'slope/h':>10} {'change':>10} {'p-value':>9}  verdict")
+    degrading = []
+    for endpoint, metrics in report.items():
+        for metric, fit in metrics.items():
+            if fit["degrading"]:
+                verdict = "✗ DRIFT"
+                degrading.append(f"{endpoint} {metric}")
+            elif fit["drift"]:
+                verdict = "improving"
+            else:
+                verdict = "✓ stable"
+            print(f"{endpoint:<30} {metric:<11} {fit['mean']:>9.1f} {fit['slope']:>+10.2f} "
+                  f"{fit['change']:>+10.1f} {fit['p_value']:>9.4f}  {verdict}")
+    if not report:
+        print("Not enough windows for a trend yet (need 3 per endpoint)")
+
+    if degrading:
+        print(f"✗ Significant drift: {', '.join(degrading)}")
+        return False
+    print("✓ No significant latency creep, error growth or throughput decay")
+    return True
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Detect drift in long-running (soak) test results")
+    parser.add_argument("results", help="JTL results file (CSV)")
+    parser.add_argument("--window", type=float, default=60, help="Window length in seconds (default: 60)")
+    parser.add_argument("--alpha", type=float, default=0.01, help="Significance level (default: 0.01)")
+    parser.add_argument("--min-change", type=float, default=0.1,
+                        help="Smallest change over the run, relative to the mean, reported as drift (default: 0.1)")
+    parser.add_argument("--skip", type=float, default=0,
+                        help="Ignore the first N seconds of the run, e.g. the ramp-up (default: 0)")
+    parser.add_argument("--follow", action="store_true", help="Analyze the file while the test writes it")
+    parser.add_argument("--pid", type=int, default=None, help="With --follow: stop when this process exits")
+    parser.add_argument("--report-every", type=int, default=15,
+                        help="With --follow: print trends every N closed windows (default: 15)")
+    args = parser.parse_args()
+
+    analyzer = SoakAnalyzer(args.window, args.alpha, args.min_change, skip_seconds=args.skip)
+    samples = follow_samples(args.results, args.pid) if args.follow else read_samples(args.results)
+    reported = 0
+    try:
+        for sample in samples:
+            analyzer.add(sample)
+            if args.follow and analyzer.windows_closed - reported >= args.report_every:
+                reported = analyzer.windows_closed
+                print_trend_report(analyzer, "Soak trends so far")
+    except KeyboardInterrupt:
+        pass
+
+    analyzer.flush()
+    return 0 if print_trend_report(analyzer) else 4
+
+
+if __name__ == "__main__":
+    sys.exit(main())
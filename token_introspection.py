@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Token Introspection for YMS Dashboard Service
+Decodes JWT bearer tokens once per process and exposes tenant, user and expiry
+"""
+
+import base64
+import json
+import time
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional
+
+
+class TokenInfo(NamedTuple):
+    """Decoded JWT. The header and payload dicts are shared via the cache; treat them as read-only."""
+    header: Dict
+    payload: Dict
+    tenant_id: Optional[str]
+    user: Optional[str]
+    exp: Optional[int]
+
+
+def strip_bearer(token: str) -> str:
+    """Remove the 'Bearer ' prefix if present."""
+    return token[7:] if token.startswith("Bearer ") else token
+
+
+def _decode_segment(segment: str) -> Dict:
+    """Decode one base64url JWT segment (JWT omits the padding)."""
+    return json.loads(base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4)))
+
+
+@lru_cache(maxsize=4096)
+def _decode(raw_token: str) -> TokenInfo:
+    parts = raw_token.split(".")
+    if len(parts) != 3:
+        raise ValueError("Invalid JWT format. Expected 3 parts separated by dots.")
+
+    header = _decode_segment(parts[0])
+    payload = _decode_segment(parts[1])
+    exp = payload.get("exp")
+    return TokenInfo(
+        header=header,
+        payload=payload,
+        tenant_id=payload.get("tenant_id"),
+        user=payload.get("preferred_username"),
+        exp=int(exp) if exp is not None else None
+    )
+
+
+def decode_token(token: str) -> TokenInfo:
+    """
+    Decode a JWT, with or without the 'Bearer ' prefix.
+
+    Results are memoized in an LRU cache keyed on the token string (Python caches the
+    string hash), so repeated lookups for the same token cost a dictionary hit.
+
+    Raises:
+        ValueError: If the token is not a decodable JWT
+    """
+    return _decode(strip_bearer(token))
+
+
+def get_tenant(token: str) -> Optional[str]:
+    """tenant_id claim of a token."""
+    return decode_token(token).tenant_id
+
+
+def get_user(token: str) -> Optional[str]:
+    """preferred_username claim of a token."""
+    return decode_token(token).user
+
+
+def get_expiry(token: str) -> Optional[int]:
+    """exp claim of a token (epoch seconds)."""
+    return decode_token(token).exp
+
+
+def seconds_until_expiry(token: str, now: Optional[float] = None) -> Optional[float]:
+    """Seconds until the token expires (negative once expired, None without exp claim)."""
+    exp = decode_token(token).exp
+    if exp is None:
+        return None
+    return exp - (time.time() if now is None else now)
+
+
+def is_expired(token: str, margin: float = 0.0, now: Optional[float] = None) -> bool:
+    """True if the token expires within `margin` seconds. Undecodable tokens count as expired."""
+    try:
+        remaining = seconds_until_expiry(token, now)
+    except ValueError:
+        return True
+    return remaining is not None and remaining <= margin
+
+
+def cache_info():
+    """Hit/miss statistics of the decode cache."""
+    return _decode.cache_info()